@@ -0,0 +1,79 @@
+"""Add disease dictionary
+
+Revision ID: 0a9c5e7d3b61
+Revises: f3b8d2a6c914
+Create Date: 2026-10-19 19:58:21.730264
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a9c5e7d3b61'
+down_revision: Union[str, None] = 'f3b8d2a6c914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app.services.patient_search.parse_diseases()
+_DISEASE_SEPARATORS = re.compile(r"[,;/\n]+")
+_NO_DISEASE = {"", "none", "n/a", "na", "-", "no"}
+
+
+def _parse_diseases(chronic_diseases):
+    diseases = {}
+    for name in _DISEASE_SEPARATORS.split(chronic_diseases or ""):
+        key = " ".join(name.lower().split())
+        if key not in _NO_DISEASE:
+            diseases.setdefault(key, " ".join(name.split()))
+    return diseases
+
+
+def upgrade() -> None:
+    diseases_table = op.create_table('diseases',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_diseases_id'), 'diseases', ['id'], unique=False)
+    op.create_index(op.f('ix_diseases_key'), 'diseases', ['key'], unique=True)
+
+    # Threshold spellings first ("COPD"), then the first one seen in a profile
+    connection = op.get_bind()
+    names = {}
+    for (disease,) in connection.execute(sa.text("SELECT DISTINCT disease FROM disease_thresholds ORDER BY disease")):
+        names.update({key: name for key, name in _parse_diseases(disease).items() if key not in names})
+    profiles = connection.execute(
+        sa.text("SELECT user_id, chronic_diseases FROM patient_profiles WHERE chronic_diseases IS NOT NULL ORDER BY id")
+    )
+    associations = set()
+    for user_id, chronic_diseases in profiles:
+        for key, name in _parse_diseases(chronic_diseases).items():
+            names.setdefault(key, name)
+            if user_id is not None:
+                associations.add((user_id, key))
+    if names:
+        op.bulk_insert(diseases_table, [{"key": key, "name": name} for key, name in sorted(names.items())])
+
+    # Re-derive the associations so every tag exists in the dictionary
+    op.execute("DELETE FROM patient_disease_tags")
+    if associations:
+        op.bulk_insert(
+            sa.table('patient_disease_tags', sa.column('patient_id', sa.Integer()), sa.column('tag', sa.String())),
+            [{"patient_id": user_id, "tag": key} for user_id, key in sorted(associations)],
+        )
+    with op.batch_alter_table('patient_disease_tags') as batch_op:
+        batch_op.create_foreign_key('fk_patient_disease_tags_tag_diseases', 'diseases', ['tag'], ['key'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('patient_disease_tags') as batch_op:
+        batch_op.drop_constraint('fk_patient_disease_tags_tag_diseases', type_='foreignkey')
+    op.drop_index(op.f('ix_diseases_key'), table_name='diseases')
+    op.drop_index(op.f('ix_diseases_id'), table_name='diseases')
+    op.drop_table('diseases')
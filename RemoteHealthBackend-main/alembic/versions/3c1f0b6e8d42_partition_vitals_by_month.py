@@ -0,0 +1,117 @@
+"""Partition vitals by month
+
+Revision ID: 3c1f0b6e8d42
+Revises: 95a4794da13e
+Create Date: 2026-10-19 11:02:17.530914
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f0b6e8d42'
+down_revision: Union[str, None] = '95a4794da13e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Monthly partitions created ahead of today; later months are created by
+# app.services.partition_manager.
+MONTHS_AHEAD = 3
+
+
+def _add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _upgrade_postgresql() -> None:
+    bind = op.get_bind()
+    op.execute("UPDATE vitals SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL")
+    op.drop_constraint('anomalies_vital_id_fkey', 'anomalies', type_='foreignkey')
+    op.drop_index('ix_vitals_id', table_name='vitals')
+    op.execute("ALTER TABLE vitals RENAME TO vitals_legacy")
+    op.execute("ALTER TABLE vitals_legacy RENAME CONSTRAINT vitals_pkey TO vitals_legacy_pkey")
+    op.execute("ALTER TABLE vitals_legacy ALTER COLUMN id DROP DEFAULT")
+
+    # A unique constraint on a partitioned table must contain the partition key
+    op.execute("""
+        CREATE TABLE vitals (
+            id INTEGER NOT NULL DEFAULT nextval('vitals_id_seq'),
+            patient_id INTEGER REFERENCES users (id),
+            heart_rate FLOAT,
+            temperature FLOAT,
+            spo2 FLOAT,
+            systolic INTEGER,
+            diastolic INTEGER,
+            pulse INTEGER,
+            timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            source datasource,
+            CONSTRAINT vitals_pkey PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("ALTER SEQUENCE vitals_id_seq OWNED BY vitals.id")
+
+    oldest = bind.execute(sa.text("SELECT min(timestamp) FROM vitals_legacy")).scalar()
+    current = date.today().replace(day=1)
+    month = oldest.date().replace(day=1) if oldest else current
+    last = _add_months(current, MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE vitals_p{month.year:04d}_{month.month:02d} PARTITION OF vitals "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+    # Catches readings dated beyond the pre-created months
+    op.execute("CREATE TABLE vitals_default PARTITION OF vitals DEFAULT")
+
+    op.execute("INSERT INTO vitals SELECT id, patient_id, heart_rate, temperature, spo2, systolic, diastolic, pulse, timestamp, source FROM vitals_legacy")
+    op.execute("DROP TABLE vitals_legacy")
+    op.create_index(op.f('ix_vitals_id'), 'vitals', ['id'], unique=False)
+
+
+def _downgrade_postgresql() -> None:
+    op.drop_index(op.f('ix_vitals_id'), table_name='vitals')
+    op.execute("ALTER TABLE vitals RENAME TO vitals_partitioned")
+    op.execute("ALTER TABLE vitals_partitioned ALTER COLUMN id DROP DEFAULT")
+    op.execute("""
+        CREATE TABLE vitals (
+            id INTEGER NOT NULL DEFAULT nextval('vitals_id_seq'),
+            patient_id INTEGER REFERENCES users (id),
+            heart_rate FLOAT,
+            temperature FLOAT,
+            spo2 FLOAT,
+            systolic INTEGER,
+            diastolic INTEGER,
+            pulse INTEGER,
+            timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            source datasource
+        )
+    """)
+    op.execute("ALTER SEQUENCE vitals_id_seq OWNED BY vitals.id")
+    op.execute("INSERT INTO vitals SELECT id, patient_id, heart_rate, temperature, spo2, systolic, diastolic, pulse, timestamp, source FROM vitals_partitioned")
+    # Dropping the parent drops every attached partition with it
+    op.execute("DROP TABLE vitals_partitioned")
+    op.execute("ALTER TABLE vitals ADD CONSTRAINT vitals_pkey PRIMARY KEY (id)")
+    op.create_index(op.f('ix_vitals_id'), 'vitals', ['id'], unique=False)
+    op.execute("DELETE FROM anomalies WHERE vital_id IS NOT NULL AND vital_id NOT IN (SELECT id FROM vitals)")
+    op.create_foreign_key('anomalies_vital_id_fkey', 'anomalies', 'vitals', ['vital_id'], ['id'])
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        _upgrade_postgresql()
+    # Other databases keep vitals unpartitioned; their anomalies.vital_id
+    # foreign key is left as is since nothing requires dropping it there.
+    op.create_index('ix_vitals_patient_id_timestamp', 'vitals', ['patient_id', 'timestamp'], unique=False)
+    op.create_index(op.f('ix_anomalies_vital_id'), 'anomalies', ['vital_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_anomalies_vital_id'), table_name='anomalies')
+    op.drop_index('ix_vitals_patient_id_timestamp', table_name='vitals')
+    if op.get_bind().dialect.name == 'postgresql':
+        _downgrade_postgresql()
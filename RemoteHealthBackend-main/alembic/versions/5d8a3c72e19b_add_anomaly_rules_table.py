@@ -0,0 +1,41 @@
+"""Add anomaly rules table
+
+Revision ID: 5d8a3c72e19b
+Revises: b6e2d91f4a07
+Create Date: 2026-10-19 15:04:33.871260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8a3c72e19b'
+down_revision: Union[str, None] = 'b6e2d91f4a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('anomaly_rules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('disease', sa.String(), nullable=False),
+    sa.Column('severity', sa.Enum('RED', 'YELLOW', 'BLUE', name='alertseverity', create_type=False), nullable=False),
+    sa.Column('conditions', sa.JSON(), nullable=False),
+    sa.Column('sustained_readings', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_anomaly_rules_id'), 'anomaly_rules', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_anomaly_rules_id'), table_name='anomaly_rules')
+    op.drop_table('anomaly_rules')
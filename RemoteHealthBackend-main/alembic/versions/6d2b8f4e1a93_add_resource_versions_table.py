@@ -0,0 +1,31 @@
+"""Add resource versions table
+
+Revision ID: 6d2b8f4e1a93
+Revises: 0a9c5e7d3b61
+Create Date: 2026-10-19 21:14:37.502118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d2b8f4e1a93'
+down_revision: Union[str, None] = '0a9c5e7d3b61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('resource_versions',
+    sa.Column('resource', sa.String(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('resource')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('resource_versions')
@@ -0,0 +1,30 @@
+"""Seed simulator state row
+
+Revision ID: 7a4e0c9d2b15
+Revises: 6d2b8f4e1a93
+Create Date: 2026-10-20 09:05:12.318604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a4e0c9d2b15'
+down_revision: Union[str, None] = '6d2b8f4e1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Workers only ever read and update this row, so none of them race to create it
+    op.execute(
+        "INSERT INTO simulator_state (id, is_running) "
+        "SELECT 1, false WHERE NOT EXISTS (SELECT 1 FROM simulator_state WHERE id = 1)"
+    )
+
+
+def downgrade() -> None:
+    pass
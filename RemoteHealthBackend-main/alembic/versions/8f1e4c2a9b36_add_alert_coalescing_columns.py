@@ -0,0 +1,33 @@
+"""Add alert coalescing columns
+
+Revision ID: 8f1e4c2a9b36
+Revises: 5d8a3c72e19b
+Create Date: 2026-10-19 16:21:07.412893
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f1e4c2a9b36'
+down_revision: Union[str, None] = '5d8a3c72e19b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('alerts', sa.Column('vital', sa.Enum('HEART_RATE', 'TEMPERATURE', 'SPO2', 'SYSTOLIC', 'DIASTOLIC', 'PULSE', name='vitalsign', create_type=False), nullable=True))
+    op.add_column('alerts', sa.Column('occurrence_count', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('alerts', sa.Column('last_seen_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE alerts SET last_seen_at = created_at")
+    op.create_index('ix_alerts_patient_id_is_resolved', 'alerts', ['patient_id', 'is_resolved'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_alerts_patient_id_is_resolved', table_name='alerts')
+    op.drop_column('alerts', 'last_seen_at')
+    op.drop_column('alerts', 'occurrence_count')
+    op.drop_column('alerts', 'vital')
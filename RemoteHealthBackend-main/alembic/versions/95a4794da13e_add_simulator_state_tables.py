@@ -0,0 +1,52 @@
+"""Add simulator state tables
+
+Revision ID: 95a4794da13e
+Revises: e9e33ff18978
+Create Date: 2026-10-19 09:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '95a4794da13e'
+down_revision: Union[str, None] = 'e9e33ff18978'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('simulator_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('is_running', sa.Boolean(), nullable=False),
+    sa.Column('leader_id', sa.String(), nullable=True),
+    sa.Column('leader_heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_simulator_state_id'), 'simulator_state', ['id'], unique=False)
+    op.create_table('simulated_patients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('interval_seconds', sa.Integer(), nullable=False),
+    sa.Column('patterns', sa.JSON(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('readings_generated', sa.Integer(), nullable=False),
+    sa.Column('last_generated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['patient_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_simulated_patients_id'), 'simulated_patients', ['id'], unique=False)
+    op.create_index(op.f('ix_simulated_patients_patient_id'), 'simulated_patients', ['patient_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_simulated_patients_patient_id'), table_name='simulated_patients')
+    op.drop_index(op.f('ix_simulated_patients_id'), table_name='simulated_patients')
+    op.drop_table('simulated_patients')
+    op.drop_index(op.f('ix_simulator_state_id'), table_name='simulator_state')
+    op.drop_table('simulator_state')
@@ -0,0 +1,33 @@
+"""Add vitals import id
+
+Revision ID: 9b3f5d1c7e20
+Revises: 7a4e0c9d2b15
+Create Date: 2026-10-20 10:22:47.816530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3f5d1c7e20'
+down_revision: Union[str, None] = '7a4e0c9d2b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('vitals', sa.Column('import_id', sa.String(), nullable=True))
+    # Only imported readings are indexed; live ones leave the column NULL
+    op.create_index(
+        'ix_vitals_import_id', 'vitals', ['import_id'], unique=False,
+        postgresql_where=sa.text('import_id IS NOT NULL'),
+        sqlite_where=sa.text('import_id IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_vitals_import_id', table_name='vitals')
+    op.drop_column('vitals', 'import_id')
@@ -0,0 +1,45 @@
+"""Add alert counters table
+
+Revision ID: a4c7e19d2f58
+Revises: 8f1e4c2a9b36
+Create Date: 2026-10-19 17:02:44.190316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c7e19d2f58'
+down_revision: Union[str, None] = '8f1e4c2a9b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('alert_counters',
+    sa.Column('doctor_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('severity', sa.Enum('RED', 'YELLOW', 'BLUE', name='alertseverity', create_type=False), nullable=False),
+    sa.Column('unresolved_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('doctor_id', 'severity')
+    )
+    # Doctor 0 holds the counts over all patients
+    op.execute(
+        "INSERT INTO alert_counters (doctor_id, severity, unresolved_count) "
+        "SELECT 0, severity, COUNT(*) FROM alerts "
+        "WHERE is_resolved = false AND severity IS NOT NULL GROUP BY severity"
+    )
+    op.execute(
+        "INSERT INTO alert_counters (doctor_id, severity, unresolved_count) "
+        "SELECT users.doctor_id, alerts.severity, COUNT(*) FROM alerts "
+        "JOIN users ON users.id = alerts.patient_id "
+        "WHERE alerts.is_resolved = false AND alerts.severity IS NOT NULL AND users.doctor_id IS NOT NULL "
+        "GROUP BY users.doctor_id, alerts.severity"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('alert_counters')
@@ -0,0 +1,114 @@
+"""Normalize disease thresholds to one row per vital sign
+
+Revision ID: b6e2d91f4a07
+Revises: 3c1f0b6e8d42
+Create Date: 2026-10-19 13:26:48.117203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e2d91f4a07'
+down_revision: Union[str, None] = '3c1f0b6e8d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (vital enum name, legacy column prefix, unit)
+LEGACY_VITALS = (
+    ('HEART_RATE', 'heart_rate', 'bpm'),
+    ('TEMPERATURE', 'temperature', '°C'),
+    ('SPO2', 'spo2', '%'),
+)
+
+vitalsign = sa.Enum('HEART_RATE', 'TEMPERATURE', 'SPO2', 'SYSTOLIC', 'DIASTOLIC', 'PULSE', name='vitalsign')
+alertseverity = sa.Enum('RED', 'YELLOW', 'BLUE', name='alertseverity', create_type=False)
+
+
+def upgrade() -> None:
+    # The table is small: read it, recreate it in the new layout and write it back
+    legacy_rows = op.get_bind().execute(sa.text(
+        "SELECT disease, heart_rate_min, heart_rate_max, temperature_min, temperature_max, "
+        "spo2_min, spo2_max, created_at, updated_at FROM disease_thresholds"
+    ).columns(created_at=sa.DateTime(timezone=True), updated_at=sa.DateTime(timezone=True))).mappings().all()
+    op.drop_index('ix_disease_thresholds_id', table_name='disease_thresholds')
+    op.drop_table('disease_thresholds')
+
+    thresholds = op.create_table('disease_thresholds',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('disease', sa.String(), nullable=False),
+    sa.Column('vital', vitalsign, nullable=False),
+    sa.Column('min_value', sa.Float(), nullable=False),
+    sa.Column('max_value', sa.Float(), nullable=False),
+    sa.Column('severity', alertseverity, nullable=False),
+    sa.Column('unit', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('disease', 'vital', name='uq_disease_thresholds_disease_vital')
+    )
+    op.create_index(op.f('ix_disease_thresholds_id'), 'disease_thresholds', ['id'], unique=False)
+    op.create_index(op.f('ix_disease_thresholds_disease'), 'disease_thresholds', ['disease'], unique=False)
+
+    # One row per vital that had a complete range; these ranges always raised red alerts
+    rows = [
+        {
+            'disease': row['disease'],
+            'vital': vital,
+            'min_value': row[f'{prefix}_min'],
+            'max_value': row[f'{prefix}_max'],
+            'severity': 'RED',
+            'unit': unit,
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+        }
+        for row in legacy_rows if row['disease']
+        for vital, prefix, unit in LEGACY_VITALS
+        if row[f'{prefix}_min'] is not None and row[f'{prefix}_max'] is not None
+    ]
+    if rows:
+        op.bulk_insert(thresholds, rows)
+
+
+def downgrade() -> None:
+    normalized_rows = op.get_bind().execute(sa.text(
+        "SELECT disease, vital, min_value, max_value, created_at FROM disease_thresholds"
+    ).columns(created_at=sa.DateTime(timezone=True))).mappings().all()
+    op.drop_index('ix_disease_thresholds_disease', table_name='disease_thresholds')
+    op.drop_index('ix_disease_thresholds_id', table_name='disease_thresholds')
+    op.drop_table('disease_thresholds')
+    vitalsign.drop(op.get_bind(), checkfirst=True)
+
+    thresholds = op.create_table('disease_thresholds',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('disease', sa.String(), nullable=True),
+    sa.Column('heart_rate_min', sa.Float(), nullable=True),
+    sa.Column('heart_rate_max', sa.Float(), nullable=True),
+    sa.Column('temperature_min', sa.Float(), nullable=True),
+    sa.Column('temperature_max', sa.Float(), nullable=True),
+    sa.Column('spo2_min', sa.Float(), nullable=True),
+    sa.Column('spo2_max', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('disease')
+    )
+    op.create_index(op.f('ix_disease_thresholds_id'), 'disease_thresholds', ['id'], unique=False)
+
+    # Vitals the wide layout has no columns for are lost on downgrade
+    prefixes = {vital: prefix for vital, prefix, _ in LEGACY_VITALS}
+    wide = {}
+    for row in normalized_rows:
+        entry = wide.setdefault(row['disease'], {'disease': row['disease'], 'created_at': row['created_at']})
+        prefix = prefixes.get(row['vital'])
+        if prefix:
+            entry[f'{prefix}_min'] = row['min_value']
+            entry[f'{prefix}_max'] = row['max_value']
+    if wide:
+        op.bulk_insert(thresholds, [
+            {**{f'{prefix}_{bound}': None for prefix in prefixes.values() for bound in ('min', 'max')}, **entry}
+            for entry in wide.values()
+        ])
@@ -0,0 +1,38 @@
+"""Add alert coalescing guard
+
+Revision ID: b8e2a6f4c391
+Revises: 9b3f5d1c7e20
+Create Date: 2026-10-20 11:40:03.954172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2a6f4c391'
+down_revision: Union[str, None] = '9b3f5d1c7e20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('alerts', sa.Column('coalescing', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    # The newest open alert of each key keeps absorbing repeats
+    op.execute(
+        "UPDATE alerts SET coalescing = true WHERE id IN ("
+        "SELECT max(id) FROM alerts WHERE is_resolved = false AND vital IS NOT NULL "
+        "GROUP BY patient_id, vital, severity)"
+    )
+    op.create_index(
+        'uq_alerts_coalescing_key', 'alerts', ['patient_id', 'vital', 'severity'], unique=True,
+        postgresql_where=sa.text('coalescing'),
+        sqlite_where=sa.text('coalescing'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_alerts_coalescing_key', table_name='alerts')
+    op.drop_column('alerts', 'coalescing')
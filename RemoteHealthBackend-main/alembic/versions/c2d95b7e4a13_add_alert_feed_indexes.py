@@ -0,0 +1,28 @@
+"""Add alert feed indexes
+
+Revision ID: c2d95b7e4a13
+Revises: a4c7e19d2f58
+Create Date: 2026-10-19 17:48:12.605271
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d95b7e4a13'
+down_revision: Union[str, None] = 'a4c7e19d2f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_alerts_created_at_id', 'alerts', ['created_at', 'id'], unique=False)
+    op.create_index(op.f('ix_users_doctor_id'), 'users', ['doctor_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_doctor_id'), table_name='users')
+    op.drop_index('ix_alerts_created_at_id', table_name='alerts')
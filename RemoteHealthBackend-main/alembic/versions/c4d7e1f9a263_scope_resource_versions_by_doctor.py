@@ -0,0 +1,60 @@
+"""Scope resource versions by doctor
+
+Revision ID: c4d7e1f9a263
+Revises: b8e2a6f4c391
+Create Date: 2026-10-20 14:22:48.617395
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d7e1f9a263'
+down_revision: Union[str, None] = 'b8e2a6f4c391'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _rebuild(columns, primary_key, primary_key_name, copy) -> None:
+    # The old table keeps its primary key name until dropped, hence a new one
+    op.create_table('resource_versions_new',
+    *columns,
+    sa.PrimaryKeyConstraint(*primary_key, name=primary_key_name)
+    )
+    op.execute(copy)
+    op.drop_table('resource_versions')
+    op.rename_table('resource_versions_new', 'resource_versions')
+
+
+def upgrade() -> None:
+    # Existing counters become the unattributed scope (0), so every version
+    # only grows and no ETag handed out before is produced again
+    _rebuild(
+        [
+            sa.Column('resource', sa.String(), nullable=False),
+            sa.Column('scope', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('version', sa.BigInteger(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        ],
+        ['resource', 'scope'],
+        'resource_versions_scope_pkey',
+        "INSERT INTO resource_versions_new (resource, scope, version, updated_at) "
+        "SELECT resource, 0, version, updated_at FROM resource_versions",
+    )
+
+
+def downgrade() -> None:
+    _rebuild(
+        [
+            sa.Column('resource', sa.String(), nullable=False),
+            sa.Column('version', sa.BigInteger(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        ],
+        ['resource'],
+        'resource_versions_pkey',
+        "INSERT INTO resource_versions_new (resource, version, updated_at) "
+        "SELECT resource, sum(version), max(updated_at) FROM resource_versions GROUP BY resource",
+    )
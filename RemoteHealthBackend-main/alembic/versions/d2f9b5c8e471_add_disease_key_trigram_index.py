@@ -0,0 +1,33 @@
+"""Add disease key trigram index
+
+Revision ID: d2f9b5c8e471
+Revises: c4d7e1f9a263
+Create Date: 2026-10-20 16:03:27.840512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f9b5c8e471'
+down_revision: Union[str, None] = 'c4d7e1f9a263'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Disease typeahead matches LIKE '%term%' on the keys patient tags reference
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_diseases_key_trgm "
+            "ON diseases USING gin (key gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_diseases_key_trgm")
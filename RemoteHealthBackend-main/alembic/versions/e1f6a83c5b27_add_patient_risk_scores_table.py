@@ -0,0 +1,39 @@
+"""Add patient risk scores table
+
+Revision ID: e1f6a83c5b27
+Revises: c2d95b7e4a13
+Create Date: 2026-10-19 18:31:07.442918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f6a83c5b27'
+down_revision: Union[str, None] = 'c2d95b7e4a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('patient_risk_scores',
+    sa.Column('patient_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('vitals_component', sa.Float(), nullable=False),
+    sa.Column('alerts_component', sa.Float(), nullable=False),
+    sa.Column('chronic_component', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['patient_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('patient_id')
+    )
+    op.create_index(op.f('ix_patient_risk_scores_score'), 'patient_risk_scores', ['score'], unique=False)
+    # Scores are filled lazily as patients are touched; backfill them all with
+    #   python -m app.services.risk_scoring
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_patient_risk_scores_score'), table_name='patient_risk_scores')
+    op.drop_table('patient_risk_scores')
@@ -0,0 +1,67 @@
+"""Add patient disease tags and name trigram index
+
+Revision ID: f3b8d2a6c914
+Revises: e1f6a83c5b27
+Create Date: 2026-10-19 19:12:40.108375
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d2a6c914'
+down_revision: Union[str, None] = 'e1f6a83c5b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app.services.patient_search.disease_tags()
+_DISEASE_SEPARATORS = re.compile(r"[,;/\n]+")
+_NO_DISEASE = {"", "none", "n/a", "na", "-", "no"}
+
+
+def _disease_tags(chronic_diseases):
+    if not chronic_diseases:
+        return set()
+    tags = {" ".join(name.lower().split()) for name in _DISEASE_SEPARATORS.split(chronic_diseases)}
+    return tags - _NO_DISEASE
+
+
+def upgrade() -> None:
+    tags_table = op.create_table('patient_disease_tags',
+    sa.Column('patient_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('tag', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['patient_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('patient_id', 'tag')
+    )
+    op.create_index(op.f('ix_patient_disease_tags_tag'), 'patient_disease_tags', ['tag'], unique=False)
+
+    connection = op.get_bind()
+    profiles = connection.execute(
+        sa.text("SELECT user_id, chronic_diseases FROM patient_profiles WHERE chronic_diseases IS NOT NULL")
+    )
+    rows = [
+        {"patient_id": user_id, "tag": tag}
+        for user_id, chronic_diseases in profiles
+        if user_id is not None
+        for tag in _disease_tags(chronic_diseases)
+    ]
+    if rows:
+        op.bulk_insert(tags_table, rows)
+
+    if connection.dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_patient_profiles_full_name_trgm "
+            "ON patient_profiles USING gin (full_name gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_patient_profiles_full_name_trgm")
+    op.drop_index(op.f('ix_patient_disease_tags_tag'), table_name='patient_disease_tags')
+    op.drop_table('patient_disease_tags')
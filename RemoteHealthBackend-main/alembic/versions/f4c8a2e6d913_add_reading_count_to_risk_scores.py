@@ -0,0 +1,27 @@
+"""Add reading count to patient risk scores
+
+Revision ID: f4c8a2e6d913
+Revises: d2f9b5c8e471
+Create Date: 2026-10-21 09:42:15.306174
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c8a2e6d913'
+down_revision: Union[str, None] = 'd2f9b5c8e471'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Advances per live reading from here on; only its steps are compared
+    op.add_column('patient_risk_scores', sa.Column('reading_count', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('patient_risk_scores', 'reading_count')
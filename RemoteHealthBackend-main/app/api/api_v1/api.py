@@ -1,13 +1,16 @@
 from fastapi import APIRouter
+from app.core.config import settings
 from app.api.api_v1.endpoints import (
     alerts,
     anomalies,
+    anomaly_rules,
     auth,
     doctors,
     location,
     messaging,
     notes,
     patient_records,
+    profiling,
     reminders,
     simulator,
     thresholds,
@@ -26,5 +29,8 @@ api_router.include_router(location.router, prefix="/location", tags=["location"]
 api_router.include_router(reminders.router, prefix="/reminders", tags=["reminders"])
 api_router.include_router(anomalies.router, prefix="/anomalies", tags=["anomalies"])
 api_router.include_router(thresholds.router, prefix="/disease-thresholds", tags=["disease-thresholds"])
+api_router.include_router(anomaly_rules.router, prefix="/anomaly-rules", tags=["anomaly-rules"])
 api_router.include_router(simulator.router, prefix="/simulator", tags=["simulator"]) 
-api_router.include_router(doctors.router, prefix="/doctors", tags=["doctors"]) 
\ No newline at end of file
+api_router.include_router(doctors.router, prefix="/doctors", tags=["doctors"])
+if settings.PROFILING_ENABLED:
+    api_router.include_router(profiling.router, prefix="/profiling", tags=["profiling"])
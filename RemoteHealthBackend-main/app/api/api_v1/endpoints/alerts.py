@@ -5,15 +5,18 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.api.responses import model_list_response, model_response
 from app.crud import alert as crud_alert
+from app.crud import alert_counters as crud_alert_counters
+from app.crud.crud_alert import FEED_SORTS
+from app.crud.crud_alert_counters import ALL_PATIENTS
 from app.crud import patients as crud_patients # To check patient existence
-from app.schemas.alert import Alert as AlertSchema, AlertCreate, AlertUpdate # Schemas
+from app.schemas.alert import Alert as AlertSchema, AlertBulkResolve, AlertBulkResolveResult, AlertCounts, AlertCreate, AlertFeedPage, AlertUpdate # Schemas
 from app.schemas.user import User as UserSchema
 from app.models.user_model import UserRole, User as UserModel
 from app.models.domain_models import Alert as AlertModel, AlertSeverity # Domain model & AlertSeverity
 
 logger = logging.getLogger(__name__) # Logger eklendi
-logging.basicConfig(level=logging.INFO) # Temel logging konfigürasyonu eklendi
 
 router = APIRouter()
 
@@ -28,29 +31,29 @@ def get_alerts_for_patient(
     active: bool = Query(False, description="Filter for active (unresolved) alerts only.")
 ):
     """Retrieve alerts for a specific patient."""
-    logger.info(f"API CALL: get_alerts_for_patient CALLED for patient_id: {patient_id} by user {current_user.email}")
+    logger.debug("API CALL: get_alerts_for_patient CALLED for patient_id: %s by user %s", patient_id, current_user.email)
 
     # Ensure patient exists - assuming patient_id is User.id and they are a patient.
     # Pay attention to whether the frontend sends User.id or PatientProfile.id as patient_id!
     # Current assumption: incoming patient_id is User.id
-    logger.info(f"Attempting to find user with User.id = {patient_id} and role PATIENT.")
+    logger.debug("Attempting to find user with User.id = %s and role PATIENT.", patient_id)
     target_patient_user = db.query(UserModel).filter(UserModel.id == patient_id, UserModel.role == UserRole.PATIENT).first()
     
     if not target_patient_user:
         logger.warning(f"Patient user with User.id = {patient_id} NOT FOUND or is not a PATIENT. Raising 404.")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Patient with user_id {patient_id} not found")
     
-    logger.info(f"Found patient user: {target_patient_user.email} (User.id={target_patient_user.id})")
+    logger.debug("Found patient user: %s (User.id=%s)", target_patient_user.email, target_patient_user.id)
 
     # Authorization
     # A patient can see their own alerts. A doctor or superuser can see any patient's alerts.
     can_view = False
     if current_user.id == target_patient_user.id: # Patient viewing their own
         can_view = True
-        logger.info(f"User {current_user.email} is viewing their own alerts.")
+        logger.debug("User %s is viewing their own alerts.", current_user.email)
     elif current_user.role == UserRole.DOCTOR or current_user.is_superuser: # Doctor/Superuser viewing
         can_view = True
-        logger.info(f"User {current_user.email} (Role: {current_user.role}) is authorized to view alerts for patient {target_patient_user.email}.")
+        logger.debug("User %s (Role: %s) is authorized to view alerts for patient %s.", current_user.email, current_user.role, target_patient_user.email)
     
     if not can_view:
         logger.warning(f"User {current_user.email} is NOT AUTHORIZED to view alerts for patient {target_patient_user.email}. Raising 403.")
@@ -62,15 +65,15 @@ def get_alerts_for_patient(
     # Does the crud_alert.get_alerts_by_patient_id function expect User.id as patient_id? This is important.
     # If it expects PatientProfile.id, a value like target_patient_user.patient_profile.id should be passed (if such a relationship exists).
     # For now, we proceed with User.id (i.e., the incoming patient_id).
-    logger.info(f"Fetching alerts from CRUD using patient_id(User.id): {target_patient_user.id}, skip: {skip}, limit: {limit}, active: {active}")
+    logger.debug("Fetching alerts from CRUD using patient_id(User.id): %s, skip: %s, limit: %s, active: %s", target_patient_user.id, skip, limit, active)
     alerts = crud_alert.get_alerts_by_patient_id(db, patient_id=target_patient_user.id, skip=skip, limit=limit, only_active=active)
     
     if not alerts:
-        logger.info(f"No alerts found in CRUD for patient_id(User.id): {target_patient_user.id}. Returning empty list with 200 OK.")
+        logger.debug("No alerts found in CRUD for patient_id(User.id): %s. Returning empty list with 200 OK.", target_patient_user.id)
         return [] # If the patient exists but has no alerts, return an empty list and 200 OK. The previous 404 was removed.
         
-    logger.info(f"Returning {len(alerts)} alerts for patient_id(User.id): {target_patient_user.id}.")
-    return alerts
+    logger.debug("Returning %s alerts for patient_id(User.id): %s.", len(alerts), target_patient_user.id)
+    return model_list_response(AlertSchema, alerts)
 
 @router.get("/", response_model=List[AlertSchema])
 def get_all_alerts_enhanced(
@@ -80,6 +83,7 @@ def get_all_alerts_enhanced(
     skip: int = 0,
     limit: int = 100,
     patient_id: Optional[int] = Query(None, description="Filter by patient User ID"),
+    disease: Optional[str] = Query(None, description="Only alerts of patients with this chronic disease"),
     severity: Optional[AlertSeverity] = Query(None, description="Filter by alert severity (red, yellow, blue)"),
     start_date: Optional[datetime] = Query(None, description="Filter alerts created on or after this date (ISO format YYYY-MM-DDTHH:MM:SS)"),
     end_date: Optional[datetime] = Query(None, description="Filter alerts created on or before this date (ISO format YYYY-MM-DDTHH:MM:SS)"),
@@ -95,13 +99,85 @@ def get_all_alerts_enhanced(
         skip=skip,
         limit=limit,
         patient_id_filter=patient_id,
+        disease_filter=disease or None,
         severity_filter=severity,
         start_date_filter=start_date,
         end_date_filter=end_date,
         is_resolved_filter=is_resolved,
         sort_by=sort_by
     )
-    return alerts
+    return model_list_response(AlertSchema, alerts)
+
+@router.get("/feed", response_model=AlertFeedPage)
+def get_alert_feed(
+    *,
+    db: Session = Depends(deps.get_db),
+    current_user: UserSchema = Depends(deps.get_current_healthcare_provider),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    doctor_id: Optional[int] = Query(None, description="Admin only: alerts of this doctor's patients instead of all patients"),
+    patient_id: Optional[int] = Query(None, description="Filter by patient User ID"),
+    disease: Optional[str] = Query(None, description="Only alerts of patients with this chronic disease"),
+    severity: Optional[AlertSeverity] = Query(None, description="Filter by alert severity (red, yellow, blue)"),
+    start_date: Optional[datetime] = Query(None, description="Filter alerts created on or after this date (ISO format YYYY-MM-DDTHH:MM:SS)"),
+    end_date: Optional[datetime] = Query(None, description="Filter alerts created on or before this date (ISO format YYYY-MM-DDTHH:MM:SS)"),
+    is_resolved: Optional[bool] = Query(None, description="Filter by resolution status (True for resolved, False for unresolved)"),
+    sort_by: str = Query("created_at_desc", description="Sort alerts by: created_at_desc, created_at_asc, severity_desc, severity_asc (clinical priority)")
+):
+    """
+    Alert feed of the current doctor's patients (admins: all patients, or one
+    doctor's with `doctor_id`), with keyset pagination. Doctor/Admin only.
+    """
+    if sort_by not in FEED_SORTS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"sort_by must be one of: {', '.join(FEED_SORTS)}")
+    if current_user.role == UserRole.DOCTOR and not current_user.is_superuser:
+        if doctor_id is not None and doctor_id != current_user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view another doctor's alerts")
+        doctor_id = current_user.id
+
+    try:
+        alerts, next_cursor = crud_alert.get_feed(
+            db,
+            doctor_id=doctor_id,
+            limit=limit,
+            cursor=cursor,
+            patient_id_filter=patient_id,
+            disease_filter=disease or None,
+            severity_filter=severity,
+            start_date_filter=start_date,
+            end_date_filter=end_date,
+            is_resolved_filter=is_resolved,
+            sort_by=sort_by,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor: {e}")
+    return model_response(AlertFeedPage, {"alerts": alerts, "next_cursor": next_cursor})
+
+@router.get("/counts", response_model=AlertCounts)
+def get_unresolved_alert_counts(
+    *,
+    db: Session = Depends(deps.get_db),
+    current_user: UserSchema = Depends(deps.get_current_healthcare_provider),
+    doctor_id: Optional[int] = Query(None, description="Admin only: counts for this doctor's patients instead of all patients"),
+):
+    """
+    Unresolved alerts per severity, read from the materialized counters.
+    Doctors get their own patients' counts; admins get all patients' counts,
+    or one doctor's with `doctor_id`.
+    """
+    if current_user.role == UserRole.DOCTOR and not current_user.is_superuser:
+        if doctor_id is not None and doctor_id != current_user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view another doctor's alert counts")
+        doctor_id = current_user.id
+
+    counts = crud_alert_counters.get_counts(db, doctor_id=doctor_id if doctor_id is not None else ALL_PATIENTS)
+    return AlertCounts(
+        doctor_id=doctor_id,
+        red=counts[AlertSeverity.RED],
+        yellow=counts[AlertSeverity.YELLOW],
+        blue=counts[AlertSeverity.BLUE],
+        total=sum(counts.values()),
+    )
 
 # Placeholder for POST /alerts if needed later (e.g. system generated alerts not tied to a specific user action via API)
 # @router.post("/", response_model=AlertSchema, status_code=status.HTTP_201_CREATED)
@@ -125,4 +201,45 @@ def resolve_alert_endpoint(
         # This state might indicate an issue if it was expected to be resolved and wasn't.
         # However, resolve_alert CRUD returns the object, so we check its state.
         pass # Already handled by returning the object from CRUD.
-    return resolved_alert 
\ No newline at end of file
+    return resolved_alert 
+
+@router.post("/resolve", response_model=AlertBulkResolveResult)
+def bulk_resolve_alerts(
+    resolve_in: AlertBulkResolve,
+    db: Session = Depends(deps.get_db),
+    current_user: UserModel = Depends(deps.get_current_active_user)
+):
+    """
+    Resolve many alerts at once: the given `alert_ids`, or every unresolved
+    alert matching `patient_id`, `severity` and `before` (created before).
+    Criteria combine. Already resolved alerts are skipped. Doctors only
+    resolve alerts of their own patients. Doctor/Admin only.
+    """
+    if not (current_user.role == UserRole.DOCTOR or current_user.is_superuser):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to resolve alerts")
+    doctor_id = current_user.id if not current_user.is_superuser else None
+
+    resolved = crud_alert.resolve_many(
+        db,
+        alert_ids=resolve_in.alert_ids,
+        patient_id=resolve_in.patient_id,
+        severity=resolve_in.severity,
+        before=resolve_in.before,
+        doctor_id=doctor_id,
+    )
+    by_severity = {}
+    for _, _, severity in resolved:
+        by_severity[severity] = by_severity.get(severity, 0) + 1
+    result = AlertBulkResolveResult(
+        resolved=len(resolved),
+        alert_ids=[alert_id for alert_id, _, _ in resolved],
+        by_severity=by_severity,
+        patient_ids=sorted({patient_id for _, patient_id, _ in resolved}),
+    )
+    # One consolidated event for the whole batch instead of one per alert
+    logger.info(
+        f"User {current_user.email} bulk-resolved {result.resolved} alerts "
+        f"({', '.join(f'{severity.name}: {count}' for severity, count in by_severity.items()) or 'none'}) "
+        f"for {len(result.patient_ids)} patients."
+    )
+    return result
@@ -0,0 +1,93 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+from app.api import deps
+from app import crud, schemas
+from app.schemas.anomaly_rule import AnomalyRule, AnomalyRuleCreate, AnomalyRuleUpdate
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[AnomalyRule])
+@router.get("", response_model=List[AnomalyRule])
+def get_anomaly_rules(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.User = Depends(deps.get_current_healthcare_provider),
+):
+    """
+    Retrieve all anomaly rules, active or not. Doctor/Admin only.
+    """
+    return crud.anomaly_rules.get_multi(db, skip=skip, limit=limit)
+
+@router.get("/{rule_id}", response_model=AnomalyRule)
+def get_anomaly_rule(
+    rule_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.User = Depends(deps.get_current_healthcare_provider),
+):
+    """
+    Retrieve a specific anomaly rule. Doctor/Admin only.
+    """
+    rule = crud.anomaly_rules.get(db, id=rule_id)
+    if not rule:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Anomaly rule not found")
+    return rule
+
+@router.post("/", response_model=AnomalyRule, status_code=status.HTTP_201_CREATED)
+def create_anomaly_rule(
+    rule_in: AnomalyRuleCreate,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.User = Depends(deps.get_current_healthcare_provider),
+):
+    """
+    Create an anomaly rule. It takes effect on the next compiled plan refresh
+    of each worker (immediately on this one). Doctor/Admin only.
+    """
+    if crud.anomaly_rules.get_by_name(db, name=rule_in.name):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"An anomaly rule named '{rule_in.name}' already exists"
+        )
+    rule = crud.anomaly_rules.create(db, obj_in=rule_in)
+    logger.info(f"User {current_user.email} created anomaly rule {rule.id} ({rule.name})")
+    return rule
+
+@router.put("/{rule_id}", response_model=AnomalyRule)
+def update_anomaly_rule(
+    rule_id: int,
+    rule_in: AnomalyRuleUpdate,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.User = Depends(deps.get_current_healthcare_provider),
+):
+    """
+    Update an anomaly rule. Doctor/Admin only.
+    """
+    rule = crud.anomaly_rules.get(db, id=rule_id)
+    if not rule:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Anomaly rule not found")
+    if rule_in.name is not None and rule_in.name != rule.name and crud.anomaly_rules.get_by_name(db, name=rule_in.name):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"An anomaly rule named '{rule_in.name}' already exists"
+        )
+    return crud.anomaly_rules.update(db, db_obj=rule, obj_in=rule_in)
+
+@router.delete("/{rule_id}")
+def delete_anomaly_rule(
+    rule_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.User = Depends(deps.get_current_healthcare_provider),
+):
+    """
+    Delete an anomaly rule. Doctor/Admin only.
+    """
+    rule = crud.anomaly_rules.get(db, id=rule_id)
+    if not rule:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Anomaly rule not found")
+    crud.anomaly_rules.remove(db, id=rule_id)
+    return {"message": "Anomaly rule deleted successfully"}
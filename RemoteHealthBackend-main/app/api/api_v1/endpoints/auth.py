@@ -1,3 +1,4 @@
+import logging
 from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -12,6 +13,8 @@ from app.schemas.user import AuthResponse, User as UserSchema
 from app.models import User as UserModel
 from app.models.user_model import UserRole
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.post("/register", response_model=AuthResponse)
@@ -103,7 +106,7 @@ def read_users_me(
 
 @router.get("/me2")
 def test_me2_in_auth_router():
-    print("DEBUG: MINIMAL /auth/me2 STARTING NOW")
+    logger.debug("MINIMAL /auth/me2 STARTING NOW")
     return {"message": "Minimal /auth/me2 reached"}
 
 @router.get("/check-email")
@@ -1,9 +1,11 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
 from app import crud, models
-from app.api import deps
+from app.api import deps, http_cache
+from app.api.responses import model_list_response
+from app.crud.crud_resource_versions import ALERTS, PATIENTS, VITALS
 from app.schemas.patient import PatientDataResponse
 from app.models.user_model import UserRole
 
@@ -18,6 +20,7 @@ router = APIRouter()
 )
 def get_my_patients(
     *,
+    request: Request,
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -30,32 +33,15 @@ def get_my_patients(
             detail="Only doctors can access their assigned patients.",
         )
 
-    patient_profiles = crud.patients.get_by_doctor_id(db, doctor_id=current_user.id)
+    validators = http_cache.for_resources(
+        db, request, (PATIENTS, VITALS, ALERTS), scope=current_user.id, doctor_id=current_user.id,
+    )
+    if validators.fresh(request):
+        return validators.not_modified()
 
-    response_list = []
-    for profile_model in patient_profiles:
-        user_model = (
-            db.query(models.User)
-            .filter(models.User.id == profile_model.user_id)
-            .first()
-        )
-        if user_model:
-            response_data = {
-                "id": profile_model.id,
-                "user_id": profile_model.user_id,
-                "email": user_model.email,
-                "role": user_model.role,
-                "full_name": profile_model.full_name,
-                "age": profile_model.age,
-                "chronic_diseases": profile_model.chronic_diseases,
-                "date_of_birth": profile_model.date_of_birth,
-                "gender": profile_model.gender,
-                "address": profile_model.address,
-                "phone_number": profile_model.phone_number,
-                "risk_score": None,
-                "created_at": profile_model.created_at,
-                "updated_at": profile_model.updated_at,
-            }
-            response_list.append(PatientDataResponse(**response_data))
-
-    return response_list 
\ No newline at end of file
+    # Highest risk first
+    rows = crud.patients.get_multi_by_risk(
+        db, doctor_id=current_user.id, with_profile_only=True, limit=None
+    )
+
+    return validators.tag(model_list_response(PatientDataResponse, rows)) 
\ No newline at end of file
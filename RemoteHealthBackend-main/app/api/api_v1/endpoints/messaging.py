@@ -1,11 +1,16 @@
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from app import crud, schemas, models
 from app.api import deps
+from app.api.responses import model_list_response
 from app.models.user_model import UserRole # For role comparisons
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.get("/partners", response_model=List[schemas.message.ChatPartner])
@@ -18,7 +23,7 @@ def get_chat_partners(
     """
     # The CRUD method already handles role-based logic
     partners = crud.message.get_chat_partners(db, current_user=current_user)
-    return partners
+    return model_list_response(schemas.message.ChatPartner, partners)
 
 @router.get("/messages/{partner_id}", response_model=List[schemas.message.Message])
 def get_conversation_messages(
@@ -30,22 +35,22 @@ def get_conversation_messages(
     Get all messages between the current user and a partner.
     Messages are ordered from oldest to newest.
     """
-    print(f"DEBUG: get_conversation_messages called for current_user ID={current_user.id} and partner_id={partner_id}") # DEBUG
+    logger.debug("get_conversation_messages called for current_user ID=%s and partner_id=%s", current_user.id, partner_id)
     partner = crud.user.get(db, id=partner_id)
     if not partner:
-        print(f"DEBUG: Partner with id={partner_id} NOT FOUND by crud.user.get. Raising 404.") # DEBUG
+        logger.debug("Partner with id=%s NOT FOUND by crud.user.get. Raising 404.", partner_id)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Partner not found")
     
-    print(f"DEBUG: Partner with id={partner_id} FOUND: Name={partner.first_name} {partner.last_name}, Role={partner.role}") # DEBUG
+    logger.debug("Partner with id=%s FOUND: Role=%s", partner_id, partner.role)
 
     messages = crud.message.get_messages_by_conversation(
         db, user_id=current_user.id, partner_id=partner_id
     )
-    print(f"DEBUG: Found {len(messages)} messages in conversation between user {current_user.id} and partner {partner_id}.") # DEBUG
+    logger.debug("Found %s messages in conversation between user %s and partner %s.", len(messages), current_user.id, partner_id)
     
     # With eager loading in CRUD and properties in ORM model,
     # Pydantic schema should pick up sender_role and receiver_role automatically.
-    return [schemas.message.Message.model_validate(msg_model) for msg_model in messages]
+    return model_list_response(schemas.message.Message, messages)
 
 @router.post("/messages", response_model=schemas.message.Message, status_code=status.HTTP_201_CREATED)
 def send_message(
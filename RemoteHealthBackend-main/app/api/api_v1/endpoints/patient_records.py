@@ -1,14 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func # Added func
 from typing import List, Optional
-from app.api import deps
-from app.schemas.patient import PatientDataResponse, Vitals as VitalsSchema, VitalsCreate
+from datetime import datetime, time, timezone
+from app.api import deps, http_cache
+from app.api.responses import FastJSONResponse, model_list_response, model_response
+from app.schemas.patient import DiseaseCohort, PatientDataResponse, PatientSuggestion, PatientTypeahead, Vitals as VitalsSchema, VitalsCreate, VitalsImportSummary
 from app.schemas.user import User as UserSchema
 from app.crud import patients as crud_patients_obj
 from app.crud import vitals as crud_vitals
+from app.crud import alert as crud_alert
+from app.crud import alert_counters as crud_alert_counters
+from app.crud import diseases as crud_diseases
+from app.crud.crud_resource_versions import ALERTS, PATIENTS, VITALS
 from app.models.user_model import UserRole, User as UserModel
+from app.models.domain_models import AlertSeverity
 from app import models, schemas
+from app.services import patient_search, result_cache, risk_scoring, vitals_export, vitals_import
+from app.services.vitals_export import ExportFormat, HistoryFormat
+from app.services.vitals_import import ImportFormat
 import logging # Add logging
 
 logger = logging.getLogger(__name__) # Re-enable logger instance
@@ -46,23 +57,26 @@ async def read_patient_profile_me(
         "gender": patient_profile_model.gender,
         "address": patient_profile_model.address,
         "phone_number": patient_profile_model.phone_number,
-        "risk_score": None, 
+        "risk_score": risk_scoring.get_score(db, current_user.id),
         "created_at": patient_profile_model.created_at,
         "updated_at": patient_profile_model.updated_at,
     }
 
     try:
-        validated_response = PatientDataResponse(**response_data)
-        return validated_response
+        return model_response(PatientDataResponse, response_data)
     except Exception as e:
         logger.error(f"API: /me - Pydantic Validation or other error for user {current_user.email} while creating PatientDataResponse: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing patient profile: {str(e)}")
 
 @router.get("/", response_model=List[PatientDataResponse])
 def read_all_patient_profiles(
+    request: Request,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    name: Optional[str] = Query(None, description="Substring of the patient's full name"),
+    chronic_disease: Optional[str] = Query(None, description="Chronic disease tag, e.g. 'diabetes'"),
+    alarm_severity: Optional[AlertSeverity] = Query(None, description="Only patients with an open alert of this severity"),
     current_user: UserSchema = Depends(deps.get_current_active_user),
 ):
     """
@@ -76,61 +90,76 @@ def read_all_patient_profiles(
             detail="Not authorized to access patient profiles.",
         )
     
-    user_db = db.query(UserModel).options(joinedload(UserModel.patients)).filter(UserModel.id == current_user.id).first()
-    if not user_db:
-        raise HTTPException(status_code=404, detail="Current user not found in database.")
+    # Doctors see all their patients, admins every patient with a profile; highest risk first
+    doctor_id = current_user.id if current_user.role == UserRole.DOCTOR else None
 
-    patients_to_return = []
-    if user_db.role == UserRole.DOCTOR:
-        patients_to_return = user_db.patients
-    elif user_db.role == UserRole.ADMIN or user_db.is_superuser:
-        all_users_with_profiles = db.query(UserModel).options(joinedload(UserModel.patient_profile)).filter(UserModel.patient_profile != None).all()
-        patients_to_return = all_users_with_profiles
-
-    paginated_patients = patients_to_return[skip : skip + limit]
-
-    response_list = []
-    for patient_user in paginated_patients:
-        # The user object is the patient, fetch their profile
-        profile_model = db.query(models.PatientProfile).filter(models.PatientProfile.user_id == patient_user.id).first()
-        if profile_model:
-            response_data = {
-                "id": profile_model.id,
-                "user_id": patient_user.id,
-                "email": patient_user.email,
-                "role": patient_user.role,
-                "full_name": profile_model.full_name,
-                "age": profile_model.age,
-                "chronic_diseases": profile_model.chronic_diseases,
-                "date_of_birth": profile_model.date_of_birth,
-                "gender": profile_model.gender,
-                "address": profile_model.address,
-                "phone_number": profile_model.phone_number,
-                "risk_score": None,
-                "created_at": profile_model.created_at,
-                "updated_at": profile_model.updated_at,
-            }
-        else:
-            # If no profile, create a response with basic user info
-            response_data = {
-                "id": None,
-                "user_id": patient_user.id,
-                "email": patient_user.email,
-                "role": patient_user.role,
-                "full_name": f"{patient_user.first_name} {patient_user.last_name}",
-                "age": None,
-                "chronic_diseases": None,
-                "date_of_birth": None,
-                "gender": None,
-                "address": None,
-                "phone_number": None,
-                "risk_score": None,
-                "created_at": None, # No profile, so no creation date for it
-                "updated_at": None,
-            }
-            response_list.append(PatientDataResponse(**response_data))
-            
-    return response_list
+    # Risk ordering and the alarm filter make the list depend on vitals and alerts too
+    validators = http_cache.for_resources(
+        db, request, (PATIENTS, VITALS, ALERTS), scope=current_user.id, doctor_id=doctor_id,
+    )
+    if validators.fresh(request):
+        return validators.not_modified()
+
+    rows = crud_patients_obj.get_multi_by_risk(
+        db,
+        doctor_id=doctor_id,
+        name_search=name,
+        chronic_disease_filter=chronic_disease,
+        alarm_severity_filter=alarm_severity,
+        skip=skip,
+        limit=limit,
+    )
+
+    # Rows carry the PatientDataResponse fields, including a fallback name for patients without a profile
+    return validators.tag(model_list_response(PatientDataResponse, rows))
+
+@router.get("/typeahead", response_model=PatientTypeahead)
+def patient_typeahead(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(deps.get_db),
+    current_user: UserSchema = Depends(deps.get_current_active_user),
+):
+    """
+    Name and chronic disease suggestions for partial input. Doctors only see
+    their own patients. Served from the trigram index (pg_trgm on PostgreSQL,
+    in-process otherwise).
+    """
+    if not (current_user.role in [UserRole.DOCTOR, UserRole.ADMIN] or current_user.is_superuser):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to search patients.",
+        )
+    doctor_id = current_user.id if current_user.role == UserRole.DOCTOR else None
+    matches = patient_search.suggest_patients(db, q, doctor_id=doctor_id, limit=limit)
+    return PatientTypeahead(
+        patients=[
+            PatientSuggestion(user_id=user_id, profile_id=profile_id, full_name=full_name)
+            for user_id, profile_id, full_name in matches
+        ],
+        diseases=patient_search.suggest_diseases(db, q, limit=limit),
+    )
+
+@router.get("/diseases", response_model=List[DiseaseCohort])
+def list_disease_cohorts(
+    db: Session = Depends(deps.get_db),
+    current_user: UserSchema = Depends(deps.get_current_active_user),
+):
+    """
+    The chronic disease dictionary with the number of patients having each
+    disease (a doctor's own patients, or all patients for admins).
+    """
+    if not (current_user.role in [UserRole.DOCTOR, UserRole.ADMIN] or current_user.is_superuser):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access disease cohorts.",
+        )
+    doctor_id = current_user.id if current_user.role == UserRole.DOCTOR else None
+    counts = crud_diseases.counts(db, doctor_id=doctor_id)
+    return [
+        DiseaseCohort(id=disease.id, key=disease.key, name=disease.name, patient_count=counts.get(disease.key, 0))
+        for disease in crud_diseases.get_multi(db)
+    ]
 
 @router.get("/{patient_id}", response_model=PatientDataResponse)
 def read_patient_profile_by_id(
@@ -176,11 +205,11 @@ def read_patient_profile_by_id(
         "gender": profile_model.gender,
         "address": profile_model.address,
         "phone_number": profile_model.phone_number,
-        "risk_score": None,
+        "risk_score": risk_scoring.get_score(db, profile_model.user_id),
         "created_at": profile_model.created_at,
         "updated_at": profile_model.updated_at,
     }
-    return PatientDataResponse(**response_data)
+    return model_response(PatientDataResponse, response_data)
 
 @router.get("/user/{user_id}", response_model=PatientDataResponse)
 def read_patient_profile_by_user_id(
@@ -216,10 +245,11 @@ def read_patient_profile_by_user_id(
             "email": user_model.email,
             "role": user_model.role,
             "full_name": f"{user_model.first_name} {user_model.last_name}",
+            "risk_score": risk_scoring.get_score(db, user_model.id),
             "created_at": None, # No profile, so no timestamps
             "updated_at": None,
         }
-        return PatientDataResponse(**response_data)
+        return model_response(PatientDataResponse, response_data)
 
     # If profile exists, return full data
     response_data = {
@@ -234,11 +264,11 @@ def read_patient_profile_by_user_id(
         "gender": profile_model.gender,
         "address": profile_model.address,
         "phone_number": profile_model.phone_number,
-        "risk_score": None,
+        "risk_score": risk_scoring.get_score(db, profile_model.user_id),
         "created_at": profile_model.created_at,
         "updated_at": profile_model.updated_at,
     }
-    return PatientDataResponse(**response_data)
+    return model_response(PatientDataResponse, response_data)
 
 @router.get("/{patient_id}/vitals", response_model=List[VitalsSchema])
 def read_patient_vitals(
@@ -247,9 +277,19 @@ def read_patient_vitals(
     patient_id: int,
     current_user: UserSchema = Depends(deps.get_current_active_user),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    format: HistoryFormat = Query(
+        HistoryFormat.ROWS,
+        description="rows (one object per reading), columnar (one array per field) or arrow (Arrow IPC stream)",
+    ),
 ):
-    """Retrieve vital signs for a specific patient."""
+    """
+    Retrieve vital signs for a specific patient, newest first.
+
+    `format=columnar` returns `{"id": [...], "timestamp": [...], "heart_rate": [...], ...}`
+    with the i-th reading at index i of every array; `format=arrow` returns the same
+    columns as an Arrow IPC stream (when pyarrow is installed).
+    """
     target_user = db.query(models.User).filter(models.User.id == patient_id, models.User.role == UserRole.PATIENT).first()
     if not target_user:
          raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Patient with user_id {patient_id} not found")
@@ -262,10 +302,132 @@ def read_patient_vitals(
             current_user.is_superuser):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view these vitals")
     
-    db_vitals_models = crud_vitals.get_vitals_by_patient_id(db, patient_id=target_user_id, skip=skip, limit=limit)
-    # Serialize to Pydantic schema before printing to see what frontend should get
-    serialized_vitals = [VitalsSchema.model_validate(vital_model) for vital_model in db_vitals_models]
-    return db_vitals_models
+    if format == HistoryFormat.ROWS:
+        db_vitals_models = crud_vitals.get_vitals_by_patient_id(db, patient_id=target_user_id, skip=skip, limit=limit)
+        return model_list_response(VitalsSchema, db_vitals_models)
+
+    if format == HistoryFormat.ARROW and not vitals_export.pyarrow_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Arrow responses are not available on this server.",
+        )
+    columns = crud_vitals.get_vitals_columns_by_patient_id(db, patient_id=target_user_id, skip=skip, limit=limit)
+    if format == HistoryFormat.COLUMNAR:
+        return FastJSONResponse(columns)
+    return Response(vitals_export.encode_arrow(columns), media_type=vitals_export.ARROW_STREAM_MEDIA_TYPE)
+
+def _vitals_export_response(
+    export_format: ExportFormat,
+    filename: str,
+    patient_ids: Optional[List[int]],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    *,
+    doctor_id: Optional[int] = None,
+) -> StreamingResponse:
+    if export_format == ExportFormat.PARQUET and not vitals_export.pyarrow_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parquet export is not available on this server.",
+        )
+    return StreamingResponse(
+        vitals_export.stream_vitals(
+            export_format,
+            patient_ids=patient_ids,
+            doctor_id=doctor_id,
+            start_date=start_date,
+            end_date=end_date,
+        ),
+        media_type=vitals_export.MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'},
+    )
+
+@router.get("/vitals/export")
+def export_cohort_vitals(
+    *,
+    db: Session = Depends(deps.get_db),
+    current_user: UserSchema = Depends(deps.get_current_active_user),
+    format: ExportFormat = Query(ExportFormat.CSV, description="Export format: csv, ndjson or parquet"),
+    doctor_id: Optional[int] = Query(None, description="Admins only: export this doctor's patients. Omit to export every patient."),
+    start_date: Optional[datetime] = Query(None, description="Only readings taken on or after this date (ISO format YYYY-MM-DDTHH:MM:SS)"),
+    end_date: Optional[datetime] = Query(None, description="Only readings taken on or before this date (ISO format YYYY-MM-DDTHH:MM:SS)"),
+):
+    """
+    Stream the vital sign history of a doctor's patient cohort.
+    Doctors always export their own patients; admins can pick a doctor or export everything.
+    """
+    if current_user.role == UserRole.DOCTOR:
+        cohort_doctor_id = current_user.id
+    elif current_user.role == UserRole.ADMIN or current_user.is_superuser:
+        cohort_doctor_id = doctor_id
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to export cohort vitals.",
+        )
+
+    filename = "vitals_all_patients"
+    if cohort_doctor_id is not None:
+        filename = f"vitals_doctor_{cohort_doctor_id}"
+
+    return _vitals_export_response(format, filename, None, start_date, end_date, doctor_id=cohort_doctor_id)
+
+@router.post("/vitals/import", response_model=VitalsImportSummary)
+def import_vitals(
+    *,
+    db: Session = Depends(deps.get_db),
+    current_user: UserSchema = Depends(deps.get_current_active_user),
+    file: UploadFile = File(..., description="CSV or NDJSON file with one reading per row"),
+    format: Optional[ImportFormat] = Query(None, description="csv or ndjson; detected from the file name when omitted"),
+    patient_id: Optional[int] = Query(None, description="Assign every row to this patient User ID instead of a patient_id column"),
+    evaluate_anomalies: bool = Query(True, description="Run anomaly detection over the imported rows once loading finishes"),
+):
+    """
+    Bulk import historical vital signs. Rows are validated in batches; invalid rows
+    are skipped and reported in the summary. Accessible only by DOCTOR, ADMIN, or superuser.
+    """
+    if not (current_user.role in [UserRole.DOCTOR, UserRole.ADMIN] or current_user.is_superuser):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to import vitals.",
+        )
+
+    import_format = format or vitals_import.detect_format(file.filename)
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not detect the file format from the file name, pass format=csv or format=ndjson.",
+        )
+
+    return vitals_import.import_vitals(
+        db,
+        file.file,
+        import_format,
+        patient_id=patient_id,
+        evaluate_anomalies=evaluate_anomalies,
+    )
+
+@router.get("/{patient_id}/vitals/export")
+def export_patient_vitals(
+    *,
+    db: Session = Depends(deps.get_db),
+    patient_id: int,
+    current_user: UserSchema = Depends(deps.get_current_active_user),
+    format: ExportFormat = Query(ExportFormat.CSV, description="Export format: csv, ndjson or parquet"),
+    start_date: Optional[datetime] = Query(None, description="Only readings taken on or after this date (ISO format YYYY-MM-DDTHH:MM:SS)"),
+    end_date: Optional[datetime] = Query(None, description="Only readings taken on or before this date (ISO format YYYY-MM-DDTHH:MM:SS)"),
+):
+    """Stream the full vital sign history of a patient as CSV, NDJSON or Parquet."""
+    target_user = db.query(models.User).filter(models.User.id == patient_id, models.User.role == UserRole.PATIENT).first()
+    if not target_user:
+         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Patient with user_id {patient_id} not found")
+
+    if not (current_user.id == target_user.id or \
+            current_user.role in [UserRole.DOCTOR, UserRole.ADMIN] or \
+            current_user.is_superuser):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to export these vitals")
+
+    return _vitals_export_response(format, f"vitals_patient_{patient_id}", [patient_id], start_date, end_date)
 
 @router.post("/{patient_id}/vitals", response_model=VitalsSchema, status_code=status.HTTP_201_CREATED)
 def create_patient_vital(
@@ -286,7 +448,7 @@ def create_patient_vital(
         )
 
     # Call the new centralized function in crud_vitals
-    vital = crud_vitals.vitals.create_and_check(db=db, obj_in=vital_in, patient_id=patient_id)
+    vital = crud_vitals.create_and_check(db=db, obj_in=vital_in, patient_id=patient_id)
 
     return vital
 
@@ -296,8 +458,11 @@ def ping_patients_router():
 
 @router.get("/clinical-overview/stats")
 def get_clinical_overview_statistics(
+    request: Request,
+    response: Response,
     db: Session = Depends(deps.get_db),
     current_user: UserSchema = Depends(deps.get_current_active_user),
+    disease: Optional[str] = Query(None, description="Restrict the statistics to patients with this chronic disease"),
 ):
     """
     Retrieve aggregated statistics for the clinical overview dashboard.
@@ -308,9 +473,27 @@ def get_clinical_overview_statistics(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access clinical overview statistics.",
         )
-    
+
+    # Polled by the dashboard: unchanged patients and alerts skip the aggregates
+    validators = http_cache.for_resources(
+        db, request, (PATIENTS, ALERTS), scope=current_user.id,
+        doctor_id=current_user.id if current_user.role == UserRole.DOCTOR else None,
+    )
+    if validators.fresh(request):
+        return validators.not_modified()
+    validators.tag(response)
+
+    return result_cache.get_or_compute(
+        "clinical_overview_stats",
+        scope=current_user.id,
+        params={"disease": disease},
+        versions=validators.versions,
+        compute=lambda: _clinical_overview_statistics(db, current_user.id, disease),
+    )
+
+def _clinical_overview_statistics(db: Session, user_id: int, disease: Optional[str]) -> dict:
     # Fetch the full user object from the DB to access relationships
-    user_db = db.query(UserModel).filter(UserModel.id == current_user.id).first()
+    user_db = db.query(UserModel).filter(UserModel.id == user_id).first()
     if not user_db:
         raise HTTPException(status_code=404, detail="Current user not found in database.")
 
@@ -319,21 +502,33 @@ def get_clinical_overview_statistics(
     warning_alerts = 0
 
     if user_db.role == UserRole.DOCTOR:
-        # Correctly count patients via the relationship
-        total_patients = len(user_db.patients)
-        
-        patient_ids = [patient.id for patient in user_db.patients]
-        if patient_ids:
-            alerts_query = db.query(Alert).filter(Alert.patient_id.in_(patient_ids))
-            critical_alerts = alerts_query.filter(Alert.severity == AlertSeverity.RED, Alert.is_resolved == False).count()
-            warning_alerts = alerts_query.filter(Alert.severity == AlertSeverity.YELLOW, Alert.is_resolved == False).count()
+        total_patients = db.query(UserModel).filter(UserModel.doctor_id == user_db.id).count()
+        # Unresolved alert counts come from the materialized per-doctor counters
+        alert_counts = crud_alert_counters.get_counts(db, doctor_id=user_db.id)
+        critical_alerts = alert_counts[AlertSeverity.RED]
+        warning_alerts = alert_counts[AlertSeverity.YELLOW]
 
     elif user_db.role == UserRole.ADMIN or user_db.is_superuser:
         # Admins see all patients
         total_patients = db.query(models.PatientProfile).count()
-        alerts_query = db.query(Alert)
-        critical_alerts = alerts_query.filter(Alert.severity == AlertSeverity.RED, Alert.is_resolved == False).count()
-        warning_alerts = alerts_query.filter(Alert.severity == AlertSeverity.YELLOW, Alert.is_resolved == False).count()
+        alert_counts = crud_alert_counters.get_counts(db)
+        critical_alerts = alert_counts[AlertSeverity.RED]
+        warning_alerts = alert_counts[AlertSeverity.YELLOW]
+
+    if disease:
+        # Cohort statistics: filtered in SQL on the patients' disease tags
+        doctor_id = user_db.id if user_db.role == UserRole.DOCTOR else None
+        if doctor_id is None:
+            total_patients = len(crud_diseases.get_cohort(db, disease=disease))
+        else:
+            total_patients = (
+                db.query(UserModel)
+                .filter(UserModel.doctor_id == doctor_id, crud_diseases.patient_has(UserModel.id, disease=disease))
+                .count()
+            )
+        alert_counts = crud_alert.count_unresolved(db, disease=disease, doctor_id=doctor_id)
+        critical_alerts = alert_counts[AlertSeverity.RED]
+        warning_alerts = alert_counts[AlertSeverity.YELLOW]
     
     # Placeholder values for other stats
     active_patients_count = total_patients 
@@ -370,9 +565,12 @@ def get_clinical_overview_statistics(
     }
 
 @router.get("/vital-signs/stats", response_model=List[dict])
-async def get_vital_signs_activity_stats(
+def get_vital_signs_activity_stats(
+    request: Request,
+    response: Response,
     db: Session = Depends(deps.get_db),
     current_user: schemas.User = Depends(deps.get_current_active_user),
+    disease: Optional[str] = Query(None, description="Only count readings of patients with this chronic disease"),
 ):
     """
     Get aggregated statistics about vital signs activity by month.
@@ -385,13 +583,32 @@ async def get_vital_signs_activity_stats(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access vital signs activity statistics.",
         )
-    
+
+    # The six-month window moves with the date, so the day is part of the ETag
+    today = datetime.now().date()
+    validators = http_cache.for_resources(
+        db, request, (VITALS, PATIENTS), scope=current_user.id,
+        doctor_id=current_user.id if current_user.role == UserRole.DOCTOR else None, extra=(today,), not_before=datetime.combine(today, time.min).astimezone(timezone.utc),
+    )
+    if validators.fresh(request):
+        return validators.not_modified()
+    validators.tag(response)
+
+    return result_cache.get_or_compute(
+        "vital_signs_stats",
+        scope=current_user.id,
+        params={"disease": disease, "day": today.isoformat()},
+        versions=validators.versions,
+        compute=lambda: _vital_signs_activity_stats(db, current_user.id, disease),
+    )
+
+def _vital_signs_activity_stats(db: Session, user_id: int, disease: Optional[str]) -> List[dict]:
     # Import what we need
     from sqlalchemy import func, extract
     from datetime import datetime, timedelta
     import calendar
     
-    user_db = db.query(UserModel).filter(UserModel.id == current_user.id).first()
+    user_db = db.query(UserModel).filter(UserModel.id == user_id).first()
     if not user_db:
         raise HTTPException(status_code=404, detail="Current user not found in database.")
     
@@ -404,11 +621,15 @@ async def get_vital_signs_activity_stats(
             func.count(models.Vitals.id).label('count')
         )
 
-    # If user is a doctor, filter vitals by their assigned patients
+    # If user is a doctor, filter vitals by their assigned patients (joined in SQL)
     if user_db.role == UserRole.DOCTOR:
-        assigned_patient_ids = [patient.id for patient in user_db.patients]
-        if assigned_patient_ids:
-            vitals_query = vitals_query.filter(models.Vitals.patient_id.in_(assigned_patient_ids))
+        vitals_query = (
+            vitals_query.join(UserModel, UserModel.id == models.Vitals.patient_id)
+            .filter(UserModel.doctor_id == user_db.id)
+        )
+
+    if disease:
+        vitals_query = vitals_query.filter(crud_diseases.patient_has(models.Vitals.patient_id, disease=disease))
 
     # Query to get counts of vital signs by month
     monthly_stats = (
@@ -449,4 +670,4 @@ async def get_vital_signs_activity_stats(
         key=lambda x: (month_names.index(x['month']) - current_month_idx) % 12
     )
     
-    return sorted_result
\ No newline at end of file
+    return sorted_result
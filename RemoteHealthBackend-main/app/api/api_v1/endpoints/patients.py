@@ -1,3 +1,5 @@
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
@@ -16,6 +18,8 @@ from app.models.user_model import UserRole, User as UserModel
 from app import models
 from datetime import date
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.get("/", response_model=list[PatientDataResponse])
@@ -128,12 +132,12 @@ def update_patient(
 
 @router.get("/me")
 def read_patient_profile_me():
-    print("DEBUG: MINIMAL patients/me read_patient_profile_me STARTING NOW") 
+    logger.debug("MINIMAL patients/me read_patient_profile_me STARTING NOW")
     return {"message": "Minimal patients/me reached"}
 
 @router.get("/ping")
 def ping_patients_router():
-    print("DEBUG: patients/ping STARTING NOW")
+    logger.debug("patients/ping STARTING NOW")
     return {"message": "Patients router ping successful"}
 
 @router.post("/me", response_model=PatientDataResponse, status_code=status.HTTP_201_CREATED)
@@ -0,0 +1,63 @@
+"""
+Admin-only sampling profiler for the worker serving the request.
+"""
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.api import deps
+from app.core.config import settings
+from app.schemas.user import User as UserSchema
+from app.services import profiler
+
+router = APIRouter()
+
+
+def _collapsed_response(profile: profiler.Profile) -> PlainTextResponse:
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={
+            "X-Profile-Samples": str(profile.samples),
+            "X-Profile-Seconds": f"{profile.seconds:.3f}",
+            "X-Profile-Label": profile.label,
+        },
+    )
+
+
+@router.post("/worker", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=settings.PROFILING_MAX_SECONDS),
+    interval_ms: float = Query(settings.PROFILING_INTERVAL_MS, ge=1, le=1000),
+    include_idle: bool = Query(False, description="Keep samples of threads waiting for work."),
+    current_user: UserSchema = Depends(deps.get_current_active_superuser),
+):
+    """
+    Sample every thread of this worker for `seconds` and return collapsed
+    stacks (`thread;outer;...;leaf count`), ready for flamegraph.pl or
+    speedscope. The worker keeps serving requests while it is profiled.
+    """
+    sampler = profiler.start_worker_profile(interval=interval_ms / 1000, include_idle=include_idle)
+    if sampler is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile of this worker is already running")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile = profiler.stop_worker_profile(sampler)
+    return _collapsed_response(profile)
+
+
+@router.get("/requests/{profile_id}", response_class=PlainTextResponse)
+async def read_request_profile(
+    profile_id: str,
+    current_user: UserSchema = Depends(deps.get_current_active_superuser),
+):
+    """
+    Collapsed stacks of a request sent with an `X-Profile` header, by the id
+    returned in its `X-Profile-Id` header. Only the worker that served the
+    request has it, and only its PROFILING_KEEP_REQUESTS latest are kept.
+    """
+    profile = profiler.get_request_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found on this worker")
+    return _collapsed_response(profile)
@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from typing import Dict, List, Optional, Any
+from datetime import datetime
 
 from app.api import deps
 from app.models import User
@@ -29,6 +30,8 @@ class SimulationConfig(BaseModel):
 class SimulationStatus(BaseModel):
     is_running: bool
     patient_count: int
+    leader_id: Optional[str] = None
+    leader_heartbeat_at: Optional[datetime] = None
     patients: List[Dict[str, Any]]
 
 
@@ -55,7 +58,7 @@ def start_simulation(
         )
     
     # Start the generator service
-    success = data_generator.start_data_generator()
+    success = data_generator.start_data_generator(db)
     if not success:
         return {"message": "Simulation was already running"}
     
@@ -69,6 +72,7 @@ def start_simulation(
             
             # Add patient to simulation
             data_generator.add_patient_to_simulation(
+                db,
                 patient_id=patient_config.patient_id,
                 interval_seconds=patient_config.interval_seconds,
                 patterns=patient_config.patterns,
@@ -79,6 +83,7 @@ def start_simulation(
 
 @router.post("/stop", response_model=dict, status_code=status.HTTP_200_OK)
 def stop_simulation(
+    db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ):
     """
@@ -95,7 +100,7 @@ def stop_simulation(
         )
     
     # Stop the generator service
-    success = data_generator.stop_data_generator()
+    success = data_generator.stop_data_generator(db)
     if not success:
         return {"message": "Simulation was not running"}
     
@@ -104,13 +109,15 @@ def stop_simulation(
 
 @router.get("/status", response_model=SimulationStatus, status_code=status.HTTP_200_OK)
 def get_simulation_status(
+    db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ):
     """
     Get the current status of the data generation simulation.
     
     Returns:
-        Current simulation status
+        Current simulation status, shared by all workers, with the measured
+        throughput per patient
     """
     # Only superusers and doctors can view simulation status
     if not (current_user.is_superuser or current_user.role == UserRole.DOCTOR):
@@ -119,7 +126,7 @@ def get_simulation_status(
             detail="Only superusers and doctors can view simulation status",
         )
     
-    return data_generator.get_simulation_status()
+    return data_generator.get_simulation_status(db)
 
 
 @router.post("/patients/add", response_model=dict, status_code=status.HTTP_200_OK)
@@ -145,7 +152,7 @@ def add_patient_to_simulation(
         )
     
     # Verify that the simulation is running
-    if not data_generator.is_running:
+    if not data_generator.is_simulation_running(db):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Simulation is not running, start it first",
@@ -161,6 +168,7 @@ def add_patient_to_simulation(
     
     # Add patient to simulation
     success = data_generator.add_patient_to_simulation(
+        db,
         patient_id=patient_config.patient_id,
         interval_seconds=patient_config.interval_seconds,
         patterns=patient_config.patterns,
@@ -181,6 +189,7 @@ def add_patient_to_simulation(
 @router.delete("/patients/{patient_id}", response_model=dict, status_code=status.HTTP_200_OK)
 def remove_patient_from_simulation(
     patient_id: int,
+    db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ):
     """
@@ -200,14 +209,14 @@ def remove_patient_from_simulation(
         )
     
     # Verify that the simulation is running
-    if not data_generator.is_running:
+    if not data_generator.is_simulation_running(db):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Simulation is not running",
         )
     
     # Remove patient from simulation
-    success = data_generator.remove_patient_from_simulation(patient_id)
+    success = data_generator.remove_patient_from_simulation(db, patient_id)
     
     if success:
         return {
@@ -246,8 +255,8 @@ def quick_start_simulation(
         )
     
     # Start the generator service if not already running
-    if not data_generator.is_running:
-        data_generator.start_data_generator()
+    if not data_generator.is_simulation_running(db):
+        data_generator.start_data_generator(db)
     
     # Get all patient profiles
     patients = crud_patients.get_multi(db, limit=max_patients)
@@ -260,6 +269,7 @@ def quick_start_simulation(
             break
             
         success = data_generator.add_patient_to_simulation(
+            db,
             patient_id=patient.user_id,
             interval_seconds=interval_seconds,
             patterns=["diurnal", "exercise"] if added_count % 2 == 0 else ["diurnal"],
@@ -1,75 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.api import deps
-from app import models, schemas
+from app.api import deps, http_cache
+from app import crud, schemas
+from app.crud.crud_thresholds import ThresholdSnapshot
+from app.schemas.threshold import DiseaseThreshold, DiseaseThresholdCreate, DiseaseThresholdUpdate
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Mock disease thresholds data
-MOCK_THRESHOLDS = [
-    {
-        "id": 1,
-        "disease_name": "Hypertension",
-        "vital_sign": "blood_pressure_systolic",
-        "min_threshold": 90,
-        "max_threshold": 140,
-        "unit": "mmHg",
-        "severity": "WARNING"
-    },
-    {
-        "id": 2,
-        "disease_name": "Hypertension",
-        "vital_sign": "blood_pressure_diastolic",
-        "min_threshold": 60,
-        "max_threshold": 90,
-        "unit": "mmHg",
-        "severity": "WARNING"
-    },
-    {
-        "id": 3,
-        "disease_name": "Tachycardia",
-        "vital_sign": "heart_rate",
-        "min_threshold": 60,
-        "max_threshold": 100,
-        "unit": "bpm",
-        "severity": "CRITICAL"
-    },
-    {
-        "id": 4,
-        "disease_name": "Hypothermia",
-        "vital_sign": "temperature",
-        "min_threshold": 36.5,
-        "max_threshold": 37.5,
-        "unit": "°C",
-        "severity": "WARNING"
-    },
-    {
-        "id": 5,
-        "disease_name": "Hypoxemia",
-        "vital_sign": "oxygen_saturation",
-        "min_threshold": 95,
-        "max_threshold": 100,
-        "unit": "%",
-        "severity": "CRITICAL"
-    },
-    {
-        "id": 6,
-        "disease_name": "Diabetes",
-        "vital_sign": "blood_glucose",
-        "min_threshold": 70,
-        "max_threshold": 140,
-        "unit": "mg/dL",
-        "severity": "WARNING"
-    }
-]
 
-@router.get("/", response_model=List[dict])
-@router.get("", response_model=List[dict])
-async def get_all_thresholds(
+def _not_modified(request: Request, response: Response, snapshot: ThresholdSnapshot) -> Optional[Response]:
+    """
+    Tag the response with the thresholds ETag, or build a 304 when the client
+    already holds the current version.
+    """
+    # Clients may store the rules but must revalidate them before use
+    validators = http_cache.Validators(snapshot.etag)
+    if validators.fresh(request):
+        return validators.not_modified()
+    validators.tag(response)
+    return None
+
+
+@router.get("/", response_model=List[DiseaseThreshold])
+@router.get("", response_model=List[DiseaseThreshold])
+def get_all_thresholds(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(deps.get_db),
@@ -80,8 +40,8 @@ async def get_all_thresholds(
     """
     try:
         logger.info(f"User {current_user.email} requested disease thresholds")
-        # Return mock data for now
-        return MOCK_THRESHOLDS[skip:skip + limit]
+        snapshot = crud.thresholds.get_snapshot(db)
+        return _not_modified(request, response, snapshot) or snapshot.thresholds[skip:skip + limit]
     except Exception as e:
         logger.error(f"Error fetching thresholds: {str(e)}")
         raise HTTPException(
@@ -89,9 +49,11 @@ async def get_all_thresholds(
             detail="Error fetching disease thresholds"
         )
 
-@router.get("/{threshold_id}", response_model=dict)
-async def get_threshold_by_id(
+@router.get("/{threshold_id}", response_model=DiseaseThreshold)
+def get_threshold_by_id(
     threshold_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(deps.get_db),
     current_user: schemas.User = Depends(deps.get_current_active_user),
 ):
@@ -99,13 +61,14 @@ async def get_threshold_by_id(
     Retrieve a specific disease threshold by ID.
     """
     try:
-        threshold = next((t for t in MOCK_THRESHOLDS if t["id"] == threshold_id), None)
+        snapshot = crud.thresholds.get_snapshot(db)
+        threshold = snapshot.by_id.get(threshold_id)
         if not threshold:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Threshold not found"
             )
-        return threshold
+        return _not_modified(request, response, snapshot) or threshold
     except HTTPException:
         raise
     except Exception as e:
@@ -115,9 +78,11 @@ async def get_threshold_by_id(
             detail="Error fetching threshold"
         )
 
-@router.get("/disease/{disease_name}", response_model=List[dict])
-async def get_thresholds_by_disease(
+@router.get("/disease/{disease_name}", response_model=List[DiseaseThreshold])
+def get_thresholds_by_disease(
     disease_name: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(deps.get_db),
     current_user: schemas.User = Depends(deps.get_current_active_user),
 ):
@@ -125,11 +90,8 @@ async def get_thresholds_by_disease(
     Retrieve thresholds for a specific disease.
     """
     try:
-        disease_thresholds = [
-            t for t in MOCK_THRESHOLDS 
-            if t["disease_name"].lower() == disease_name.lower()
-        ]
-        return disease_thresholds
+        snapshot = crud.thresholds.get_snapshot(db)
+        return _not_modified(request, response, snapshot) or snapshot.by_disease.get(disease_name.lower(), [])
     except Exception as e:
         logger.error(f"Error fetching thresholds for disease {disease_name}: {str(e)}")
         raise HTTPException(
@@ -137,23 +99,24 @@ async def get_thresholds_by_disease(
             detail="Error fetching disease thresholds"
         )
 
-@router.post("/", response_model=dict)
-async def create_threshold(
-    threshold_data: dict,
+@router.post("/", response_model=DiseaseThreshold, status_code=status.HTTP_201_CREATED)
+def create_threshold(
+    threshold_in: DiseaseThresholdCreate,
     db: Session = Depends(deps.get_db),
-    current_user: schemas.User = Depends(deps.get_current_active_user),
+    current_user: schemas.User = Depends(deps.get_current_healthcare_provider),
 ):
     """
-    Create a new disease threshold.
+    Create a new disease threshold. Doctor/Admin only.
     """
+    if crud.thresholds.get_by_disease_and_vital(db, disease=threshold_in.disease, vital=threshold_in.vital):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A threshold for {threshold_in.vital.value} already exists for {threshold_in.disease}"
+        )
     try:
-        # For now, just return the input data with a mock ID
-        new_threshold = {
-            "id": len(MOCK_THRESHOLDS) + 1,
-            **threshold_data
-        }
-        MOCK_THRESHOLDS.append(new_threshold)
-        return new_threshold
+        threshold = crud.thresholds.create(db, obj_in=threshold_in)
+        logger.info(f"User {current_user.email} created threshold {threshold.id}")
+        return threshold
     except Exception as e:
         logger.error(f"Error creating threshold: {str(e)}")
         raise HTTPException(
@@ -161,31 +124,42 @@ async def create_threshold(
             detail="Error creating threshold"
         )
 
-@router.put("/{threshold_id}", response_model=dict)
-async def update_threshold(
+@router.put("/{threshold_id}", response_model=DiseaseThreshold)
+def update_threshold(
     threshold_id: int,
-    threshold_data: dict,
+    threshold_in: DiseaseThresholdUpdate,
     db: Session = Depends(deps.get_db),
-    current_user: schemas.User = Depends(deps.get_current_active_user),
+    current_user: schemas.User = Depends(deps.get_current_healthcare_provider),
 ):
     """
-    Update an existing disease threshold.
+    Update an existing disease threshold. Doctor/Admin only.
     """
-    try:
-        threshold_index = next(
-            (i for i, t in enumerate(MOCK_THRESHOLDS) if t["id"] == threshold_id), 
-            None
+    threshold = crud.thresholds.get(db, id=threshold_id)
+    if not threshold:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Threshold not found"
         )
-        if threshold_index is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Threshold not found"
-            )
-        
-        MOCK_THRESHOLDS[threshold_index].update(threshold_data)
-        return MOCK_THRESHOLDS[threshold_index]
-    except HTTPException:
-        raise
+
+    update_data = threshold_in.model_dump(exclude_unset=True)
+    min_value = update_data.get("min_value", threshold.min_value)
+    max_value = update_data.get("max_value", threshold.max_value)
+    if min_value is None or max_value is None or min_value > max_value:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_value must not be greater than max_value"
+        )
+    disease = update_data.get("disease", threshold.disease)
+    vital = update_data.get("vital", threshold.vital)
+    existing = crud.thresholds.get_by_disease_and_vital(db, disease=disease, vital=vital)
+    if existing and existing.id != threshold_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A threshold for {vital.value} already exists for {disease}"
+        )
+
+    try:
+        return crud.thresholds.update(db, db_obj=threshold, obj_in=update_data)
     except Exception as e:
         logger.error(f"Error updating threshold {threshold_id}: {str(e)}")
         raise HTTPException(
@@ -194,29 +168,24 @@ async def update_threshold(
         )
 
 @router.delete("/{threshold_id}")
-async def delete_threshold(
+def delete_threshold(
     threshold_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: schemas.User = Depends(deps.get_current_active_user),
+    current_user: schemas.User = Depends(deps.get_current_healthcare_provider),
 ):
     """
-    Delete a disease threshold.
+    Delete a disease threshold. Doctor/Admin only.
     """
-    try:
-        threshold_index = next(
-            (i for i, t in enumerate(MOCK_THRESHOLDS) if t["id"] == threshold_id), 
-            None
+    threshold = crud.thresholds.get(db, id=threshold_id)
+    if not threshold:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Threshold not found"
         )
-        if threshold_index is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Threshold not found"
-            )
-        
-        deleted_threshold = MOCK_THRESHOLDS.pop(threshold_index)
-        return {"message": "Threshold deleted successfully", "deleted": deleted_threshold}
-    except HTTPException:
-        raise
+    try:
+        deleted = DiseaseThreshold.model_validate(threshold)
+        crud.thresholds.remove(db, id=threshold_id)
+        return {"message": "Threshold deleted successfully", "deleted": deleted}
     except Exception as e:
         logger.error(f"Error deleting threshold {threshold_id}: {str(e)}")
         raise HTTPException(
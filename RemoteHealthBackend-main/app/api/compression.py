@@ -0,0 +1,193 @@
+"""
+Negotiated response compression (Brotli or gzip).
+
+Vitals histories, alert lists and conversations are large, repetitive JSON:
+every reading repeats `heartRate`, `oxygenSaturation`, `patientId`... and
+compresses 5-10x. The middleware picks an encoding from the request's
+Accept-Encoding (q-values honoured, Brotli preferred when the optional
+`brotli` package is installed) and compresses text-like responses:
+
+- complete responses at least COMPRESSION_MINIMUM_SIZE bytes long; smaller
+  ones are sent as they are, since the headers would cost more than the saving;
+- streamed responses (exports) chunk by chunk, each chunk flushed so clients
+  still receive rows as they are produced.
+
+Responses that already carry a Content-Encoding, and binary formats such as
+Parquet, are left alone. A strong ETag becomes weak on compressed responses,
+which the conditional GET helpers compare weakly anyway.
+"""
+
+import zlib
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+GZIP = "gzip"
+BROTLI = "br"
+
+# Media types worth compressing, besides text/* and the +json / +xml suffixes
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+})
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Encodings this server can produce, in order of preference."""
+    return (BROTLI, GZIP) if brotli is not None else (GZIP,)
+
+
+def negotiate(accept_encoding: str, supported: Tuple[str, ...]) -> Optional[str]:
+    """
+    The supported encoding the client prefers (highest q-value, ties broken
+    by our order), or None for an uncompressed response.
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for coding in supported:
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type in COMPRESSIBLE_TYPES
+        or media_type.endswith("+json")
+        or media_type.endswith("+xml")
+    )
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == BROTLI:
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits 31: gzip container
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compress `data` and flush it, so the client can decode it on arrival."""
+        if self.encoding == BROTLI:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == BROTLI:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+def _add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if vary is None:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: Optional[int] = None,
+        gzip_level: Optional[int] = None,
+        brotli_quality: Optional[int] = None,
+    ):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+        self.gzip_level = settings.COMPRESSION_GZIP_LEVEL if gzip_level is None else gzip_level
+        self.brotli_quality = settings.COMPRESSION_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+        self.supported = supported_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.supported)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        # None until the first body message decides: compress or pass through
+        compressing: Optional[bool] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, compressor, compressing
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or compressing is False:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressing is None:
+                headers = MutableHeaders(raw=list(start["headers"]))
+                eligible = (
+                    start["status"] >= 200
+                    and start["status"] not in (204, 304)
+                    and "content-encoding" not in headers
+                    and is_compressible(headers.get("content-type", ""))
+                )
+                if eligible:
+                    _add_vary(headers)
+                compressing = eligible and (more_body or len(body) >= self.minimum_size)
+                if compressing:
+                    compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                    headers["Content-Encoding"] = encoding
+                    etag = headers.get("etag")
+                    if etag is not None and not etag.startswith("W/"):
+                        headers["ETag"] = f"W/{etag}"
+                    if more_body:
+                        del headers["content-length"]
+                    else:
+                        body = compressor.finish(body)
+                        headers["Content-Length"] = str(len(body))
+                await send({**start, "headers": headers.raw})
+                if not compressing:
+                    await send(message)
+                    return
+                if not more_body:
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+            data = compressor.chunk(body) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+        # A response whose start was never followed by a body message
+        if start is not None and compressing is None:
+            await send(start)
@@ -97,6 +97,16 @@ def get_current_active_superuser(
         )
     return current_user
 
+def is_superuser_token(token: str) -> bool:
+    """Whether `token` belongs to a superuser; for checks made outside a route (middleware)."""
+    db = SessionLocal()
+    try:
+        return crud_user.user.is_superuser(get_current_user(db=db, token=token))
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+
 def get_current_doctor(
     current_user: UserSchema = Depends(get_current_user),
 ) -> UserSchema:
@@ -0,0 +1,144 @@
+"""
+Conditional GETs for endpoints the dashboard polls.
+
+The ETag of a response is derived from the route, the query string, the
+caller and the versions of the resources it reads (app/crud/
+crud_resource_versions.py); Last-Modified is the latest of their bumps. A poll
+presenting a current ETag (If-None-Match) or Last-Modified (If-Modified-Since,
+only consulted without If-None-Match) gets a 304 before the endpoint runs its
+queries: checking costs one lookup of the version counters.
+
+    validators = http_cache.for_resources(db, request, (VITALS,), scope=current_user.id, doctor_id=current_user.id)
+    if validators.fresh(request):
+        return validators.not_modified()
+    ...
+    return validators.tag(model_list_response(...))
+
+Responses stay `private, no-cache`: clients and proxies keep them but must
+revalidate before every use.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import resource_versions as crud_resource_versions
+from app.crud.crud_resource_versions import scoped_name
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def _opaque_tag(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of `etag` with the tags of an If-None-Match header."""
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque_tag(etag) in {_opaque_tag(candidate) for candidate in if_none_match.split(",")}
+
+
+class Validators:
+    """ETag and Last-Modified of a response; without an ETag it never matches and adds no headers."""
+
+    def __init__(
+        self,
+        etag: Optional[str],
+        last_modified: Optional[datetime] = None,
+        *,
+        vary: Optional[str] = None,
+        versions: Optional[Dict[str, int]] = None,
+    ):
+        self.etag = etag
+        # Resource versions the validators were derived from, for app/services/result_cache.py
+        self.versions = versions
+        # HTTP dates have whole seconds
+        self.last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0) if last_modified else None
+        self.vary = vary
+
+    def fresh(self, request: Request) -> bool:
+        """Whether the client already holds the current representation."""
+        if self.etag is None:
+            return False
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match, self.etag)
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is None or self.last_modified is None:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return self.last_modified <= since
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        if self.etag is None:
+            return {}
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        if self.vary:
+            headers["Vary"] = self.vary
+        return headers
+
+    def not_modified(self) -> Response:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=self.headers)
+
+    def tag(self, response: Response) -> Response:
+        """Add the validators to `response` (the endpoint's injected one, or the one it returns)."""
+        response.headers.update(self.headers)
+        return response
+
+
+def for_resources(
+    db: Session,
+    request: Request,
+    resources: Iterable[str],
+    *,
+    scope: Any,
+    doctor_id: Optional[int] = None,
+    extra: Iterable[Any] = (),
+    not_before: Optional[datetime] = None,
+) -> Validators:
+    """
+    Validators of a response built from `resources` for `scope` (the caller's
+    user id). A response showing only the patients of one doctor passes
+    `doctor_id`, so writes to other doctors' patients leave it current.
+    `extra` adds inputs the versions do not cover, such as the date of a
+    rolling window; `not_before` keeps Last-Modified from predating them.
+    """
+    if not settings.HTTP_CACHE_ENABLED:
+        return Validators(None)
+    versions = crud_resource_versions.get(db, resources, doctor_id=doctor_id)
+    digest = hashlib.sha1()
+    parts = [
+        request.url.path,
+        repr(sorted(request.query_params.multi_items())),
+        repr(scope),
+        *(f"{resource}={versions[resource].version}" for resource in sorted(versions)),
+        *(repr(value) for value in extra),
+    ]
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    updated = [version.updated_at for version in versions.values() if version.updated_at is not None]
+    if not_before is not None:
+        updated.append(not_before)
+    # Weak: it identifies the data, not the exact bytes sent
+    return Validators(
+        f'W/"{digest.hexdigest()}"',
+        max(updated, default=None),
+        vary="Authorization",
+        versions={scoped_name(resource, doctor_id): version.version for resource, version in versions.items()},
+    )
@@ -0,0 +1,52 @@
+"""
+Validate-once JSON responses for hot endpoints.
+
+By default FastAPI validates an endpoint's return value against its
+response_model (a second time when the endpoint already built schema
+objects), converts it to JSON-compatible Python and encodes that with the
+standard json module. Endpoints using model_response()/model_list_response()
+validate their rows once into the response schema and return a
+FastJSONResponse, which FastAPI sends untouched and which is encoded by
+orjson. Keep response_model on the route: it still documents the schema.
+"""
+
+from functools import lru_cache
+from typing import Any, Iterable, List, Type
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+# Same output as FastAPI's encoder: UTC datetimes end in "Z", int dict keys become strings
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def _render(adapter: TypeAdapter, obj: Any, status_code: int) -> FastJSONResponse:
+    # from_attributes accepts ORM objects, dicts and schema instances alike
+    validated = adapter.validate_python(obj, from_attributes=True)
+    return FastJSONResponse(adapter.dump_python(validated, by_alias=True), status_code=status_code)
+
+
+def model_response(schema: Type[BaseModel], obj: Any, *, status_code: int = 200) -> FastJSONResponse:
+    """`obj` validated once as `schema` and rendered with orjson."""
+    return _render(_adapter(schema), obj, status_code)
+
+
+def model_list_response(schema: Type[BaseModel], rows: Iterable[Any], *, status_code: int = 200) -> FastJSONResponse:
+    """`rows` validated once as a list of `schema` and rendered with orjson."""
+    return _render(_list_adapter(schema), list(rows), status_code)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl, validator
 import secrets
@@ -37,6 +37,113 @@ class Settings(BaseSettings):
     FIRST_SUPERUSER: str = "admin@example.com"
     FIRST_SUPERUSER_PASSWORD: str = "admin123"
 
+    # Root log level. Per-request debug lines (request parameters, message and
+    # partner details) are only emitted at DEBUG; keep INFO or higher in production.
+    LOG_LEVEL: str = "INFO"
+    # Per-route latency histograms, status counts and in-flight gauges at /metrics
+    METRICS_ENABLED: bool = True
+    # Per-request SQL statement count and time (Server-Timing header and /metrics)
+    QUERY_STATS_ENABLED: bool = True
+    # Statements slower than this are logged with their route (0 disables)
+    SLOW_QUERY_THRESHOLD_MS: int = 200
+    # Requests running more statements than this are logged; with
+    # QUERY_BUDGET_STRICT (for test runs) they fail with a 500 instead, or
+    # raise after the response when the excess ran while streaming it.
+    # None disables.
+    QUERY_BUDGET: Optional[int] = None
+    QUERY_BUDGET_STRICT: bool = False
+    # Admin-only sampling profiler: worker-wide at /api/v1/profiling/worker and
+    # per request with an X-Profile header
+    PROFILING_ENABLED: bool = True
+    PROFILING_MAX_SECONDS: int = 60
+    PROFILING_INTERVAL_MS: float = 5
+    PROFILING_REQUEST_INTERVAL_MS: float = 1
+    # Per-request profiles each worker keeps for download
+    PROFILING_KEEP_REQUESTS: int = 20
+    # ETag / Last-Modified on dashboard reads, from per-resource version counters
+    # bumped by every committed write to vitals, alerts and patients
+    HTTP_CACHE_ENABLED: bool = True
+    # Dashboard statistics cached per endpoint, user and parameters while the
+    # resource versions they were computed from are current (needs HTTP_CACHE_ENABLED).
+    # Backend "memory" is a per-worker LRU; "store" the external-store backend,
+    # over an in-process stand-in until a real store is plugged in at startup.
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_BACKEND: str = "memory"
+    RESULT_CACHE_SIZE: int = 1024
+    RESULT_CACHE_TTL_SECONDS: int = 300
+    # Brotli (with the optional `brotli` package) or gzip for text-like responses,
+    # as negotiated with Accept-Encoding. Complete responses smaller than
+    # COMPRESSION_MINIMUM_SIZE bytes are sent uncompressed; streams always compress.
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Data simulator
+    # Every worker polls the shared simulator tables this often; only the worker
+    # holding the advisory lock actually generates readings.
+    SIMULATOR_POLL_SECONDS: int = 5
+    SIMULATOR_ADVISORY_LOCK_KEY: int = 724_311_001
+
+    # How long a worker serves cached disease thresholds before re-reading them;
+    # writes made through the same worker invalidate the cache immediately
+    THRESHOLDS_CACHE_TTL_SECONDS: int = 30
+    # Same for the active anomaly rules
+    ANOMALY_RULES_CACHE_TTL_SECONDS: int = 30
+
+    # Repeat anomalies of the same patient, vital and severity are folded into the
+    # open alert while they keep arriving within this window (0 disables)
+    ALERT_COALESCE_WINDOW_MINUTES: int = 30
+    # How long a worker trusts its index of open alerts (which coalescing looks
+    # up) before reloading it; alerts opened or resolved by other workers are
+    # only folded into once it expires
+    ALERT_OPEN_INDEX_TTL_SECONDS: int = 30
+    # How often each worker recounts unresolved alerts to correct counter drift
+    # (0 disables the in-app job; run app.services.alert_counters from cron instead)
+    ALERT_COUNTER_RECONCILE_SECONDS: int = 300
+
+    # Patient risk score: weight of the newest reading in the vitals component
+    # (an EWMA) and how many recent readings a full recompute replays
+    RISK_VITALS_EWMA_ALPHA: float = 0.3
+    RISK_VITALS_WINDOW: int = 20
+
+    # Patient search: on databases without pg_trgm each worker keeps an in-process
+    # trigram index of patient names and disease tags, rebuilt after this TTL.
+    # Names written through other workers are found once it expires.
+    PATIENT_SEARCH_CACHE_TTL_SECONDS: int = 10
+    # Share of the query's trigrams a name must contain to be suggested
+    PATIENT_SEARCH_MIN_SIMILARITY: float = 0.5
+    # How long a worker serves cached per-disease patient cohorts before re-reading them
+    DISEASE_COHORT_CACHE_TTL_SECONDS: int = 60
+
+    # Streaming anomaly detector (per-worker rolling state per patient)
+    STREAM_DETECTION_ENABLED: bool = True
+    STREAM_WINDOW_READINGS: int = 360
+    STREAM_MAX_PATIENTS: int = 10000
+    # Readings in the window before z-scores and trends are reported
+    STREAM_MIN_READINGS: int = 10
+    STREAM_ZSCORE_LIMIT: float = 3.0
+    # Consecutive readings beyond STREAM_ZSCORE_LIMIT that raise a sustained-deviation alert
+    STREAM_SUSTAINED_READINGS: int = 5
+    # Shortest window span over which a trend slope is trusted
+    STREAM_TREND_MIN_SPAN_MINUTES: int = 60
+    STREAM_EWMA_ALPHA: float = 0.2
+
+    # Rows fetched per server-side cursor batch when streaming exports
+    EXPORT_CHUNK_SIZE: int = 5000
+    # Rows validated and loaded per batch during bulk imports
+    IMPORT_BATCH_SIZE: int = 5000
+
+    # Vitals partitioning (PostgreSQL only)
+    VITALS_PARTITION_MONTHS_AHEAD: int = 3
+    VITALS_PARTITION_MAINTENANCE_SECONDS: int = 6 * 60 * 60
+    VITALS_PARTITION_LOCK_KEY: int = 724_311_002
+    # Months of vitals to keep; older monthly partitions are detached. None keeps everything.
+    VITALS_RETENTION_MONTHS: Optional[int] = None
+    # "archive" moves expired partitions to VITALS_ARCHIVE_SCHEMA, "drop" deletes them
+    VITALS_RETENTION_MODE: str = "archive"
+    VITALS_ARCHIVE_SCHEMA: str = "archive"
+
     class Config:
         case_sensitive = True
         env_file = ".env"
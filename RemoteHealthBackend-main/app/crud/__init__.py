@@ -1,22 +1,34 @@
 from app.crud.crud_user import user
 from app.crud.crud_alert import alert
+from app.crud.crud_alert_counters import alert_counters
 from app.crud.crud_anomalies import anomalies
+from app.crud.crud_anomaly_rules import anomaly_rules
+from app.crud.crud_diseases import diseases
 from app.crud.crud_location import location
 # from app.crud.crud_messages import messages # Old import, commented out or removed
 from app.crud.crud_message import message # New import
 from app.crud.crud_notes import notes
 from app.crud.crud_patients import patients
 from app.crud.crud_reminders import reminders
+from app.crud.crud_resource_versions import resource_versions
+from app.crud.crud_simulator import simulator
+from app.crud.crud_thresholds import thresholds
 from app.crud.crud_vitals import vitals
 
 __all__ = [
     "user",
     "alert",
+    "alert_counters",
     "anomalies",
+    "anomaly_rules",
+    "diseases",
     "location",
     "message", # Added new crud instance
     "notes",
     "patients",
     "reminders",
+    "resource_versions",
+    "simulator",
+    "thresholds",
     "vitals"
 ] 
\ No newline at end of file
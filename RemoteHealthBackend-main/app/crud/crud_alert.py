@@ -1,25 +1,256 @@
-from typing import List, Optional
+import base64
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import case, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func # For onupdate with resolved_at
-from datetime import datetime # Added datetime
+from datetime import datetime, timedelta, timezone # Added datetime
 
+from app.core.config import settings
 from app.crud.base import CRUDBase
-from app.models.domain_models import Alert, AlertSeverity # Added AlertSeverity, Model
+from app.crud.crud_alert_counters import alert_counters
+from app.crud.crud_diseases import diseases
+from app.crud.crud_resource_versions import ALERTS, MARKED, resource_versions
+from app.models.domain_models import Alert, AlertSeverity, VitalSign # Added AlertSeverity, Model
+from app.models.user_model import User
 from app.schemas.alert import AlertCreate, AlertUpdate # Schemas
+from app.services import risk_scoring
+
+AlertKey = Tuple[int, VitalSign, AlertSeverity]
+
+# Clinical priority used when sorting by severity; the enum is stored by name,
+# so ordering the column itself would sort BLUE < RED < YELLOW
+SEVERITY_PRIORITY = {AlertSeverity.RED: 3, AlertSeverity.YELLOW: 2, AlertSeverity.BLUE: 1}
+
+FEED_SORTS = ("created_at_desc", "created_at_asc", "severity_desc", "severity_asc")
+
+# Priorities severity_priority() can yield (0 for alerts without a severity)
+_CURSOR_PRIORITIES = frozenset(SEVERITY_PRIORITY.values()) | {0}
+
+# Columns of the Alert response schema; list reads select only these into plain
+# rows instead of hydrating ORM entities
+LIST_COLUMNS = (
+    Alert.id, Alert.patient_id, Alert.anomaly_id, Alert.severity, Alert.message, Alert.is_resolved,
+    Alert.vital, Alert.created_at, Alert.resolved_at, Alert.occurrence_count, Alert.last_seen_at,
+)
+
+
+def severity_priority():
+    # Comparisons (not case(value=...)) so the enum is bound by name like the column
+    return case(*((Alert.severity == severity, priority) for severity, priority in SEVERITY_PRIORITY.items()), else_=0)
+
+
+def _encode_cursor(key: Sequence[Any]) -> str:
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str, length: int, *, parse_time: bool) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("Malformed cursor")
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Cursor does not match the sort order")
+    # The key is ([severity priority,] created_at, id); created_at travels as
+    # an ISO string. Every value is checked before it is bound to the query.
+    *priorities, created_at, alert_id = values
+    if type(alert_id) is not int or not isinstance(created_at, str):
+        raise ValueError("Malformed cursor")
+    if any(type(priority) is not int or priority not in _CURSOR_PRIORITIES for priority in priorities):
+        raise ValueError("Malformed cursor")
+    try:
+        parsed = datetime.fromisoformat(created_at)
+    except ValueError:
+        raise ValueError("Malformed cursor")
+    # Otherwise in the format get_feed() compares SQLite's text timestamps in
+    values[-2] = parsed if parse_time else parsed.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    return values
+
+
+def _epoch(value: datetime) -> float:
+    # SQLite hands back naive datetimes; they are stored as UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class OpenAlertIndex:
+    """
+    Open (unresolved) alerts that can still absorb repeats, keyed on
+    (patient_id, vital, severity) -> (alert_id, last seen as epoch seconds).
+    """
+
+    def __init__(self, entries: Dict[AlertKey, Tuple[int, float]]):
+        self.entries = entries
+        self.loaded_at = time.monotonic()
+
 
 class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
+    def __init__(self, model):
+        super().__init__(model)
+        self._index: Optional[OpenAlertIndex] = None
+        self._lock = threading.Lock()
+
+    def _open_index(self, db: Session) -> OpenAlertIndex:
+        """
+        The per-worker open alert index. Alerts raised or resolved through this
+        worker update it in place; everything else is picked up when it is
+        reloaded after ALERT_OPEN_INDEX_TTL_SECONDS.
+        """
+        index = self._index
+        if index is not None and time.monotonic() - index.loaded_at < settings.ALERT_OPEN_INDEX_TTL_SECONDS:
+            return index
+        with self._lock:
+            index = self._index
+            if index is None or time.monotonic() - index.loaded_at >= settings.ALERT_OPEN_INDEX_TTL_SECONDS:
+                since = datetime.now(timezone.utc) - timedelta(minutes=settings.ALERT_COALESCE_WINDOW_MINUTES)
+                rows = (
+                    db.query(self.model.id, self.model.patient_id, self.model.vital, self.model.severity, self.model.last_seen_at)
+                    .filter(
+                        self.model.is_resolved == False,
+                        self.model.vital.isnot(None),
+                        self.model.last_seen_at >= since,
+                    )
+                    .order_by(self.model.last_seen_at)
+                    .all()
+                )
+                # Ordered by last_seen_at, so the most recent alert of a key wins
+                index = OpenAlertIndex({
+                    (row.patient_id, row.vital, row.severity): (row.id, _epoch(row.last_seen_at)) for row in rows
+                })
+                self._index = index
+            return index
+
+    def invalidate_open_index(self) -> None:
+        self._index = None
+
+    def raise_alert(self, db: Session, *, obj_in: AlertCreate, seen_at: Optional[datetime] = None) -> Optional[Alert]:
+        """
+        Create an alert, or fold it into the open alert of the same patient,
+        vital and severity when that alert was last seen less than
+        ALERT_COALESCE_WINDOW_MINUTES before `seen_at` (the reading time).
+        Returns the new alert, or None when it was coalesced.
+
+        The open alert index is only a fast path: the alert absorbing repeats
+        of a key is flagged `coalescing`, and a unique index on the flagged
+        rows keeps workers that miss each other's alerts from opening two.
+        """
+        seen_at = seen_at or datetime.now(timezone.utc)
+        window = settings.ALERT_COALESCE_WINDOW_MINUTES * 60
+        if obj_in.vital is None or window <= 0:
+            return self._insert(db, obj_in=obj_in, seen_at=seen_at)
+
+        key = (obj_in.patient_id, obj_in.vital, obj_in.severity)
+        seen = _epoch(seen_at)
+        index = self._open_index(db)
+        entry = index.entries.get(key)
+        if entry is not None and abs(seen - entry[1]) <= window:
+            alert_id, last_seen = entry
+            if self._fold(db, alert_id, seen_at, obj_in.patient_id):
+                index.entries[key] = (alert_id, max(seen, last_seen))
+                return None
+
+        key_filter = (
+            self.model.patient_id == obj_in.patient_id,
+            self.model.vital == obj_in.vital,
+            self.model.severity == obj_in.severity,
+            self.model.coalescing == True,
+        )
+        # Two attempts: the alert holding the key may be resolved between them
+        for _ in range(2):
+            # A resolved or quiet alert hands the key over to the new one
+            db.execute(
+                update(self.model)
+                .where(
+                    *key_filter,
+                    or_(self.model.is_resolved == True, self.model.last_seen_at < seen_at - timedelta(seconds=window)),
+                )
+                .values(coalescing=False)
+                # Only the internal flag changes: nothing to bump
+                .execution_options(synchronize_session=False, **{MARKED: True})
+            )
+            try:
+                db_obj = self._insert(db, obj_in=obj_in, seen_at=seen_at, coalescing=True)
+            except IntegrityError:
+                # Another request, possibly on another worker, opened it first
+                db.rollback()
+            else:
+                index.entries[key] = (db_obj.id, seen)
+                return db_obj
+            holder = db.query(self.model.id, self.model.last_seen_at).filter(*key_filter).first()
+            if holder is not None and self._fold(db, holder.id, seen_at, obj_in.patient_id):
+                index.entries[key] = (holder.id, max(seen, _epoch(holder.last_seen_at or seen_at)))
+                return None
+        # Still contended: keep the reading's alert rather than lose it
+        return self._insert(db, obj_in=obj_in, seen_at=seen_at)
+
+    def _fold(self, db: Session, alert_id: int, seen_at: datetime, patient_id: int) -> bool:
+        """Count a repeat on an open alert; False when it was resolved meanwhile."""
+        resource_versions.mark_patients(db, ALERTS, [patient_id])
+        result = db.execute(
+            update(self.model)
+            .where(self.model.id == alert_id, self.model.is_resolved == False)
+            .values(
+                occurrence_count=self.model.occurrence_count + 1,
+                last_seen_at=case(
+                    (or_(self.model.last_seen_at.is_(None), self.model.last_seen_at < seen_at), seen_at),
+                    else_=self.model.last_seen_at,
+                ),
+            )
+            .execution_options(synchronize_session=False, **{MARKED: True})
+        )
+        db.commit()
+        return bool(result.rowcount)
+
+    def _insert(self, db: Session, *, obj_in: AlertCreate, seen_at: datetime, coalescing: bool = False) -> Alert:
+        db_obj = self.model(**obj_in.model_dump(), last_seen_at=seen_at, coalescing=coalescing)
+        db.add(db_obj)
+        if not obj_in.is_resolved:
+            alert_counters.adjust(db, patient_id=obj_in.patient_id, severity=obj_in.severity, delta=1)
+        db.commit()
+        db.refresh(db_obj)
+        risk_scoring.refresh_alerts(db, [obj_in.patient_id])
+        return db_obj
+
     def create_alert(self, db: Session, *, obj_in: AlertCreate) -> Alert:
         # is_resolved defaults to False in model/schema, created_at is server_default
         db_obj = self.model(**obj_in.model_dump()) # Use model_dump() for Pydantic v2
         db.add(db_obj)
+        if not obj_in.is_resolved:
+            alert_counters.adjust(db, patient_id=obj_in.patient_id, severity=obj_in.severity, delta=1)
         db.commit()
         db.refresh(db_obj)
+        risk_scoring.refresh_alerts(db, [obj_in.patient_id])
         return db_obj
 
+    def count_unresolved(
+        self, db: Session, *, disease: str, doctor_id: Optional[int] = None
+    ) -> Dict[AlertSeverity, int]:
+        """
+        Unresolved alerts per severity of the patients with `disease`, within
+        `doctor_id`'s patients when given (the counters only cover doctors).
+        """
+        counts = {severity: 0 for severity in AlertSeverity}
+        query = (
+            db.query(self.model.severity, func.count(self.model.id))
+            .filter(diseases.patient_has(self.model.patient_id, disease=disease), self.model.is_resolved == False)
+        )
+        if doctor_id is not None:
+            query = query.join(User, User.id == self.model.patient_id).filter(User.doctor_id == doctor_id)
+        for severity, count in query.group_by(self.model.severity).all():
+            if severity is not None:
+                counts[severity] = count
+        return counts
+
     def get_alerts_by_patient_id(
         self, db: Session, *, patient_id: int, skip: int = 0, limit: int = 100, only_active: bool = False
-    ) -> List[Alert]:
-        query = db.query(self.model).filter(self.model.patient_id == patient_id)
+    ) -> List[Row]:
+        query = db.query(*LIST_COLUMNS).filter(self.model.patient_id == patient_id)
         if only_active:
             query = query.filter(self.model.is_resolved == False)
         return query.order_by(self.model.created_at.desc()).offset(skip).limit(limit).all()
@@ -31,16 +262,22 @@ class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
         skip: int = 0, 
         limit: int = 100, 
         patient_id_filter: Optional[int] = None,
+        disease_filter: Optional[str] = None,
         severity_filter: Optional[AlertSeverity] = None,
         start_date_filter: Optional[datetime] = None,
         end_date_filter: Optional[datetime] = None,
         is_resolved_filter: Optional[bool] = None,
         sort_by: Optional[str] = "created_at_desc" # Default sort
-    ) -> List[Alert]:
-        query = db.query(self.model)
+    ) -> List[Row]:
+        """Alerts as plain rows of LIST_COLUMNS."""
+        query = db.query(*LIST_COLUMNS)
 
         if patient_id_filter is not None:
             query = query.filter(self.model.patient_id == patient_id_filter)
+
+        # Patients with a chronic disease
+        if disease_filter is not None:
+            query = query.filter(diseases.patient_has(self.model.patient_id, disease=disease_filter))
         
         if severity_filter is not None:
             query = query.filter(self.model.severity == severity_filter)
@@ -60,25 +297,141 @@ class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
         elif sort_by == "created_at_asc":
             query = query.order_by(self.model.created_at.asc())
         elif sort_by == "severity_desc":
-            # Enum sorting might need specific handling if direct asc/desc doesn't work as expected
-            # For now, assuming direct ordering works or can be adjusted later if needed
-            query = query.order_by(self.model.severity.desc())
+            query = query.order_by(severity_priority().desc(), self.model.created_at.desc())
         elif sort_by == "severity_asc":
-            query = query.order_by(self.model.severity.asc())
+            query = query.order_by(severity_priority().asc(), self.model.created_at.asc())
         else: # Default sort if invalid sort_by is provided
             query = query.order_by(self.model.created_at.desc())
             
         return query.offset(skip).limit(limit).all()
 
+    def get_feed(
+        self,
+        db: Session,
+        *,
+        doctor_id: Optional[int] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        patient_id_filter: Optional[int] = None,
+        disease_filter: Optional[str] = None,
+        severity_filter: Optional[AlertSeverity] = None,
+        start_date_filter: Optional[datetime] = None,
+        end_date_filter: Optional[datetime] = None,
+        is_resolved_filter: Optional[bool] = None,
+        sort_by: str = "created_at_desc",
+    ) -> Tuple[List[Row], Optional[str]]:
+        """
+        One page of alerts (plain rows of LIST_COLUMNS), scoped to `doctor_id`'s patients with a join on
+        users.doctor_id (all patients when None), and the cursor of the next
+        page (None on the last one). Keyset-paginated on (created_at, id), or
+        (severity priority, created_at, id) when sorting by severity, so deep
+        pages cost the same as the first. Raises ValueError for a bad cursor.
+        """
+        sqlite = db.get_bind().dialect.name == "sqlite"
+        created_at = self.model.created_at
+        if sqlite:
+            # SQLite keeps timestamps as text, with and without fractional
+            # seconds; compare them in one format so ties stay ties
+            created_at = func.strftime("%Y-%m-%d %H:%M:%f", self.model.created_at)
+        keys = [created_at, self.model.id]
+        if sort_by.startswith("severity"):
+            keys.insert(0, severity_priority())
+
+        # The sort keys ride along, labelled, to build the next cursor
+        query = db.query(*LIST_COLUMNS, *(key.label(f"feed_key_{n}") for n, key in enumerate(keys)))
+        if doctor_id is not None:
+            query = query.join(User, User.id == self.model.patient_id).filter(User.doctor_id == doctor_id)
+        if patient_id_filter is not None:
+            query = query.filter(self.model.patient_id == patient_id_filter)
+        if disease_filter is not None:
+            query = query.filter(diseases.patient_has(self.model.patient_id, disease=disease_filter))
+        if severity_filter is not None:
+            query = query.filter(self.model.severity == severity_filter)
+        if start_date_filter is not None:
+            query = query.filter(self.model.created_at >= start_date_filter)
+        if end_date_filter is not None:
+            query = query.filter(self.model.created_at <= end_date_filter)
+        if is_resolved_filter is not None:
+            query = query.filter(self.model.is_resolved == is_resolved_filter)
+
+        descending = sort_by.endswith("_desc")
+        if cursor is not None:
+            after = _decode_cursor(cursor, len(keys), parse_time=not sqlite)
+            position = tuple_(*keys)
+            query = query.filter(position < tuple_(*after) if descending else position > tuple_(*after))
+        query = query.order_by(*(key.desc() if descending else key.asc() for key in keys))
+        rows = query.limit(limit + 1).all()
+        next_cursor = _encode_cursor(rows[limit - 1][len(LIST_COLUMNS):]) if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
     def resolve_alert(self, db: Session, *, alert_id: int) -> Optional[Alert]:
         db_alert = self.get(db, id=alert_id)
         if db_alert and not db_alert.is_resolved:
-            db_alert.is_resolved = True
-            db_alert.resolved_at = func.now() # Use func.now() for database timestamp
-            db.add(db_alert)
+            # Guarded so concurrent resolves decrement the counters once
+            result = db.execute(
+                update(self.model)
+                .where(self.model.id == alert_id, self.model.is_resolved == False)
+                .values(is_resolved=True, resolved_at=func.now()) # Use func.now() for database timestamp
+                .execution_options(**{MARKED: True})
+            )
+            if result.rowcount:
+                resource_versions.mark_patients(db, ALERTS, [db_alert.patient_id])
+                alert_counters.adjust(db, patient_id=db_alert.patient_id, severity=db_alert.severity, delta=-1)
             db.commit()
             db.refresh(db_alert)
+            self._forget_open(alert_id)
+            risk_scoring.refresh_alerts(db, [db_alert.patient_id])
             return db_alert
         return db_alert # Return alert even if already resolved or not found (None)
 
+    def resolve_many(
+        self,
+        db: Session,
+        *,
+        alert_ids: Optional[List[int]] = None,
+        patient_id: Optional[int] = None,
+        severity: Optional[AlertSeverity] = None,
+        before: Optional[datetime] = None,
+        doctor_id: Optional[int] = None,
+    ) -> List[Tuple[int, int, AlertSeverity]]:
+        """
+        Resolve every unresolved alert matching all given criteria with one
+        UPDATE ... RETURNING, adjusting the counters in the same transaction.
+        With `doctor_id`, only alerts of that doctor's patients are touched.
+        Returns (id, patient_id, severity) of the alerts resolved.
+        """
+        criteria = [self.model.is_resolved == False]
+        if doctor_id is not None:
+            criteria.append(self.model.patient_id.in_(select(User.id).where(User.doctor_id == doctor_id)))
+        if alert_ids is not None:
+            criteria.append(self.model.id.in_(alert_ids))
+        if patient_id is not None:
+            criteria.append(self.model.patient_id == patient_id)
+        if severity is not None:
+            criteria.append(self.model.severity == severity)
+        if before is not None:
+            criteria.append(self.model.created_at < before)
+        rows = db.execute(
+            update(self.model)
+            .where(*criteria)
+            .values(is_resolved=True, resolved_at=func.now())
+            .returning(self.model.id, self.model.patient_id, self.model.severity)
+            .execution_options(synchronize_session=False, **{MARKED: True})
+        ).all()
+        resolved = [(row.id, row.patient_id, row.severity) for row in rows]
+        resource_versions.mark_patients(db, ALERTS, (patient for _, patient, _ in resolved))
+        alert_counters.adjust_many(db, ((patient, level) for _, patient, level in resolved), delta=-1)
+        db.commit()
+        self._forget_open(*(alert_id for alert_id, _, _ in resolved))
+        risk_scoring.refresh_alerts(db, (patient for _, patient, _ in resolved))
+        return resolved
+
+    def _forget_open(self, *alert_ids: int) -> None:
+        index = self._index
+        if index is not None and alert_ids:
+            resolved = set(alert_ids)
+            for key, (open_id, _) in list(index.entries.items()):
+                if open_id in resolved:
+                    index.entries.pop(key, None)
+
 alert = CRUDAlert(Alert) 
\ No newline at end of file
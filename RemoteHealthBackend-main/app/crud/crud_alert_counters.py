@@ -0,0 +1,118 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.crud.crud_resource_versions import ALERTS, UNASSIGNED, resource_versions
+from app.db import upsert
+from app.models.domain_models import Alert, AlertCounter, AlertSeverity
+from app.models.user_model import User
+
+# doctor_id of the counters covering every patient
+ALL_PATIENTS = 0
+
+CounterKey = Tuple[int, AlertSeverity]
+
+
+class CRUDAlertCounters:
+    """
+    Unresolved alert counters. Adjustments do not commit: callers apply them in
+    the same transaction as the alert change they describe.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def get_counts(self, db: Session, *, doctor_id: int = ALL_PATIENTS) -> Dict[AlertSeverity, int]:
+        """Unresolved alerts per severity for a doctor's patients (primary key lookup)."""
+        rows = (
+            db.query(self.model.severity, self.model.unresolved_count)
+            .filter(self.model.doctor_id == doctor_id)
+            .all()
+        )
+        counts = {severity: 0 for severity in AlertSeverity}
+        for severity, count in rows:
+            counts[severity] = max(count, 0)
+        return counts
+
+    def adjust(self, db: Session, *, patient_id: int, severity: AlertSeverity, delta: int) -> None:
+        """Count an alert of `patient_id` being opened (+1) or resolved (-1)."""
+        doctor_id = db.query(User.doctor_id).filter(User.id == patient_id).scalar()
+        self.apply(db, self._scopes(doctor_id, severity, delta))
+
+    def adjust_many(self, db: Session, alerts: Iterable[Tuple[int, AlertSeverity]], delta: int = 1) -> None:
+        """Like adjust() for many (patient_id, severity) pairs, with one doctor lookup."""
+        per_patient: Dict[Tuple[int, AlertSeverity], int] = defaultdict(int)
+        for patient_id, severity in alerts:
+            if severity is not None:
+                per_patient[(patient_id, severity)] += delta
+        if not per_patient:
+            return
+        patient_ids = {patient_id for patient_id, _ in per_patient}
+        doctors = dict(db.query(User.id, User.doctor_id).filter(User.id.in_(patient_ids)).all())
+        deltas: Dict[CounterKey, int] = defaultdict(int)
+        for (patient_id, severity), count in per_patient.items():
+            for key, value in self._scopes(doctors.get(patient_id), severity, count).items():
+                deltas[key] += value
+        self.apply(db, deltas)
+
+    @staticmethod
+    def _scopes(doctor_id: Optional[int], severity: AlertSeverity, delta: int) -> Dict[CounterKey, int]:
+        deltas = {(ALL_PATIENTS, severity): delta}
+        if doctor_id:
+            deltas[(doctor_id, severity)] = delta
+        return deltas
+
+    def apply(self, db: Session, deltas: Dict[CounterKey, int]) -> None:
+        """Add `deltas` to the counters with one upsert per counter."""
+        for (doctor_id, severity), delta in deltas.items():
+            if delta:
+                upsert.increment(
+                    db,
+                    self.model,
+                    {"doctor_id": doctor_id, "severity": severity},
+                    "unresolved_count",
+                    delta,
+                    {"updated_at": func.now()},
+                )
+
+    def reconcile(self, db: Session) -> int:
+        """
+        Recount unresolved alerts and correct every counter that drifted.
+        Commits, and returns the number of counters corrected.
+        """
+        query = db.query(self.model)
+        if db.get_bind().dialect.name == "postgresql":
+            # Writers adjusting a counter wait until the recount is stored, so
+            # their alert is either part of the recount or applied on top of it
+            query = query.with_for_update()
+        stored: Dict[CounterKey, int] = {(row.doctor_id, row.severity): row.unresolved_count for row in query.all()}
+
+        actual: Dict[CounterKey, int] = defaultdict(int)
+        rows = (
+            db.query(User.doctor_id, Alert.severity, func.count(Alert.id))
+            .select_from(Alert)
+            .outerjoin(User, User.id == Alert.patient_id)
+            .filter(Alert.is_resolved == False, Alert.severity.isnot(None))
+            .group_by(User.doctor_id, Alert.severity)
+            .all()
+        )
+        for doctor_id, severity, count in rows:
+            for key, value in self._scopes(doctor_id, severity, count).items():
+                actual[key] += value
+
+        deltas = {
+            key: actual.get(key, 0) - stored.get(key, 0)
+            for key in set(stored) | set(actual)
+            if actual.get(key, 0) != stored.get(key, 0)
+        }
+        self.apply(db, deltas)
+        # Counters are not tracked writes: show the corrected counts to the views reading them
+        for doctor_id, _ in deltas:
+            resource_versions.mark(db, [ALERTS], scope=UNASSIGNED if doctor_id == ALL_PATIENTS else doctor_id)
+        db.commit()
+        return len(deltas)
+
+
+alert_counters = CRUDAlertCounters(AlertCounter)
@@ -2,24 +2,27 @@ from sqlalchemy.orm import Session
 from typing import List
 import datetime
 from app.crud.base import CRUDBase
-from app.models import Anomaly, DiseaseThresholds
+from app.models import Anomaly
 from app.schemas.anomaly import AnomalyCreate, AnomalyUpdate, AnomalyCheckRequest, AnomalyCheckResponse
+from app.models.domain_models import VitalSign
+from app.services import rule_engine
 
 class CRUDAnomalies(CRUDBase[Anomaly, AnomalyCreate, AnomalyUpdate]):
     def check(self, db: Session, req: AnomalyCheckRequest) -> AnomalyCheckResponse:
         """
-        Check vital signs against disease thresholds to detect anomalies
+        Check vital signs against disease thresholds and anomaly rules to detect anomalies.
+        There is no reading history here, so rate and sustained rules never match.
         """
         # Get patient's diseases and their thresholds
         patient_id = req.patient_id
         vitals = req.vitals
         detected_anomalies = []
         
-        # Get disease thresholds from the database
-        disease_thresholds = db.query(DiseaseThresholds).all()
+        # Compiled thresholds and rules (cached, shared with the vitals anomaly check)
+        plan = rule_engine.get_plan(db)
         
-        # If no disease thresholds are defined, use default ranges
-        if not disease_thresholds:
+        # If no disease thresholds or rules are defined, use default ranges
+        if not plan.rules:
             # Default threshold values for general health monitoring
             default_thresholds = {
                 'systolic': {'min': 90, 'max': 140},
@@ -49,61 +52,21 @@ class CRUDAnomalies(CRUDBase[Anomaly, AnomalyCreate, AnomalyUpdate]):
                         db.flush()
                         detected_anomalies.append(anomaly_obj)
         else:
-            # Check each disease's thresholds
-            for disease in disease_thresholds:
-                # Check heart rate
-                if 'heart_rate' in vitals and vitals['heart_rate'] is not None:
-                    value = vitals['heart_rate']
-                    if value < disease.heart_rate_min or value > disease.heart_rate_max:
-                        # Create anomaly record
-                        anomaly_obj = Anomaly(
-                            patient_id=patient_id,
-                            vital_id=0,  # We don't have a specific vital ID here
-                            disease=disease.disease,
-                            threshold_min=disease.heart_rate_min,
-                            threshold_max=disease.heart_rate_max,
-                            actual_value=value,
-                            timestamp=datetime.datetime.utcnow()
-                        )
-                        db.add(anomaly_obj)
-                        db.flush()
-                        detected_anomalies.append(anomaly_obj)
-                
-                # Check temperature
-                if 'temperature' in vitals and vitals['temperature'] is not None:
-                    value = vitals['temperature']
-                    if value < disease.temperature_min or value > disease.temperature_max:
-                        # Create anomaly record
-                        anomaly_obj = Anomaly(
-                            patient_id=patient_id,
-                            vital_id=0,  # We don't have a specific vital ID here
-                            disease=disease.disease,
-                            threshold_min=disease.temperature_min,
-                            threshold_max=disease.temperature_max,
-                            actual_value=value,
-                            timestamp=datetime.datetime.utcnow()
-                        )
-                        db.add(anomaly_obj)
-                        db.flush()
-                        detected_anomalies.append(anomaly_obj)
-                
-                # Check SPO2
-                if 'spo2' in vitals and vitals['spo2'] is not None:
-                    value = vitals['spo2']
-                    if value < disease.spo2_min or value > disease.spo2_max:
-                        # Create anomaly record
-                        anomaly_obj = Anomaly(
-                            patient_id=patient_id,
-                            vital_id=0,  # We don't have a specific vital ID here
-                            disease=disease.disease,
-                            threshold_min=disease.spo2_min,
-                            threshold_max=disease.spo2_max,
-                            actual_value=value,
-                            timestamp=datetime.datetime.utcnow()
-                        )
-                        db.add(anomaly_obj)
-                        db.flush()
-                        detected_anomalies.append(anomaly_obj)
+            reading = tuple(vitals.get(vital.value) for vital in VitalSign) + (None,)
+            for rule in plan.evaluate(reading):
+                # Create anomaly record
+                anomaly_obj = Anomaly(
+                    patient_id=patient_id,
+                    vital_id=0,  # We don't have a specific vital ID here
+                    disease=rule.disease,
+                    threshold_min=rule.threshold_min,
+                    threshold_max=rule.threshold_max,
+                    actual_value=rule.actual_value(reading),
+                    timestamp=datetime.datetime.utcnow()
+                )
+                db.add(anomaly_obj)
+                db.flush()
+                detected_anomalies.append(anomaly_obj)
         
         # Commit all changes
         db.commit()
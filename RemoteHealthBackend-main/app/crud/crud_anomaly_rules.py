@@ -0,0 +1,84 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.base import CRUDBase
+from app.models.domain_models import AnomalyRule
+from app.schemas.anomaly_rule import AnomalyRule as AnomalyRuleSchema, AnomalyRuleCreate, AnomalyRuleUpdate
+
+
+class CRUDAnomalyRules(CRUDBase[AnomalyRule, AnomalyRuleCreate, AnomalyRuleUpdate]):
+    def __init__(self, model):
+        super().__init__(model)
+        # (active rules, monotonic load time); shares the thresholds cache TTL
+        self._active: Optional[Tuple[Tuple[AnomalyRuleSchema, ...], float]] = None
+        self._lock = threading.Lock()
+
+    def get_active_cached(self, db: Session) -> Tuple[AnomalyRuleSchema, ...]:
+        """
+        Active rules, cached like the disease thresholds: invalidated by writes
+        through this object, re-read after ANOMALY_RULES_CACHE_TTL_SECONDS.
+        The same tuple object is returned until the cache is refreshed.
+        """
+        cached = self._active
+        if cached is not None and time.monotonic() - cached[1] < settings.ANOMALY_RULES_CACHE_TTL_SECONDS:
+            return cached[0]
+        with self._lock:
+            cached = self._active
+            if cached is None or time.monotonic() - cached[1] >= settings.ANOMALY_RULES_CACHE_TTL_SECONDS:
+                rows = (
+                    db.query(self.model)
+                    .filter(self.model.is_active.is_(True))
+                    .order_by(self.model.id)
+                    .all()
+                )
+                cached = (tuple(AnomalyRuleSchema.model_validate(row) for row in rows), time.monotonic())
+                self._active = cached
+            return cached[0]
+
+    def invalidate(self) -> None:
+        self._active = None
+
+    def get_by_name(self, db: Session, *, name: str) -> Optional[AnomalyRule]:
+        return db.query(self.model).filter(self.model.name == name).first()
+
+    def get_multi(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[AnomalyRule]:
+        return db.query(self.model).order_by(self.model.id).offset(skip).limit(limit).all()
+
+    @staticmethod
+    def _to_columns(obj_in: Union[AnomalyRuleCreate, AnomalyRuleUpdate]) -> Dict[str, Any]:
+        data = obj_in.model_dump(exclude_unset=isinstance(obj_in, AnomalyRuleUpdate))
+        # Conditions go into a JSON column, so store plain values rather than enums
+        if data.get("conditions") is not None:
+            data["conditions"] = [condition.model_dump(mode="json", exclude_none=True) for condition in obj_in.conditions]
+        return data
+
+    def create(self, db: Session, *, obj_in: AnomalyRuleCreate) -> AnomalyRule:
+        db_obj = self.model(**self._to_columns(obj_in))
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        self.invalidate()
+        return db_obj
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: AnomalyRule,
+        obj_in: Union[AnomalyRuleUpdate, Dict[str, Any]]
+    ) -> AnomalyRule:
+        if not isinstance(obj_in, dict):
+            obj_in = self._to_columns(obj_in)
+        db_obj = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        self.invalidate()
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> AnomalyRule:
+        db_obj = super().remove(db, id=id)
+        self.invalidate()
+        return db_obj
+
+anomaly_rules = CRUDAnomalyRules(AnomalyRule)
@@ -0,0 +1,136 @@
+import threading
+import time
+from typing import Dict, FrozenSet, List, Optional, Set
+
+from sqlalchemy import exists, func
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.config import settings
+from app.crud.crud_resource_versions import MARKED, PATIENTS, resource_versions
+from app.db import upsert
+from app.models.domain_models import Disease, PatientDiseaseTag
+from app.models.user_model import User
+from app.services import patient_search
+
+
+class CohortSnapshot:
+    """
+    Immutable patient (User) id set of every disease, keyed by disease key,
+    and the disease keys of every tagged patient.
+    """
+
+    def __init__(self, members: Dict[str, FrozenSet[int]]):
+        self.members = members
+        tags: Dict[int, Set[str]] = {}
+        for key, ids in members.items():
+            for patient_id in ids:
+                tags.setdefault(patient_id, set()).add(key)
+        self.tags = {patient_id: frozenset(keys) for patient_id, keys in tags.items()}
+        self.loaded_at = time.monotonic()
+
+    def get(self, key: str) -> FrozenSet[int]:
+        return self.members.get(key, frozenset())
+
+    def tags_of(self, patient_id: int) -> FrozenSet[str]:
+        return self.tags.get(patient_id, frozenset())
+
+
+class CRUDDiseases:
+    """
+    Chronic disease dictionary and patient-disease association. Writes do not
+    commit: callers apply them in the same transaction as the profile or
+    threshold change they come from.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._cohorts: Optional[CohortSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get_multi(self, db: Session) -> List[Disease]:
+        return db.query(self.model).order_by(self.model.name).all()
+
+    def get_by_name(self, db: Session, *, name: str) -> Optional[Disease]:
+        return db.query(self.model).filter(self.model.key == patient_search.disease_key(name)).first()
+
+    def ensure(self, db: Session, names: Dict[str, str]) -> None:
+        """Add the diseases (key -> display name) missing from the dictionary."""
+        if not names:
+            return
+        existing = {key for (key,) in db.query(self.model.key).filter(self.model.key.in_(names))}
+        missing = [{"key": key, "name": name} for key, name in names.items() if key not in existing]
+        # A concurrent profile write may add the same disease first
+        upsert.insert_missing(db, self.model, missing, ["key"])
+
+    def set_patient_diseases(self, db: Session, *, patient_id: int, chronic_diseases: Optional[str]) -> Set[str]:
+        """Replace the association rows of a patient from their free-text diseases."""
+        diseases = patient_search.parse_diseases(chronic_diseases)
+        self.ensure(db, diseases)
+        db.query(PatientDiseaseTag).filter(PatientDiseaseTag.patient_id == patient_id).execution_options(
+            **{MARKED: True}
+        ).delete()
+        resource_versions.mark_patients(db, PATIENTS, [patient_id])
+        db.add_all(PatientDiseaseTag(patient_id=patient_id, tag=key) for key in diseases)
+        self.invalidate_cohorts()
+        return set(diseases)
+
+    def get_cohorts(self, db: Session) -> CohortSnapshot:
+        """
+        Cached patient id sets per disease. Profile writes through this worker
+        invalidate them at once; other workers' writes are picked up after
+        DISEASE_COHORT_CACHE_TTL_SECONDS.
+        """
+        cohorts = self._cohorts
+        if cohorts is not None and time.monotonic() - cohorts.loaded_at < settings.DISEASE_COHORT_CACHE_TTL_SECONDS:
+            return cohorts
+        with self._lock:
+            cohorts = self._cohorts
+            if cohorts is None or time.monotonic() - cohorts.loaded_at >= settings.DISEASE_COHORT_CACHE_TTL_SECONDS:
+                members: Dict[str, Set[int]] = {}
+                for patient_id, tag in db.query(PatientDiseaseTag.patient_id, PatientDiseaseTag.tag):
+                    members.setdefault(tag, set()).add(patient_id)
+                cohorts = CohortSnapshot({key: frozenset(ids) for key, ids in members.items()})
+                self._cohorts = cohorts
+            return cohorts
+
+    def get_cohort(self, db: Session, *, disease: str) -> FrozenSet[int]:
+        """Patient (User) ids with `disease`, matched on its normalized name."""
+        return self.get_cohorts(db).get(patient_search.disease_key(disease))
+
+    def get_patient_tags(self, db: Session, *, patient_id: int) -> FrozenSet[str]:
+        """Disease keys of a patient, from the cached cohorts."""
+        return self.get_cohorts(db).tags_of(patient_id)
+
+    def patient_has(self, patient_id: ColumnElement, *, disease: str) -> ColumnElement:
+        """
+        Filter on a patient id column: the patient has `disease`. An EXISTS
+        probe of the (patient_id, tag) primary key, for queries; the cached
+        cohorts are for counting.
+        """
+        return exists().where(
+            PatientDiseaseTag.patient_id == patient_id,
+            PatientDiseaseTag.tag == patient_search.disease_key(disease),
+        )
+
+    def invalidate_cohorts(self) -> None:
+        self._cohorts = None
+
+    def counts(self, db: Session, *, doctor_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        Cohort size per disease key, optionally among the patients of
+        `doctor_id`. All patients come from the cached cohorts; one doctor's
+        are counted in SQL, joining the tags to their doctor.
+        """
+        if doctor_id is None:
+            return {key: len(ids) for key, ids in self.get_cohorts(db).members.items()}
+        rows = (
+            db.query(PatientDiseaseTag.tag, func.count(PatientDiseaseTag.patient_id))
+            .join(User, User.id == PatientDiseaseTag.patient_id)
+            .filter(User.doctor_id == doctor_id)
+            .group_by(PatientDiseaseTag.tag)
+        )
+        return {key: count for key, count in rows}
+
+
+diseases = CRUDDiseases(Disease)
@@ -1,5 +1,8 @@
+import logging
+
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, and_, desc, func
+from sqlalchemy import and_, case, desc, func, or_, select
+from sqlalchemy.engine import Row
 from typing import List, Optional, Tuple
 
 from app.crud.base import CRUDBase
@@ -8,6 +11,8 @@ from app.models.user_model import UserRole
 from app.schemas.message import MessageCreate, Message as MessageSchema, ChatPartner as ChatPartnerSchema
 from app.crud import crud_user # To get user details
 
+logger = logging.getLogger(__name__)
+
 class CRUDMessage(CRUDBase[Message, MessageCreate, MessageCreate]): # Using MessageCreate for Update for now
     def create_message(self, db: Session, *, obj_in: MessageCreate, sender_id: int) -> Message:
         db_obj = Message(
@@ -66,53 +71,59 @@ class CRUDMessage(CRUDBase[Message, MessageCreate, MessageCreate]): # Using Mess
 
     def get_chat_partners(
         self, db: Session, *, current_user: User
-    ) -> List[ChatPartnerSchema]:
-        # The 'current_user' from the dependency is a Pydantic schema, not a SQLAlchemy model.
-        # We need to fetch the SQLAlchemy model instance to access its relationships.
-        user_db = db.query(User).filter(User.id == current_user.id).first()
-        if not user_db:
-            return []
-
-        print(f"DEBUG: get_chat_partners called by current_user: ID={user_db.id}, Role={user_db.role}") # DEBUG
-        partners = []
-        potential_partners: List[User] = []
-
-        if user_db.role == UserRole.PATIENT:
+    ) -> List[Row]:
+        """
+        A patient's doctor, or a doctor's patients, with the last message of
+        each conversation and its unread count, as plain rows with the
+        ChatPartner fields. One query whatever the number of partners.
+        """
+        logger.debug("get_chat_partners called by current_user: ID=%s, Role=%s", current_user.id, current_user.role)
+        if current_user.role == UserRole.PATIENT:
             # Patient sees their assigned doctor, if any
-            if user_db.doctor:
-                print(f"DEBUG: Current user is PATIENT with doctor_id {user_db.doctor_id}. Fetching their DOCTOR.") # DEBUG
-                potential_partners.append(user_db.doctor)
-            else:
-                print(f"DEBUG: Current user is PATIENT but has no assigned doctor.") # DEBUG
-
-        elif user_db.role == UserRole.DOCTOR:
+            is_partner = User.id == select(User.doctor_id).where(User.id == current_user.id).scalar_subquery()
+        elif current_user.role == UserRole.DOCTOR:
             # Doctor sees all patients assigned to them
-            print(f"DEBUG: Current user is DOCTOR. Fetching assigned PATIENTs.") # DEBUG
-            potential_partners = user_db.patients
-        
-        print(f"DEBUG: Found {len(potential_partners)} potential_partners.") # DEBUG
-        for partner_user_obj in potential_partners:
-            if partner_user_obj.id == user_db.id:
-                print(f"DEBUG: Skipping self (ID={user_db.id}).") # DEBUG
-                continue
+            is_partner = User.doctor_id == current_user.id
+        else:
+            return []
 
-            last_msg_obj = self.get_last_message(db, user_id=user_db.id, partner_id=partner_user_obj.id)
-            unread_count = self.get_unread_count(db, user_id=user_db.id, partner_id=partner_user_obj.id)
-            
-            partner_full_name = f"{partner_user_obj.first_name} {partner_user_obj.last_name}"
-            
-            chat_partner_data = ChatPartnerSchema(
-                id=partner_user_obj.id,
-                name=partner_full_name,
-                role=partner_user_obj.role,
-                last_message=last_msg_obj.content if last_msg_obj else None,
-                last_message_timestamp=last_msg_obj.timestamp if last_msg_obj else None,
-                unread_count=unread_count,
+        # Every message of the current user, numbered newest first per partner
+        partner_id = case((Message.sender_id == current_user.id, Message.receiver_id), else_=Message.sender_id)
+        conversation = (
+            select(
+                partner_id.label("partner_id"),
+                Message.content,
+                Message.timestamp,
+                func.row_number().over(
+                    partition_by=partner_id,
+                    order_by=(Message.timestamp.desc(), Message.id.desc()),
+                ).label("position"),
+            )
+            .where(or_(Message.sender_id == current_user.id, Message.receiver_id == current_user.id))
+            .subquery()
+        )
+        unread = (
+            select(Message.sender_id.label("partner_id"), func.count(Message.id).label("unread_count"))
+            .where(Message.receiver_id == current_user.id, Message.is_read == False)
+            .group_by(Message.sender_id)
+            .subquery()
+        )
+        partners = (
+            db.query(
+                User.id,
+                (User.first_name + " " + User.last_name).label("name"),
+                User.role,
+                conversation.c.content.label("last_message"),
+                conversation.c.timestamp.label("last_message_timestamp"),
+                func.coalesce(unread.c.unread_count, 0).label("unread_count"),
             )
-            print(f"DEBUG: Appending ChatPartnerSchema: id={chat_partner_data.id}, name={chat_partner_data.name}") # DEBUG
-            partners.append(chat_partner_data)
-        
-        print(f"DEBUG: Returning {len(partners)} final chat partners.") # DEBUG
+            .outerjoin(conversation, and_(conversation.c.partner_id == User.id, conversation.c.position == 1))
+            .outerjoin(unread, unread.c.partner_id == User.id)
+            .filter(is_partner, User.id != current_user.id)
+            .order_by(User.id)
+            .all()
+        )
+        logger.debug("Returning %s final chat partners.", len(partners))
         return partners
 
     def mark_as_read(self, db: Session, *, message_id: int, current_user_id: int) -> Optional[Message]:
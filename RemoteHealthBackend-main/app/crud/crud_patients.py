@@ -1,21 +1,110 @@
 from sqlalchemy.orm import Session, Query
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Union
 from app.crud.base import CRUDBase
-from app.models import PatientProfile, User, Alert
+from app.crud.crud_diseases import diseases
+from app.models import PatientDiseaseTag, PatientProfile, PatientRiskScore, User, Alert
 from app.models.domain_models import AlertSeverity
 from app.schemas.patient import PatientProfileCreate, PatientProfileUpdate
-from sqlalchemy import or_
+from app.services import patient_search, risk_scoring
+from sqlalchemy import case, exists
+from sqlalchemy.engine import Row
+
+# Columns of PatientDataResponse, labelled with its field names. Patients
+# without a profile get their user name as full_name and no profile fields.
+LIST_COLUMNS = (
+    PatientProfile.id,
+    User.id.label("user_id"),
+    User.email,
+    User.role,
+    case(
+        (PatientProfile.id.is_(None), User.first_name + " " + User.last_name),
+        else_=PatientProfile.full_name,
+    ).label("full_name"),
+    PatientProfile.age,
+    PatientProfile.chronic_diseases,
+    PatientProfile.date_of_birth,
+    PatientProfile.gender,
+    PatientProfile.address,
+    PatientProfile.phone_number,
+    PatientRiskScore.score.label("risk_score"),
+    PatientProfile.created_at,
+    PatientProfile.updated_at,
+)
 
 class CRUDPatients(CRUDBase[PatientProfile, PatientProfileCreate, PatientProfileUpdate]):
     def get_by_user_id(self, db: Session, *, user_id: int) -> Optional[PatientProfile]:
         return db.query(self.model).filter(self.model.user_id == user_id).first()
 
+    def create(self, db: Session, *, obj_in: PatientProfileCreate) -> PatientProfile:
+        db_obj = super().create(db, obj_in=obj_in)
+        self._profile_changed(db, db_obj)
+        return db_obj
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: PatientProfile,
+        obj_in: Union[PatientProfileUpdate, Dict[str, Any]]
+    ) -> PatientProfile:
+        db_obj = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        self._profile_changed(db, db_obj)
+        return db_obj
+
+    def _profile_changed(self, db: Session, db_obj: PatientProfile) -> None:
+        diseases.set_patient_diseases(db, patient_id=db_obj.user_id, chronic_diseases=db_obj.chronic_diseases)
+        # Commits the diseases together with the refreshed score
+        risk_scoring.refresh_chronic(db, db_obj.user_id)
+        patient_search.invalidate()
+
     def get_by_doctor_id(
         self, db: Session, *, doctor_id: int
     ) -> List[PatientProfile]:
         return (
-            db.query(self.model).filter(self.model.doctor_id == doctor_id).all()
+            db.query(self.model)
+            .join(User, self.model.user_id == User.id)
+            .filter(User.doctor_id == doctor_id)
+            .all()
+        )
+
+    def get_multi_by_risk(
+        self,
+        db: Session,
+        *,
+        doctor_id: Optional[int] = None,
+        with_profile_only: bool = False,
+        name_search: Optional[str] = None,
+        chronic_disease_filter: Optional[str] = None,
+        alarm_severity_filter: Optional[AlertSeverity] = None,
+        skip: int = 0,
+        limit: Optional[int] = 100,
+    ) -> List[Row]:
+        """
+        Patients with their profile and cached risk score as plain rows of
+        LIST_COLUMNS, highest risk first (patients without a score last).
+        Scoped to `doctor_id`'s patients, or to every patient with a profile
+        when None.
+        """
+        query = (
+            db.query(*LIST_COLUMNS)
+            .select_from(User)
+            .outerjoin(self.model, self.model.user_id == User.id)
+            .outerjoin(PatientRiskScore, PatientRiskScore.patient_id == User.id)
+        )
+        if doctor_id is not None:
+            query = query.filter(User.doctor_id == doctor_id)
+        if doctor_id is None or with_profile_only:
+            query = query.filter(self.model.id.isnot(None))
+        query = self._apply_filters(
+            db, query,
+            name_search=name_search,
+            chronic_disease_filter=chronic_disease_filter,
+            alarm_severity_filter=alarm_severity_filter,
         )
+        query = query.order_by(PatientRiskScore.score.desc().nulls_last(), User.id).offset(skip)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
 
     def get_multi_filtered(
         self, 
@@ -33,24 +122,49 @@ class CRUDPatients(CRUDBase[PatientProfile, PatientProfileCreate, PatientProfile
         if doctor_id:
             query = query.join(User, PatientProfile.user_id == User.id).filter(User.doctor_id == doctor_id)
 
+        query = self._apply_filters(
+            db, query,
+            name_search=name_search,
+            chronic_disease_filter=chronic_disease_filter,
+            alarm_severity_filter=alarm_severity_filter,
+        )
+        return query.order_by(self.model.id).offset(skip).limit(limit).all()
+
+    def _apply_filters(
+        self,
+        db: Session,
+        query: Query,
+        *,
+        name_search: Optional[str] = None,
+        chronic_disease_filter: Optional[str] = None,
+        alarm_severity_filter: Optional[AlertSeverity] = None,
+    ) -> Query:
+        """
+        Name substring (trigram-indexed), exact disease tag and open-alert
+        severity filters. Each is a semi-join on PatientProfile.user_id, so no
+        row is duplicated and no DISTINCT is needed.
+        """
         if name_search:
-            query = query.filter(PatientProfile.full_name.ilike(f"%{name_search}%"))
+            query = query.filter(patient_search.name_criterion(db, name_search))
 
         if chronic_disease_filter:
-            query = query.filter(PatientProfile.chronic_diseases.ilike(f"%{chronic_disease_filter}%"))
+            tags = patient_search.disease_tags(chronic_disease_filter)
+            query = query.filter(
+                exists().where(
+                    PatientDiseaseTag.patient_id == self.model.user_id,
+                    PatientDiseaseTag.tag.in_(tags),
+                )
+            )
 
         if alarm_severity_filter:
-            if not any(target.entity is User for target in query._legacy_setup_joins):
-                query = query.join(User, PatientProfile.user_id == User.id)
-            
-            query = (
-                query.join(Alert, User.id == Alert.patient_id)
-                .filter(Alert.severity == alarm_severity_filter)
-                .filter(Alert.is_resolved == False)
+            query = query.filter(
+                exists().where(
+                    Alert.patient_id == self.model.user_id,
+                    Alert.severity == alarm_severity_filter,
+                    Alert.is_resolved == False,
+                )
             )
-        
-        query = query.distinct(PatientProfile.id)
 
-        return query.offset(skip).limit(limit).all()
+        return query
 
-patients = CRUDPatients(PatientProfile) 
\ No newline at end of file
+patients = CRUDPatients(PatientProfile) 
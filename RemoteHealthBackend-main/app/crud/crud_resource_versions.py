@@ -0,0 +1,269 @@
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Type
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import upsert
+from app.models.domain_models import ResourceVersion
+from app.models.user_model import User, UserRole
+
+VITALS = "vitals"
+ALERTS = "alerts"
+PATIENTS = "patients"
+
+# Table -> resource whose version a write to it bumps. Only tables the polled
+# responses show are listed: derived tables (patient_risk_scores,
+# alert_counters) only change along with one of these.
+RESOURCE_TABLES = {
+    "vitals": VITALS,
+    "alerts": ALERTS,
+    "users": PATIENTS,
+    "patient_profiles": PATIENTS,
+    "patient_disease_tags": PATIENTS,
+}
+
+# Column holding the patient (User) id of a row of each tracked table
+PATIENT_COLUMNS = {
+    "vitals": "patient_id",
+    "alerts": "patient_id",
+    "users": "id",
+    "patient_profiles": "user_id",
+    "patient_disease_tags": "patient_id",
+}
+
+# Versions are kept per (resource, scope). A write is counted under the doctor
+# of the patients it touched, so one doctor's patients do not invalidate
+# another doctor's dashboard and writers for different doctors update
+# different rows. These scopes are not doctors:
+# - writes that cannot be attributed (bulk statements, COPY, DDL): every view includes them;
+# - patients without a doctor: only the all-patients views include them.
+UNATTRIBUTED = 0
+UNASSIGNED = -1
+
+# Beyond this many patients a transaction is counted as UNATTRIBUTED instead
+# of looking up each patient's doctor
+MAX_ATTRIBUTED_PATIENTS = 500
+
+# Execution option of bulk statements whose caller marks the patients it
+# wrote with mark_patients(), e.g. update(Alert).execution_options(**{MARKED: True})
+MARKED = "resource_versions_marked"
+
+# session.info keys of what the current transaction wrote: (resource, scope)
+# pairs, patient ids per resource, and the pairs bumped by the commit in progress
+_PENDING = "resource_versions_pending"
+_PENDING_PATIENTS = "resource_versions_pending_patients"
+_COMMITTING = "resource_versions_committing"
+
+Key = Tuple[str, int]
+
+# Called with the bumped (resource, scope) pairs after each commit (in-process domain events)
+_commit_listeners: List[Callable[[Set[Key]], None]] = []
+
+
+class Version(NamedTuple):
+    version: int
+    updated_at: Optional[datetime]
+
+
+def scoped_name(resource: str, doctor_id: Optional[int]) -> str:
+    """Name of a resource as seen by one doctor (None: by all-patients views)."""
+    return resource if doctor_id is None else f"{resource}@{doctor_id}"
+
+
+def doctor_family(name: str) -> Optional[str]:
+    """The name standing for a scoped name under every doctor ("vitals@12" -> "vitals@*"), else None."""
+    resource, scoped, _ = name.partition("@")
+    return f"{resource}@*" if scoped else None
+
+
+def affected_names(keys: Iterable[Key]) -> Set[str]:
+    """Scoped names (and doctor families) of the views the bumped (resource, scope) pairs change."""
+    names = set()
+    for resource, scope in keys:
+        names.add(resource)
+        if scope == UNATTRIBUTED:
+            names.add(f"{resource}@*")
+        elif scope != UNASSIGNED:
+            names.add(scoped_name(resource, scope))
+    return names
+
+
+class CRUDResourceVersions:
+    """
+    Version counters per resource and doctor. Sessions tracked by
+    track_writes() bump what they wrote in the same transaction, right before
+    it commits.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def get(self, db: Session, resources: Iterable[str], *, doctor_id: Optional[int] = None) -> Dict[str, Version]:
+        """
+        Current version of each resource as seen by the patients of `doctor_id`,
+        or by all patients when None; never written ones are 0. A version is
+        the sum of the counters in view, which grows with every bump among them.
+        """
+        resources = list(resources)
+        versions = {resource: Version(0, None) for resource in resources}
+        query = (
+            db.query(self.model.resource, func.sum(self.model.version), func.max(self.model.updated_at))
+            .filter(self.model.resource.in_(resources))
+        )
+        if doctor_id is not None:
+            query = query.filter(self.model.scope.in_((doctor_id, UNATTRIBUTED)))
+        for resource, version, updated_at in query.group_by(self.model.resource).all():
+            if isinstance(updated_at, str):
+                # SQLite loses the column type of max()
+                updated_at = datetime.fromisoformat(updated_at)
+            if updated_at is not None and updated_at.tzinfo is None:
+                # SQLite drops the offset; the value was written in UTC
+                updated_at = updated_at.replace(tzinfo=timezone.utc)
+            versions[resource] = Version(int(version or 0), updated_at)
+        return versions
+
+    def bump(self, db: Session, keys: Iterable[Key]) -> None:
+        """Increment the (resource, scope) counters with one upsert each. The caller commits."""
+        now = datetime.now(timezone.utc)
+        # Same order in every transaction, so concurrent writers cannot deadlock on the rows
+        for resource, scope in sorted(set(keys)):
+            upsert.increment(db, self.model, {"resource": resource, "scope": scope}, "version", 1, {"updated_at": now})
+
+    def mark(self, db: Session, resources: Iterable[str], *, scope: int = UNATTRIBUTED) -> None:
+        """
+        Bump `resources` when `db` commits. Only needed for writes the session
+        does not see, such as COPY on the raw connection or DDL.
+        """
+        db.info.setdefault(_PENDING, set()).update((resource, scope) for resource in resources)
+
+    def mark_patients(self, db: Session, resource: str, patient_ids: Iterable[int]) -> None:
+        """Bump `resource` for the doctors of `patient_ids` when `db` commits."""
+        db.info.setdefault(_PENDING_PATIENTS, {}).setdefault(resource, set()).update(patient_ids)
+
+
+resource_versions = CRUDResourceVersions(ResourceVersion)
+
+
+def _doctor_scopes(db: Session, pending: Dict[str, Set[int]]) -> Set[Key]:
+    patient_ids = set().union(*pending.values())
+    if len(patient_ids) > MAX_ATTRIBUTED_PATIENTS:
+        return {(resource, UNATTRIBUTED) for resource in pending}
+    doctors = dict(db.query(User.id, User.doctor_id).filter(User.id.in_(patient_ids)).all())
+    return {
+        # A patient gone by now (deleted) may have been any doctor's
+        (resource, (doctors[patient_id] or UNASSIGNED) if patient_id in doctors else UNATTRIBUTED)
+        for resource, ids in pending.items()
+        for patient_id in ids
+    }
+
+
+def _mark_objects(session: Session, objects: Iterable) -> None:
+    patients: Dict[str, Set[int]] = {}
+    scopes: Set[Key] = set()
+    for obj in objects:
+        table = getattr(getattr(obj, "__table__", None), "name", None)
+        resource = RESOURCE_TABLES.get(table)
+        if resource is None:
+            continue
+        state = inspect(obj)
+        if isinstance(obj, User):
+            if state.dict.get("role", UserRole.PATIENT) != UserRole.PATIENT:
+                continue
+            # Old (when loaded, see _before_flush) and new doctor
+            doctor_ids = state.attrs.doctor_id.history.sum()
+            if doctor_ids:
+                scopes.update((resource, doctor_id or UNASSIGNED) for doctor_id in doctor_ids)
+                continue
+        # Current and flushed-over values; none when the attribute was never loaded
+        patient_ids = [patient_id for patient_id in state.attrs[PATIENT_COLUMNS[table]].history.sum() if patient_id]
+        if patient_ids:
+            patients.setdefault(resource, set()).update(patient_ids)
+        else:
+            scopes.add((resource, UNATTRIBUTED))
+    if scopes:
+        session.info.setdefault(_PENDING, set()).update(scopes)
+    for resource, ids in patients.items():
+        resource_versions.mark_patients(session, resource, ids)
+
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+    # A reassigned patient leaves the list of a doctor that attribute history
+    # only knows when doctor_id was loaded before it changed; read it while
+    # the row still holds it
+    moved = set()
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            history = inspect(obj).attrs.doctor_id.history
+            if history.added and not history.deleted and obj.id is not None:
+                moved.add(obj.id)
+    if moved:
+        with session.no_autoflush:
+            previous = session.query(User.doctor_id).filter(User.id.in_(moved), User.role == UserRole.PATIENT)
+            session.info.setdefault(_PENDING, set()).update(
+                (PATIENTS, doctor_id or UNASSIGNED) for (doctor_id,) in previous
+            )
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    # The collections and attribute histories still hold what was just flushed
+    _mark_objects(session, chain(session.new, session.dirty, session.deleted))
+
+
+def _do_orm_execute(orm_execute_state) -> None:
+    # Bulk INSERT/UPDATE/DELETE statements, including Query.update() and .delete()
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.execution_options.get(MARKED):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and table.name in RESOURCE_TABLES:
+        resource_versions.mark(orm_execute_state.session, [RESOURCE_TABLES[table.name]])
+
+
+def _before_commit(session: Session) -> None:
+    # commit() flushes after this hook; flush first so those writes are counted too
+    session.flush()
+    pending = session.info.pop(_PENDING, set())
+    patients = session.info.pop(_PENDING_PATIENTS, None)
+    if patients:
+        pending |= _doctor_scopes(session, patients)
+    if pending:
+        resource_versions.bump(session, pending)
+        session.info[_COMMITTING] = pending
+
+
+def _after_commit(session: Session) -> None:
+    committed = session.info.pop(_COMMITTING, None)
+    if committed:
+        for listener in _commit_listeners:
+            listener(committed)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+    session.info.pop(_PENDING_PATIENTS, None)
+    session.info.pop(_COMMITTING, None)
+
+
+def on_commit(listener: Callable[[Set[Key]], None]) -> None:
+    """Call `listener` with the (resource, scope) pairs each commit of this worker bumped."""
+    if listener not in _commit_listeners:
+        _commit_listeners.append(listener)
+
+
+def track_writes(session_class: Type[Session] = Session) -> None:
+    """Bump resource versions on commit in every session of `session_class` (idempotent)."""
+    if not event.contains(session_class, "before_commit", _before_commit):
+        event.listen(session_class, "before_flush", _before_flush)
+        event.listen(session_class, "after_flush", _after_flush)
+        event.listen(session_class, "do_orm_execute", _do_orm_execute)
+        event.listen(session_class, "before_commit", _before_commit)
+        event.listen(session_class, "after_commit", _after_commit)
+        event.listen(session_class, "after_rollback", _after_rollback)
+
+
+if settings.HTTP_CACHE_ENABLED:
+    track_writes()
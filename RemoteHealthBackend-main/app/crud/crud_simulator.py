@@ -0,0 +1,84 @@
+from typing import List, Optional
+from datetime import datetime, timezone
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.models.domain_models import SimulatedPatient, SimulatorState
+from app.schemas.simulator import SimulatedPatientCreate, SimulatedPatientUpdate
+
+# The simulator state table only ever holds this one row
+SIMULATOR_STATE_ID = 1
+
+class CRUDSimulator(CRUDBase[SimulatedPatient, SimulatedPatientCreate, SimulatedPatientUpdate]):
+    def get_state(self, db: Session) -> SimulatorState:
+        # The migration seeds the row; this only covers databases created without it
+        state = db.query(SimulatorState).filter(SimulatorState.id == SIMULATOR_STATE_ID).first()
+        if not state:
+            db.add(SimulatorState(id=SIMULATOR_STATE_ID, is_running=False))
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker inserted the row first
+                db.rollback()
+            state = db.query(SimulatorState).filter(SimulatorState.id == SIMULATOR_STATE_ID).one()
+        return state
+
+    def set_running(self, db: Session, *, is_running: bool) -> SimulatorState:
+        state = self.get_state(db)
+        state.is_running = is_running
+        db.add(state)
+        db.commit()
+        db.refresh(state)
+        return state
+
+    def record_leader_heartbeat(self, db: Session, *, leader_id: str) -> None:
+        self.get_state(db)
+        db.execute(
+            update(SimulatorState)
+            .where(SimulatorState.id == SIMULATOR_STATE_ID)
+            .values(leader_id=leader_id, leader_heartbeat_at=datetime.now(timezone.utc))
+        )
+        db.commit()
+
+    def get_by_patient_id(self, db: Session, *, patient_id: int) -> Optional[SimulatedPatient]:
+        return db.query(self.model).filter(self.model.patient_id == patient_id).first()
+
+    def get_all(self, db: Session) -> List[SimulatedPatient]:
+        return db.query(self.model).order_by(self.model.patient_id).all()
+
+    def create(self, db: Session, *, obj_in: SimulatedPatientCreate) -> SimulatedPatient:
+        db_obj = self.model(
+            **obj_in.model_dump(),
+            started_at=datetime.now(timezone.utc),
+            readings_generated=0,
+        )
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def remove_by_patient_id(self, db: Session, *, patient_id: int) -> bool:
+        deleted = db.query(self.model).filter(self.model.patient_id == patient_id).delete(synchronize_session=False)
+        db.commit()
+        return deleted > 0
+
+    def remove_all(self, db: Session) -> int:
+        deleted = db.query(self.model).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def record_reading(self, db: Session, *, patient_id: int, generated_at: datetime) -> None:
+        # Increment in SQL so concurrent writers never lose a count
+        db.execute(
+            update(self.model)
+            .where(self.model.patient_id == patient_id)
+            .values(
+                readings_generated=self.model.readings_generated + 1,
+                last_generated_at=generated_at,
+            )
+        )
+        db.commit()
+
+simulator = CRUDSimulator(SimulatedPatient)
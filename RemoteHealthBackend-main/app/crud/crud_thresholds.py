@@ -0,0 +1,100 @@
+import hashlib
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.base import CRUDBase
+from app.crud.crud_diseases import diseases
+from app.models.domain_models import DiseaseThresholds, VitalSign
+from app.services import patient_search
+from app.schemas.threshold import DiseaseThreshold, DiseaseThresholdCreate, DiseaseThresholdUpdate
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ThresholdSnapshot:
+    """
+    Immutable view of every threshold row, indexed for the API and the anomaly
+    engine. `etag` is derived from the content, so every worker holding the
+    same rules serves the same ETag.
+    """
+
+    def __init__(self, thresholds: List[DiseaseThreshold]):
+        self.thresholds = thresholds
+        self.by_id: Dict[int, DiseaseThreshold] = {t.id: t for t in thresholds}
+        self.by_disease: Dict[str, List[DiseaseThreshold]] = {}
+        self.by_vital: Dict[VitalSign, List[DiseaseThreshold]] = {}
+        for threshold in thresholds:
+            self.by_disease.setdefault(threshold.disease.lower(), []).append(threshold)
+            self.by_vital.setdefault(threshold.vital, []).append(threshold)
+        digest = hashlib.sha1()
+        for threshold in thresholds:
+            digest.update(threshold.model_dump_json(exclude={"created_at", "updated_at"}).encode("utf-8"))
+        self.etag = f'"{digest.hexdigest()}"'
+        self.loaded_at = time.monotonic()
+
+
+class CRUDThresholds(CRUDBase[DiseaseThresholds, DiseaseThresholdCreate, DiseaseThresholdUpdate]):
+    def __init__(self, model):
+        super().__init__(model)
+        self._snapshot: Optional[ThresholdSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get_snapshot(self, db: Session) -> ThresholdSnapshot:
+        """
+        Cached thresholds. Writes through this object invalidate the cache at
+        once; changes made by other workers are picked up after
+        THRESHOLDS_CACHE_TTL_SECONDS.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < settings.THRESHOLDS_CACHE_TTL_SECONDS:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.monotonic() - snapshot.loaded_at >= settings.THRESHOLDS_CACHE_TTL_SECONDS:
+                rows = db.query(self.model).order_by(self.model.id).all()
+                snapshot = ThresholdSnapshot([DiseaseThreshold.model_validate(row) for row in rows])
+                self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+    def get_by_disease_and_vital(self, db: Session, *, disease: str, vital: VitalSign) -> Optional[DiseaseThresholds]:
+        return (
+            db.query(self.model)
+            .filter(self.model.disease == disease, self.model.vital == vital)
+            .first()
+        )
+
+    def create(self, db: Session, *, obj_in: DiseaseThresholdCreate) -> DiseaseThresholds:
+        db_obj = super().create(db, obj_in=obj_in)
+        self._add_to_dictionary(db, db_obj)
+        self.invalidate()
+        return db_obj
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: DiseaseThresholds,
+        obj_in: Union[DiseaseThresholdUpdate, Dict[str, Any]]
+    ) -> DiseaseThresholds:
+        db_obj = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        self._add_to_dictionary(db, db_obj)
+        self.invalidate()
+        return db_obj
+
+    def _add_to_dictionary(self, db: Session, db_obj: DiseaseThresholds) -> None:
+        diseases.ensure(db, {patient_search.disease_key(db_obj.disease): db_obj.disease})
+        db.commit()
+
+    def remove(self, db: Session, *, id: int) -> DiseaseThresholds:
+        db_obj = super().remove(db, id=id)
+        self.invalidate()
+        return db_obj
+
+thresholds = CRUDThresholds(DiseaseThresholds)
@@ -1,17 +1,37 @@
-from typing import List, Optional
+import csv
+import io
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, insert, literal, or_, select
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 from app.crud.base import CRUDBase
-from app.models.domain_models import Vitals, DiseaseThresholds, AlertSeverity
+from app.crud.crud_resource_versions import ALERTS as ALERTS_RESOURCE, MARKED, VITALS as VITALS_RESOURCE
+from app.models.domain_models import Vitals, AlertSeverity, Anomaly, Alert, VitalSign
 from app.schemas.patient import VitalsCreate, VitalsUpdate, Vitals as VitalsSchema
 from app import crud, schemas
+from app.core.config import settings
+from app.services import risk_scoring, rule_engine, streaming_detector
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Column order used by bulk_create, matching the COPY column list
+BULK_COLUMNS = (
+    "patient_id", "heart_rate", "temperature", "spo2", "systolic", "diastolic", "pulse", "timestamp", "source", "import_id",
+)
+
+# Columns of the Vitals response schema; history reads select only these
+LIST_COLUMNS = (
+    Vitals.id, Vitals.patient_id, Vitals.timestamp, Vitals.heart_rate, Vitals.temperature,
+    Vitals.spo2, Vitals.systolic, Vitals.diastolic, Vitals.pulse, Vitals.source,
+)
+
 class CRUDVitals(CRUDBase[Vitals, VitalsCreate, VitalsUpdate]):
-    def get_vitals_by_patient_id(self, db: Session, *, patient_id: int, skip: int = 0, limit: int = 100) -> List[VitalsSchema]:
+    def get_vitals_by_patient_id(self, db: Session, *, patient_id: int, skip: int = 0, limit: int = 100) -> List[Row]:
+        """Newest readings first, as plain rows of LIST_COLUMNS rather than ORM entities."""
         return (
-            db.query(self.model)
+            db.query(*LIST_COLUMNS)
             .filter(self.model.patient_id == patient_id)
             .order_by(self.model.timestamp.desc())
             .offset(skip)
@@ -19,6 +39,14 @@ class CRUDVitals(CRUDBase[Vitals, VitalsCreate, VitalsUpdate]):
             .all()
         )
 
+    def get_vitals_columns_by_patient_id(
+        self, db: Session, *, patient_id: int, skip: int = 0, limit: int = 100
+    ) -> Dict[str, list]:
+        """The page of get_vitals_by_patient_id as one list per LIST_COLUMNS column."""
+        rows = self.get_vitals_by_patient_id(db, patient_id=patient_id, skip=skip, limit=limit)
+        values = zip(*rows) if rows else ((),) * len(LIST_COLUMNS)
+        return {column.key: list(column_values) for column, column_values in zip(LIST_COLUMNS, values)}
+
     def create_with_patient(
         self, db: Session, *, obj_in: VitalsCreate, patient_id: int
     ) -> Vitals:
@@ -31,38 +59,53 @@ class CRUDVitals(CRUDBase[Vitals, VitalsCreate, VitalsUpdate]):
 
     def create_and_check(self, db: Session, *, obj_in: VitalsCreate, patient_id: int) -> Vitals:
         """
-        Creates a new vital sign record and then immediately checks for anomalies,
-        creating alerts if necessary.
+        Creates a new vital sign record and then immediately checks for anomalies
+        (thresholds, anomaly rules and the streaming trend detector), creating
+        alerts if necessary.
         """
         vital = self.create_with_patient(db=db, obj_in=obj_in, patient_id=patient_id)
-        logger.info(f"Created vital record with id: {vital.id} for patient_id: {patient_id}")
-
-        thresholds = db.query(DiseaseThresholds).first()
-        if not thresholds:
-            logger.warning(f"No disease thresholds found in the database. Skipping anomaly check for vital {vital.id}.")
-            return vital
+        logger.debug("Created vital record with id: %s for patient_id: %s", vital.id, patient_id)
+        reading_count = risk_scoring.record_reading(db, vital)
 
-        logger.info(f"Using thresholds for '{thresholds.disease}' to check vital {vital.id}.")
         detected_anomalies = []
+        plan = rule_engine.get_plan(db)
+        if plan.rules:
+            plan = plan.for_diseases(crud.diseases.get_patient_tags(db, patient_id=vital.patient_id))
+            history = self._recent_readings(db, vital, limit=plan.history_depth) if plan.history_depth else ()
+            reading = rule_engine.reading_from(vital)
+            for rule in plan.evaluate(reading, history):
+                actual = rule.actual_value(reading)
+                anomaly = self._create_anomaly(db, vital, rule.disease, rule.threshold_min, rule.threshold_max, actual)
+                detected_anomalies.append((anomaly, rule.primary_vital, rule.severity, rule.alert_message(actual)))
+        else:
+            logger.warning(f"No disease thresholds or anomaly rules found in the database. Skipping rule check for vital {vital.id}.")
 
-        if vital.heart_rate and (vital.heart_rate < thresholds.heart_rate_min or vital.heart_rate > thresholds.heart_rate_max):
-            anomaly = self._create_anomaly(db, vital, "Cardiovascular", thresholds.heart_rate_min, thresholds.heart_rate_max, vital.heart_rate)
-            detected_anomalies.append(anomaly)
-
-        if vital.temperature and (vital.temperature < thresholds.temperature_min or vital.temperature > thresholds.temperature_max):
-            anomaly = self._create_anomaly(db, vital, "Systemic", thresholds.temperature_min, thresholds.temperature_max, vital.temperature)
-            detected_anomalies.append(anomaly)
-            
-        if vital.spo2 and (vital.spo2 < thresholds.spo2_min or vital.spo2 > thresholds.spo2_max):
-            anomaly = self._create_anomaly(db, vital, "Respiratory", thresholds.spo2_min, thresholds.spo2_max, vital.spo2)
-            detected_anomalies.append(anomaly)
+        if settings.STREAM_DETECTION_ENABLED:
+            for finding in streaming_detector.detector.observe(db, vital, reading_count):
+                anomaly = self._create_anomaly(db, vital, finding.disease, None, None, finding.score.value)
+                detected_anomalies.append((anomaly, finding.score.vital, AlertSeverity.YELLOW, finding.message))
 
-        for anomaly in detected_anomalies:
-            self._create_alert(db, anomaly)
+        for anomaly, vital_sign, severity, message in detected_anomalies:
+            self._create_alert(db, anomaly, vital_sign, severity, message, seen_at=vital.timestamp)
         
         return vital
 
-    def _create_anomaly(self, db: Session, vital: Vitals, disease: str, min_val: float, max_val: float, actual: float) -> schemas.anomaly.Anomaly:
+    def _recent_readings(self, db: Session, vital: Vitals, *, limit: int) -> List[tuple]:
+        """The patient's readings before `vital`, newest first, as rule engine readings."""
+        rows = (
+            db.query(*(getattr(self.model, v.value) for v in VitalSign), self.model.timestamp)
+            .filter(
+                self.model.patient_id == vital.patient_id,
+                self.model.id != vital.id,
+                self.model.timestamp <= vital.timestamp,
+            )
+            .order_by(self.model.timestamp.desc(), self.model.id.desc())
+            .limit(limit)
+            .all()
+        )
+        return [rule_engine.reading_from(row) for row in rows]
+
+    def _create_anomaly(self, db: Session, vital: Vitals, disease: str, min_val: Optional[float], max_val: Optional[float], actual: float) -> schemas.anomaly.Anomaly:
         logger.info(f"Anomaly detected for patient {vital.patient_id}: {disease} value {actual} is outside range ({min_val} - {max_val}).")
         anomaly_in = schemas.anomaly.AnomalyCreate(
             patient_id=vital.patient_id,
@@ -74,15 +117,226 @@ class CRUDVitals(CRUDBase[Vitals, VitalsCreate, VitalsUpdate]):
         )
         return crud.anomalies.create(db, obj_in=anomaly_in)
 
-    def _create_alert(self, db: Session, anomaly: schemas.anomaly.Anomaly) -> None:
-        logger.info(f"Creating alert for anomaly {anomaly.id} for patient {anomaly.patient_id}.")
+    def _create_alert(
+        self,
+        db: Session,
+        anomaly: schemas.anomaly.Anomaly,
+        vital_sign: Optional[VitalSign],
+        severity: AlertSeverity,
+        message: str,
+        *,
+        seen_at: Optional[datetime] = None,
+    ) -> None:
         alert_in = schemas.alert.AlertCreate(
             patient_id=anomaly.patient_id,
             anomaly_id=anomaly.id,
-            severity=AlertSeverity.RED,
-            message=f"Anomaly in {anomaly.disease}: value {anomaly.actual_value} is outside the normal range."
+            severity=severity,
+            message=message,
+            vital=vital_sign,
+        )
+        created = crud.alert.raise_alert(db, obj_in=alert_in, seen_at=seen_at)
+        if created is not None:
+            logger.info(f"Created alert {created.id} for anomaly {anomaly.id} for patient {anomaly.patient_id}.")
+        else:
+            logger.info(f"Coalesced anomaly {anomaly.id} into the open {severity.name} {vital_sign.value} alert of patient {anomaly.patient_id}.")
+
+    def bulk_create(self, db: Session, *, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert many vitals in one round trip without anomaly checks.
+        Uses COPY on PostgreSQL and a chunked executemany everywhere else.
+        The caller commits.
+        """
+        if not rows:
+            return 0
+        if db.get_bind().dialect.name == "postgresql":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow([
+                    # COPY reads an unquoted empty field as NULL; the enum is stored by name
+                    "" if row.get(column) is None else (row[column].name if column == "source" else row[column])
+                    for column in BULK_COLUMNS
+                ])
+            buffer.seek(0)
+            cursor = db.connection().connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {self.model.__tablename__} ({', '.join(BULK_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+            finally:
+                cursor.close()
+        else:
+            db.execute(insert(self.model).execution_options(**{MARKED: True}), rows)
+        # COPY runs on the raw connection, unseen by the session's write tracking
+        crud.resource_versions.mark_patients(db, VITALS_RESOURCE, {row["patient_id"] for row in rows})
+        return len(rows)
+
+    def check_anomalies_for_import(self, db: Session, *, import_id: str) -> Tuple[int, int]:
+        """
+        Anomaly pass over the vitals a bulk load stored with `import_id`, used
+        instead of calling create_and_check per reading. Readings stored
+        meanwhile by other writers were checked by create_and_check and are not
+        touched. Disease thresholds are applied set-based in SQL; multi-condition
+        anomaly rules are evaluated with the compiled rule plan in one ordered
+        pass over the import, where rate and sustained conditions only see
+        readings from the same import. Like live readings, a patient is only
+        checked against the global rules and those of their diseases.
+        Returns (anomalies_created, alerts_created).
+        """
+        rules = crud.thresholds.get_snapshot(db).thresholds
+        compiled_rules = [rule for rule in rule_engine.get_plan(db).rules if rule.rule_id is not None]
+        if not rules and not compiled_rules:
+            return 0, 0
+
+        first_anomaly_id = last_anomaly_id = db.query(func.coalesce(func.max(Anomaly.id), 0)).scalar()
+        alerts_created = 0
+        in_range = self.model.import_id == import_id
+        # Anomalies of this import, leaving out those live readings raise meanwhile
+        imported = Anomaly.vital_id.in_(select(self.model.id).where(in_range))
+        for rule in rules:
+            value = getattr(self.model, rule.vital.value)
+            conditions = [in_range, value != 0, or_(value < rule.min_value, value > rule.max_value)]
+            if rule.disease.strip():
+                conditions.append(crud.diseases.patient_has(self.model.patient_id, disease=rule.disease))
+            db.execute(
+                insert(Anomaly).from_select(
+                    ["patient_id", "vital_id", "disease", "threshold_min", "threshold_max", "actual_value", "timestamp"],
+                    select(
+                        self.model.patient_id,
+                        self.model.id,
+                        literal(rule.disease),
+                        literal(rule.min_value),
+                        literal(rule.max_value),
+                        value,
+                        self.model.timestamp,
+                    ).where(*conditions),
+                )
+            )
+            last_anomaly_id, created = self._insert_alerts_after(
+                db,
+                after_anomaly_id=last_anomaly_id,
+                imported=imported,
+                vital_sign=rule.vital,
+                severity=rule.severity,
+                message=None,
+            )
+            alerts_created += created
+
+        if compiled_rules:
+            for rule, anomalies in self._match_compiled_rules(db, compiled_rules, in_range):
+                db.execute(insert(Anomaly), anomalies)
+                last_anomaly_id, created = self._insert_alerts_after(
+                    db,
+                    after_anomaly_id=last_anomaly_id,
+                    imported=imported,
+                    vital_sign=rule.primary_vital,
+                    severity=rule.severity,
+                    message=rule.message,
+                )
+                alerts_created += created
+
+        anomalies_created = (
+            db.query(func.count(Anomaly.id)).filter(Anomaly.id > first_anomaly_id, imported).scalar()
+        )
+        logger.info(
+            f"Bulk anomaly pass over import {import_id} created {anomalies_created} anomalies "
+            f"and {alerts_created} alerts."
+        )
+        return anomalies_created, alerts_created
+
+    def _insert_alerts_after(
+        self,
+        db: Session,
+        *,
+        after_anomaly_id: int,
+        imported,
+        vital_sign: VitalSign,
+        severity: AlertSeverity,
+        message: Optional[str],
+    ) -> Tuple[int, int]:
+        """
+        Raise alerts for the `imported` anomalies with id > after_anomaly_id, coalesced the
+        same way as live alerts: per patient, anomalies less than
+        ALERT_COALESCE_WINDOW_MINUTES apart form one alert that keeps the first
+        anomaly, its time as created_at and the last one as last_seen_at. A None
+        message means the threshold message for the first anomaly's value.
+        Returns (new highest anomaly id, alerts created).
+        """
+        window = settings.ALERT_COALESCE_WINDOW_MINUTES * 60
+        rows = (
+            db.query(Anomaly.id, Anomaly.patient_id, Anomaly.disease, Anomaly.actual_value, Anomaly.timestamp)
+            .filter(Anomaly.id > after_anomaly_id, imported)
+            .order_by(Anomaly.patient_id, Anomaly.timestamp, Anomaly.id)
+        )
+        alerts: List[Dict[str, Any]] = []
+        highest_id = after_anomaly_id
+        current = None
+        for row in rows.yield_per(settings.IMPORT_BATCH_SIZE):
+            highest_id = max(highest_id, row.id)
+            # Alerts carry the reading time so historical imports land in the past
+            if (
+                current is not None
+                and window > 0
+                and current["patient_id"] == row.patient_id
+                and row.timestamp is not None
+                and current["last_seen_at"] is not None
+                and (row.timestamp - current["last_seen_at"]).total_seconds() <= window
+            ):
+                current["occurrence_count"] += 1
+                current["last_seen_at"] = row.timestamp
+                continue
+            current = {
+                "patient_id": row.patient_id,
+                "anomaly_id": row.id,
+                "severity": severity,
+                "vital": vital_sign,
+                "message": message or f"Anomaly in {row.disease}: value {row.actual_value} is outside the normal range.",
+                "is_resolved": False,
+                "created_at": row.timestamp,
+                "last_seen_at": row.timestamp,
+                "occurrence_count": 1,
+            }
+            alerts.append(current)
+        if alerts:
+            db.execute(insert(Alert).execution_options(**{MARKED: True}), alerts)
+            crud.resource_versions.mark_patients(db, ALERTS_RESOURCE, {alert["patient_id"] for alert in alerts})
+            crud.alert_counters.adjust_many(db, ((alert["patient_id"], severity) for alert in alerts))
+            # Recent imports may have opened alerts live readings should fold into
+            crud.alert.invalidate_open_index()
+        return highest_id, len(alerts)
+
+    def _match_compiled_rules(self, db: Session, compiled_rules: List, in_range) -> List[Tuple[Any, List[Dict[str, Any]]]]:
+        full_plan = plan = rule_engine.EvaluationPlan(compiled_rules)
+        cohorts = crud.diseases.get_cohorts(db)
+        matches: Dict[int, List[Dict[str, Any]]] = {}
+        history: List[tuple] = []
+        current_patient = None
+        rows = (
+            db.query(self.model.id, self.model.patient_id, self.model.timestamp, *(getattr(self.model, v.value) for v in VitalSign))
+            .filter(in_range)
+            .order_by(self.model.patient_id, self.model.timestamp, self.model.id)
         )
-        crud.alert.create(db=db, obj_in=alert_in)
+        for row in rows.yield_per(5000):
+            if row.patient_id != current_patient:
+                current_patient = row.patient_id
+                plan = full_plan.for_diseases(cohorts.tags_of(row.patient_id))
+                history = []
+            reading = rule_engine.reading_from(row)
+            for rule in plan.evaluate(reading, history):
+                matches.setdefault(id(rule), []).append({
+                    "patient_id": row.patient_id,
+                    "vital_id": row.id,
+                    "disease": rule.disease,
+                    "threshold_min": rule.threshold_min,
+                    "threshold_max": rule.threshold_max,
+                    "actual_value": rule.actual_value(reading),
+                    "timestamp": row.timestamp,
+                })
+            if full_plan.history_depth:
+                history.insert(0, reading)
+                del history[full_plan.history_depth:]
+        return [(rule, matches[id(rule)]) for rule in compiled_rules if id(rule) in matches]
 
     def get_multi_by_patient(
         self, db: Session, *, patient_id: int, skip: int = 0, limit: int = 100
@@ -2,4 +2,4 @@
 # imported by Alembic
 from app.models.base import Base  # noqa
 from app.models.user_model import User  # noqa
-from app.models.domain_models import PatientProfile, Vitals, Anomaly, Alert, Message, DoctorNotes, ReminderFlag, DiseaseThresholds, LocationCluster  # noqa 
\ No newline at end of file
+from app.models.domain_models import PatientProfile, Disease, PatientDiseaseTag, Vitals, Anomaly, Alert, AlertCounter, ResourceVersion, PatientRiskScore, Message, DoctorNotes, ReminderFlag, DiseaseThresholds, AnomalyRule, LocationCluster, SimulatorState, SimulatedPatient  # noqa 
\ No newline at end of file
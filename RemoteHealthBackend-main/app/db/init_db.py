@@ -1,5 +1,4 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from datetime import date, datetime, time
 import logging
 
@@ -10,6 +9,7 @@ from app.models.user_model import UserRole # Ensure UserRole is imported
 from app.models.domain_models import (
     DataSource, 
     DiseaseThresholds, 
+    VitalSign,
     AlertSeverity,
     DoctorNotes,  # Added
     Message as MessageModel, # Added and aliased to avoid Pydantic schema conflict
@@ -25,6 +25,7 @@ from app.schemas.anomaly import AnomalyCreate
 from app.schemas.alert import AlertCreate
 from app.schemas.note import NoteCreate
 from app.schemas.message import MessageCreate
+from app.schemas.threshold import DiseaseThresholdCreate
 
 logger = logging.getLogger(__name__)
 
@@ -97,15 +98,22 @@ def init_db(db: Session) -> None:
             if potential_anomalous_vital:
                 created_vital_for_anomaly = potential_anomalous_vital
 
-    # Create a Disease Threshold for Hypertension
+    # Create the Disease Thresholds for Hypertension, one row per vital sign
     hypertension_threshold = db.query(DiseaseThresholds).filter(DiseaseThresholds.disease == "Hypertension").first()
     if not hypertension_threshold:
-        # Create the DiseaseThresholds record using raw SQL to avoid typing issues
-        db.execute(text("""
-            INSERT INTO disease_thresholds (disease, heart_rate_min, heart_rate_max, temperature_min, temperature_max, spo2_min, spo2_max, created_at)
-            VALUES ('Hypertension', 60.0, 120.0, 36.0, 37.5, 95.0, 100.0, CURRENT_TIMESTAMP)
-        """))
-        db.commit()
+        for vital, min_value, max_value, unit in (
+            (VitalSign.HEART_RATE, 60.0, 120.0, "bpm"),
+            (VitalSign.TEMPERATURE, 36.0, 37.5, "°C"),
+            (VitalSign.SPO2, 95.0, 100.0, "%"),
+        ):
+            crud.thresholds.create(db, obj_in=DiseaseThresholdCreate(
+                disease="Hypertension",
+                vital=vital,
+                min_value=min_value,
+                max_value=max_value,
+                severity=AlertSeverity.RED,
+                unit=unit,
+            ))
         hypertension_threshold = db.query(DiseaseThresholds).filter(DiseaseThresholds.disease == "Hypertension").first()
         
     # Create an Anomaly and Alert if a vital sign is out of range
@@ -143,7 +151,8 @@ def init_db(db: Session) -> None:
                     patient_id=patient_user.id,
                     anomaly_id=created_anomaly.id,
                     message=f"High heart rate detected: {vital_heart_rate} bpm.",
-                    severity=AlertSeverity.YELLOW 
+                    severity=AlertSeverity.YELLOW,
+                    vital=VitalSign.HEART_RATE
                 )
                 crud.alert.create_alert(db, obj_in=alert_in)
                 db.commit()
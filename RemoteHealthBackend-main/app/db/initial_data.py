@@ -1,7 +1,20 @@
+"""
+One-time database setup, run once per deployment rather than by every worker:
+
+    alembic upgrade head              # schema
+    python -m app.db.initial_data     # seed data
+
+For a throwaway development database without migrations, create the tables
+from the models instead:
+
+    python -m app.db.initial_data --create-tables
+"""
+import argparse
 import logging
 
+from app.db.base import Base
 from app.db.init_db import init_db
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, engine
 from app import crud
 from app.models.domain_models import Vitals as VitalsModel, Anomaly as AnomalyModel, Alert as AlertModel
 from app.core.config import settings
@@ -10,6 +23,18 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed the database with initial data.")
+    parser.add_argument(
+        "--create-tables",
+        action="store_true",
+        help="Create missing tables from the models first (development only; use alembic otherwise)",
+    )
+    args = parser.parse_args()
+
+    if args.create_tables:
+        logger.info("Creating tables")
+        Base.metadata.create_all(bind=engine)
+
     logger.info("Creating initial data")
     db = SessionLocal()
 
@@ -37,7 +62,10 @@ def main() -> None:
     else:
         logger.warning(f"User {patient_user_email} not found for data cleanup.")
 
-    init_db(db)
+    try:
+        init_db(db)
+    finally:
+        db.close()
     logger.info("Initial data created")
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""
+Per-request SQL query statistics.
+
+Cursor events on the engine count every statement and its time into the
+QueryStats of the current request (a context variable, which FastAPI copies
+into the threadpool that runs sync endpoints and dependencies). The
+middleware reports the totals in a `Server-Timing: db;dur=<ms>;desc="<n>
+queries"` header, a queries-per-request histogram at /metrics, a slow-query
+log carrying the route, and an optional per-request query budget.
+
+Queries run after the response headers are sent (streamed exports) are still
+counted in the metrics and budget, but not in the header. With
+QUERY_BUDGET_STRICT, a request over budget by the time its headers are ready
+fails with a 500 instead of them; one that only goes over while streaming its
+body raises once the response is sent, which surfaces in the test client (or
+the server log), not as a 5xx.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUERIES_PER_REQUEST = metrics.registry.register(metrics.Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per HTTP request, by route template.",
+    ("method", "route"),
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+))
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class QueryStats:
+    def __init__(self, scope: Optional[Scope] = None):
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+
+    @property
+    def milliseconds(self) -> float:
+        return self.seconds * 1000
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_routes = metrics.RouteTemplates()
+
+
+def _describe(stats: Optional[QueryStats]) -> str:
+    if stats is None or stats.scope is None:
+        return "outside a request"
+    return f"{stats.scope['method']} {_routes.lookup(stats.scope)}"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which a statement that raises leaves behind
+    context._query_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started_at
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold and elapsed * 1000 >= threshold:
+        # Parameters are left out: they carry patient data
+        logger.warning("Slow query (%.1f ms) in %s: %s", elapsed * 1000, _describe(stats), statement)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach the query counting and slow-query events to `engine` (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Count the statements run in this block, e.g. around a CRUD call in a test."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def server_timing(stats: QueryStats) -> str:
+    return f'db;dur={stats.milliseconds:.3f};desc="{stats.count} queries"'
+
+
+def _check_budget(stats: QueryStats) -> None:
+    budget = settings.QUERY_BUDGET
+    if budget is not None and stats.count > budget:
+        detail = f"{_describe(stats)} ran {stats.count} queries (budget {budget})"
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(detail)
+        logger.warning("Query budget exceeded: %s", detail)
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope)
+        # Statement count already held against the budget when headers went out
+        checked_count: Optional[int] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal checked_count
+            if message["type"] == "http.response.start":
+                if settings.QUERY_BUDGET_STRICT:
+                    # Still time to fail the request instead of sending it
+                    checked_count = stats.count
+                    _check_budget(stats)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stats).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current.set(stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            QUERIES_PER_REQUEST.observe(stats.count, scope["method"], _routes.lookup(scope))
+
+        if checked_count is None or stats.count > checked_count:
+            _check_budget(stats)
@@ -1,6 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.query_stats import instrument_engine
 
 # Use connect_args only for SQLite
 connect_args = {"check_same_thread": False} if settings.DATABASE_URL.startswith('sqlite') else {}
@@ -10,6 +11,8 @@ engine = create_engine(
     settings.DATABASE_URL, 
     connect_args=connect_args
 )
+if settings.QUERY_STATS_ENABLED:
+    instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Dependency
@@ -0,0 +1,88 @@
+"""
+Portable upserts for counter and dictionary tables.
+
+PostgreSQL and SQLite use one INSERT ... ON CONFLICT statement. Other
+databases fall back to an UPDATE (or a SELECT), then an INSERT inside a
+savepoint. A row inserted concurrently by another transaction makes that
+INSERT fail with IntegrityError; only the savepoint is rolled back and the
+row is updated as it now exists. None of these helpers commit.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+_ON_CONFLICT_INSERTS: Dict[str, Callable] = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def on_conflict_insert(db: Session) -> Optional[Callable]:
+    """The dialect's insert() with on_conflict_* support, or None."""
+    return _ON_CONFLICT_INSERTS.get(db.get_bind().dialect.name)
+
+
+def increment(
+    db: Session,
+    model,
+    key: Dict[str, Any],
+    column: str,
+    delta: int,
+    values: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Add `delta` to `column` of the row of `model` identified by `key` (its
+    unique columns), creating the row with `delta` when it is missing.
+    `values` are set on the row either way.
+    """
+    table = model.__table__
+    values = values or {}
+    dialect_insert = on_conflict_insert(db)
+    if dialect_insert is not None:
+        statement = dialect_insert(table).values(**key, **{column: delta}, **values)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=list(key),
+            set_={column: table.c[column] + delta, **values},
+        ))
+        return
+
+    add = (
+        update(table)
+        .where(*(table.c[name] == value for name, value in key.items()))
+        .values({column: table.c[column] + delta, **values})
+    )
+    if db.execute(add).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(table).values(**key, **{column: delta}, **values))
+    except IntegrityError:
+        db.execute(add)
+
+
+def insert_missing(db: Session, model, rows: List[Dict[str, Any]], key: Sequence[str]) -> None:
+    """Insert the `rows` of `model` whose `key` columns do not exist yet; existing rows are left alone."""
+    if not rows:
+        return
+    table = model.__table__
+    dialect_insert = on_conflict_insert(db)
+    if dialect_insert is not None:
+        db.execute(dialect_insert(table).values(rows).on_conflict_do_nothing(index_elements=list(key)))
+        return
+
+    columns = [table.c[name] for name in key]
+    wanted = [tuple(row[name] for name in key) for row in rows]
+    existing = set(db.execute(select(*columns).where(tuple_(*columns).in_(wanted))).tuples())
+    for row, row_key in zip(rows, wanted):
+        if row_key in existing:
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(insert(table).values(**row))
+        except IntegrityError:
+            # Added concurrently
+            pass
@@ -4,40 +4,40 @@ import json
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine
 
+from app.core import metrics
 from app.core.config import settings
+from app.api import deps
 from app.api.api_v1.api import api_router
-from app.db.session import engine, SessionLocal
-from app.db.base import Base
-from app.db.init_db import init_db
+from app.api.compression import CompressionMiddleware
+from app.db.query_stats import QueryStatsMiddleware
+from app.services import alert_counters, data_generator, partition_manager, profiler
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Importing this module and starting a worker never touch the database schema
+# or seed data: run `alembic upgrade head` and `python -m app.db.initial_data`
+# once per deployment instead (see README).
 
 # Configure logging
-logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+logging.basicConfig(stream=sys.stdout, level=settings.LOG_LEVEL.upper())
 logger = logging.getLogger(settings.PROJECT_NAME)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up the application...")
-    try:
-        db = SessionLocal()
-        init_db(db)
-        db.close()
-        logger.info("Database initialization completed successfully!")
-    except Exception as e:
-        logger.error(f"Database initialization failed: {e}")
-        # Not re-raising here to allow the app to start even if DB init fails,
-        # which might be desired in some scenarios. Log should be monitored.
+    # Every worker runs a coordinator; only the advisory-lock holder generates data
+    data_generator.start_coordinator()
+    partition_manager.start_maintenance()
+    alert_counters.start_reconciliation()
     yield
     # Shutdown
     logger.info("Shutting down the application...")
+    await data_generator.stop_coordinator()
+    await partition_manager.stop_maintenance()
+    await alert_counters.stop_reconciliation()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -73,9 +73,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.PROFILING_ENABLED:
+    app.add_middleware(profiler.ProfilingMiddleware, authorize=deps.is_superuser_token)
+
+if settings.QUERY_STATS_ENABLED:
+    app.add_middleware(QueryStatsMiddleware)
+
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Added last so it wraps CORS too and times the whole request
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics():
+        """Request metrics of this worker in the Prometheus text format."""
+        return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
 def root():
     return {"message": "Welcome to Remote Health Monitoring System API"} 
\ No newline at end of file
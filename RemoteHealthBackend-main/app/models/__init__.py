@@ -4,15 +4,24 @@ from .user_model import User
 from .domain_models import (
     AlertSeverity,
     DataSource,
+    VitalSign,
     PatientProfile,
+    Disease,
+    PatientDiseaseTag,
     Vitals,
     Anomaly,
     Alert,
+    AlertCounter,
+    ResourceVersion,
+    PatientRiskScore,
     Message,
     DoctorNotes,
     ReminderFlag,
     DiseaseThresholds,
-    LocationCluster
+    AnomalyRule,
+    LocationCluster,
+    SimulatorState,
+    SimulatedPatient
 )
 
 __all__ = [
@@ -20,13 +29,22 @@ __all__ = [
     "User",
     "AlertSeverity",
     "DataSource",
+    "VitalSign",
     "PatientProfile",
+    "Disease",
+    "PatientDiseaseTag",
     "Vitals",
     "Anomaly",
     "Alert",
+    "AlertCounter",
+    "ResourceVersion",
+    "PatientRiskScore",
     "Message",
     "DoctorNotes",
     "ReminderFlag",
     "DiseaseThresholds",
-    "LocationCluster"
+    "AnomalyRule",
+    "LocationCluster",
+    "SimulatorState",
+    "SimulatedPatient"
 ] 
\ No newline at end of file
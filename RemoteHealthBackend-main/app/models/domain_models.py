@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Enum, Text, Date
+from sqlalchemy import DDL, BigInteger, Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Enum, Text, Date, JSON, Index, UniqueConstraint, event, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -14,6 +14,15 @@ class DataSource(str, enum.Enum):
     SIMULATED = "simulated"
     DEVICE = "device"
 
+class VitalSign(str, enum.Enum):
+    """Vital sign a threshold applies to; values are the matching Vitals columns."""
+    HEART_RATE = "heart_rate"
+    TEMPERATURE = "temperature"
+    SPO2 = "spo2"
+    SYSTOLIC = "systolic"
+    DIASTOLIC = "diastolic"
+    PULSE = "pulse"
+
 class PatientProfile(Base):
     __tablename__ = "patient_profiles"
 
@@ -35,8 +44,55 @@ class PatientProfile(Base):
     # Relationships
     user = relationship("User", back_populates="patient_profile")
 
+# On PostgreSQL, full_name also has a pg_trgm GIN index (ix_patient_profiles_full_name_trgm)
+# so ILIKE '%term%' and typeahead similarity searches use an index
+event.listen(
+    PatientProfile.__table__,
+    "after_create",
+    DDL(
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm; "
+        "CREATE INDEX IF NOT EXISTS ix_patient_profiles_full_name_trgm "
+        "ON patient_profiles USING gin (full_name gin_trgm_ops)"
+    ).execute_if(dialect="postgresql"),
+)
+
+class Disease(Base):
+    """
+    Chronic disease dictionary. `key` is the normalized name (lowercase, single
+    spaces) shared by patient_disease_tags and threshold lookups; `name` keeps
+    the spelling it was first seen with.
+    """
+    __tablename__ = "diseases"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, nullable=False, unique=True, index=True)
+    name = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PatientDiseaseTag(Base):
+    """
+    Patient-disease association: one row per chronic disease of a patient,
+    derived from PatientProfile.chronic_diseases on every profile write so
+    disease filters are index lookups instead of substring scans.
+    """
+    __tablename__ = "patient_disease_tags"
+
+    patient_id = Column(Integer, ForeignKey("users.id"), primary_key=True, autoincrement=False)
+    tag = Column(String, ForeignKey("diseases.key"), primary_key=True, index=True)
+
 class Vitals(Base):
+    # On PostgreSQL this table is range-partitioned by month on timestamp
+    # (primary key (id, timestamp)); see app/services/partition_manager.py.
     __tablename__ = "vitals"
+    __table_args__ = (
+        Index("ix_vitals_patient_id_timestamp", "patient_id", "timestamp"),
+        Index(
+            "ix_vitals_import_id",
+            "import_id",
+            postgresql_where=text("import_id IS NOT NULL"),
+            sqlite_where=text("import_id IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("users.id"))
@@ -46,8 +102,10 @@ class Vitals(Base):
     systolic = Column(Integer, nullable=True)
     diastolic = Column(Integer, nullable=True)
     pulse = Column(Integer, nullable=True)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     source = Column(Enum(DataSource))
+    # Bulk import that stored the reading; NULL for live readings
+    import_id = Column(String, nullable=True)
 
     # Relationships
     patient = relationship("User", back_populates="vitals")
@@ -57,7 +115,8 @@ class Anomaly(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("users.id"))
-    vital_id = Column(Integer, ForeignKey("vitals.id"))
+    # No foreign key: PostgreSQL cannot reference a partitioned table by id alone
+    vital_id = Column(Integer, index=True)
     disease = Column(String)
     threshold_min = Column(Float)
     threshold_max = Column(Float)
@@ -66,6 +125,19 @@ class Anomaly(Base):
 
 class Alert(Base):
     __tablename__ = "alerts"
+    __table_args__ = (
+        Index("ix_alerts_patient_id_is_resolved", "patient_id", "is_resolved"),
+        # Keyset pagination of the alert feed
+        Index("ix_alerts_created_at_id", "created_at", "id"),
+        # At most one alert per (patient, vital, severity) absorbs repeats, across all workers
+        Index(
+            "uq_alerts_coalescing_key",
+            "patient_id", "vital", "severity",
+            unique=True,
+            postgresql_where=text("coalescing"),
+            sqlite_where=text("coalescing"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("users.id"))
@@ -75,6 +147,59 @@ class Alert(Base):
     is_resolved = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     resolved_at = Column(DateTime(timezone=True), nullable=True)
+    # Repeat anomalies of the same (patient, vital, severity) are coalesced into
+    # the open alert: the first anomaly is kept, the count and last_seen_at grow
+    vital = Column(Enum(VitalSign), nullable=True)
+    occurrence_count = Column(Integer, nullable=False, default=1, server_default="1")
+    last_seen_at = Column(DateTime(timezone=True), nullable=True)
+    # True on the alert that currently absorbs repeats of its key
+    coalescing = Column(Boolean, nullable=False, default=False, server_default=text("false"))
+
+class AlertCounter(Base):
+    """
+    Materialized count of unresolved alerts per severity, per doctor (the
+    patients' users.doctor_id) and for all patients (doctor_id 0). Kept in sync
+    by the alert CRUD and corrected by app/services/alert_counters.py.
+    """
+    __tablename__ = "alert_counters"
+
+    doctor_id = Column(Integer, primary_key=True, autoincrement=False)
+    severity = Column(Enum(AlertSeverity), primary_key=True)
+    unresolved_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ResourceVersion(Base):
+    """
+    Version counter of a group of tables ("vitals", "alerts", "patients") per
+    scope: the doctor of the patients written, 0 for writes that cannot be
+    attributed and -1 for patients without a doctor. Bumped by every
+    transaction that writes to them; dashboard reads derive their ETag and
+    Last-Modified from it (app/crud/crud_resource_versions.py).
+    """
+    __tablename__ = "resource_versions"
+
+    resource = Column(String, primary_key=True)
+    scope = Column(Integer, primary_key=True, autoincrement=False, default=0)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PatientRiskScore(Base):
+    """
+    Cached risk score (0-100) of a patient and its components, kept up to date
+    incrementally by app/services/risk_scoring.py so lists can sort by it.
+    """
+    __tablename__ = "patient_risk_scores"
+
+    patient_id = Column(Integer, ForeignKey("users.id"), primary_key=True, autoincrement=False)
+    score = Column(Float, nullable=False, default=0.0, index=True)
+    vitals_component = Column(Float, nullable=False, default=0.0)
+    alerts_component = Column(Float, nullable=False, default=0.0)
+    chronic_component = Column(Float, nullable=False, default=0.0)
+    # Advances by one per live reading (more on a full recompute); the
+    # streaming detector compares it with its own copy to tell whether other
+    # workers stored readings meanwhile
+    reading_count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 class Message(Base):
     __tablename__ = "messages"
@@ -125,16 +250,39 @@ class ReminderFlag(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class DiseaseThresholds(Base):
+    """Normal range of one vital sign for one disease; one row per (disease, vital)."""
     __tablename__ = "disease_thresholds"
+    __table_args__ = (
+        UniqueConstraint("disease", "vital", name="uq_disease_thresholds_disease_vital"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    disease = Column(String, unique=True)
-    heart_rate_min = Column(Float)
-    heart_rate_max = Column(Float)
-    temperature_min = Column(Float)
-    temperature_max = Column(Float)
-    spo2_min = Column(Float)
-    spo2_max = Column(Float)
+    disease = Column(String, nullable=False, index=True)
+    vital = Column(Enum(VitalSign), nullable=False)
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    # Severity of the alert raised when a reading falls outside the range
+    severity = Column(Enum(AlertSeverity), nullable=False, default=AlertSeverity.RED)
+    unit = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class AnomalyRule(Base):
+    """
+    Multi-condition anomaly rule. `conditions` is a JSON list of conditions
+    that must all hold (see app.schemas.anomaly_rule.RuleCondition); the rule
+    fires when they hold for `sustained_readings` consecutive readings.
+    """
+    __tablename__ = "anomaly_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    disease = Column(String, nullable=False)
+    severity = Column(Enum(AlertSeverity), nullable=False, default=AlertSeverity.RED)
+    conditions = Column(JSON, nullable=False)
+    sustained_readings = Column(Integer, nullable=False, default=1)
+    message = Column(String)
+    is_active = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -147,4 +295,26 @@ class LocationCluster(Base):
     risk_level = Column(Enum(AlertSeverity))
     patient_count = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class SimulatorState(Base):
+    """Single-row table holding the shared on/off switch of the data simulator."""
+    __tablename__ = "simulator_state"
+
+    id = Column(Integer, primary_key=True, index=True)
+    is_running = Column(Boolean, default=False, nullable=False)
+    leader_id = Column(String, nullable=True)
+    leader_heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class SimulatedPatient(Base):
+    __tablename__ = "simulated_patients"
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("users.id"), unique=True, index=True, nullable=False)
+    interval_seconds = Column(Integer, default=60, nullable=False)
+    patterns = Column(JSON, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    readings_generated = Column(Integer, default=0, nullable=False)
+    last_generated_at = Column(DateTime(timezone=True), nullable=True)
@@ -28,7 +28,7 @@ class User(Base):
     role = Column(Enum(UserRole), nullable=False)
     hashed_password = Column(String, nullable=False)
     doctor_code = Column(String, unique=True, index=True, nullable=True)
-    doctor_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    doctor_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     is_active = Column(Boolean(), default=True)
     is_superuser = Column(Boolean(), default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
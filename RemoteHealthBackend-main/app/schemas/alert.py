@@ -1,7 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, Optional, List
 from datetime import datetime
-from app.models.domain_models import AlertSeverity
+from app.models.domain_models import AlertSeverity, VitalSign
 
 class AlertBase(BaseModel):
     patient_id: int
@@ -9,6 +9,7 @@ class AlertBase(BaseModel):
     severity: AlertSeverity
     anomaly_id: Optional[int] = None
     is_resolved: Optional[bool] = False
+    vital: Optional[VitalSign] = None
 
 class AlertCreate(AlertBase):
     pass
@@ -22,6 +23,8 @@ class AlertInDBBase(AlertBase):
     id: int
     created_at: datetime
     resolved_at: Optional[datetime] = None
+    occurrence_count: int = 1
+    last_seen_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -34,6 +37,39 @@ class AlertList(BaseModel):
     alerts: List[Alert]
     total: int
 
+class AlertBulkResolve(BaseModel):
+    """Alerts to resolve: explicit ids, or every unresolved alert matching the filters."""
+    alert_ids: Optional[List[int]] = Field(None, min_length=1, max_length=10000)
+    patient_id: Optional[int] = None
+    severity: Optional[AlertSeverity] = None
+    before: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if self.alert_ids is None and self.patient_id is None and self.severity is None and self.before is None:
+            raise ValueError("Give alert_ids or at least one of patient_id, severity, before")
+        return self
+
+class AlertBulkResolveResult(BaseModel):
+    """Consolidated outcome of a bulk resolve."""
+    resolved: int
+    alert_ids: List[int]
+    by_severity: Dict[AlertSeverity, int]
+    patient_ids: List[int]
+
+class AlertFeedPage(BaseModel):
+    """One keyset page of the alert feed; pass `next_cursor` back as `cursor` for the next page."""
+    alerts: List[Alert]
+    next_cursor: Optional[str] = None
+
+class AlertCounts(BaseModel):
+    """Unresolved alerts per severity, for one doctor's patients or for all patients."""
+    doctor_id: Optional[int] = None
+    red: int
+    yellow: int
+    blue: int
+    total: int
+
 class MessageBase(BaseModel):
     message: str
 
@@ -6,8 +6,9 @@ class AnomalyBase(BaseModel):
     patient_id: int
     vital_id: int
     disease: str
-    threshold_min: float
-    threshold_max: float
+    # Composite rules may have only one bound (or none, for rate-of-change rules)
+    threshold_min: Optional[float] = None
+    threshold_max: Optional[float] = None
     actual_value: float
     timestamp: Optional[datetime] = None
 
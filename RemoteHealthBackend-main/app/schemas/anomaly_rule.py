@@ -0,0 +1,63 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional
+from datetime import datetime
+from app.models.domain_models import AlertSeverity, VitalSign
+
+# Upper bound on sustained_readings, which is also how far back a rule may look
+MAX_SUSTAINED_READINGS = 50
+
+class RuleCondition(BaseModel):
+    """
+    One condition of an anomaly rule:
+    * `threshold`: the vital compared to `value` with `op`, e.g. heart_rate > 120
+    * `range`: the vital falls outside [`min_value`, `max_value`]
+    * `rate`: the change of the vital per minute since the patient's previous
+      reading compared to `value` with `op`, e.g. temperature rising > 0.05/min
+    """
+    kind: Literal["threshold", "range", "rate"] = "threshold"
+    vital: VitalSign
+    op: Optional[Literal[">", ">=", "<", "<="]] = None
+    value: Optional[float] = None
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+
+    @model_validator(mode="after")
+    def check_operands(self):
+        if self.kind == "range":
+            if self.min_value is None and self.max_value is None:
+                raise ValueError("range conditions need min_value and/or max_value")
+            if self.min_value is not None and self.max_value is not None and self.min_value > self.max_value:
+                raise ValueError("min_value must not be greater than max_value")
+        elif self.op is None or self.value is None:
+            raise ValueError(f"{self.kind} conditions need op and value")
+        return self
+
+class AnomalyRuleBase(BaseModel):
+    name: str
+    disease: str
+    severity: AlertSeverity = AlertSeverity.RED
+    # All conditions must hold (AND)
+    conditions: List[RuleCondition] = Field(..., min_length=1)
+    sustained_readings: int = Field(1, ge=1, le=MAX_SUSTAINED_READINGS)
+    message: Optional[str] = None
+    is_active: bool = True
+
+class AnomalyRuleCreate(AnomalyRuleBase):
+    pass
+
+class AnomalyRuleUpdate(BaseModel):
+    name: Optional[str] = None
+    disease: Optional[str] = None
+    severity: Optional[AlertSeverity] = None
+    conditions: Optional[List[RuleCondition]] = Field(None, min_length=1)
+    sustained_readings: Optional[int] = Field(None, ge=1, le=MAX_SUSTAINED_READINGS)
+    message: Optional[str] = None
+    is_active: Optional[bool] = None
+
+class AnomalyRule(AnomalyRuleBase):
+    id: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
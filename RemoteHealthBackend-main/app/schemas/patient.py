@@ -65,6 +65,21 @@ class PatientDataResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class PatientSuggestion(BaseModel):
+    user_id: int
+    profile_id: int
+    full_name: str
+
+class PatientTypeahead(BaseModel):
+    patients: List[PatientSuggestion]
+    diseases: List[str] = Field(..., description="Matching normalized chronic disease tags")
+
+class DiseaseCohort(BaseModel):
+    id: int
+    key: str = Field(..., description="Normalized disease name used by the disease filters")
+    name: str
+    patient_count: int
+
 class VitalsBase(BaseModel):
     heart_rate: float = Field(..., alias='heartRate')
     temperature: float
@@ -77,6 +92,22 @@ class VitalsBase(BaseModel):
 class VitalsCreate(VitalsBase):
     pass
 
+class VitalsImportRow(VitalsBase):
+    """One row of a bulk vitals import. Accepts both the API aliases and the column names."""
+    patient_id: Optional[int] = Field(None, alias='patientId')
+    timestamp: Optional[datetime] = None
+
+    class Config:
+        populate_by_name = True
+
+class VitalsImportSummary(BaseModel):
+    rows_received: int
+    rows_imported: int
+    rows_rejected: int
+    errors: List[str]
+    anomalies_created: int
+    alerts_created: int
+
 class VitalsUpdate(BaseModel):
     heart_rate: Optional[float] = Field(None, alias='heartRate')
     temperature: Optional[float] = None
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+class SimulatedPatientBase(BaseModel):
+    interval_seconds: int = 60
+    patterns: List[str] = ["diurnal"]
+
+class SimulatedPatientCreate(SimulatedPatientBase):
+    patient_id: int
+
+class SimulatedPatientUpdate(BaseModel):
+    interval_seconds: Optional[int] = None
+    patterns: Optional[List[str]] = None
+
+class SimulatedPatient(SimulatedPatientBase):
+    id: int
+    patient_id: int
+    started_at: datetime
+    readings_generated: int
+    last_generated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
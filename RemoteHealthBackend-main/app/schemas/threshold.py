@@ -0,0 +1,37 @@
+from pydantic import BaseModel, model_validator
+from typing import Optional
+from datetime import datetime
+from app.models.domain_models import AlertSeverity, VitalSign
+
+class DiseaseThresholdBase(BaseModel):
+    disease: str
+    vital: VitalSign
+    min_value: float
+    max_value: float
+    severity: AlertSeverity = AlertSeverity.RED
+    unit: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_range(self):
+        if self.min_value > self.max_value:
+            raise ValueError("min_value must not be greater than max_value")
+        return self
+
+class DiseaseThresholdCreate(DiseaseThresholdBase):
+    pass
+
+class DiseaseThresholdUpdate(BaseModel):
+    disease: Optional[str] = None
+    vital: Optional[VitalSign] = None
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    severity: Optional[AlertSeverity] = None
+    unit: Optional[str] = None
+
+class DiseaseThreshold(DiseaseThresholdBase):
+    id: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
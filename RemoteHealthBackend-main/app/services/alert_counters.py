@@ -0,0 +1,74 @@
+"""
+Periodic reconciliation of the materialized unresolved-alert counters.
+
+The alert CRUD adjusts `alert_counters` in the same transaction as every alert
+it opens or resolves. Changes made around it (deleted alerts, patients moved
+to another doctor, manual SQL) make the counters drift; this job recounts the
+unresolved alerts and corrects them.
+
+Run it from cron, or let the in-app loop started from the lifespan handle it:
+    python -m app.services.alert_counters
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from app import crud
+from app.core.config import settings
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Background reconciliation task of this worker, started from the app lifespan
+reconcile_task: Optional[asyncio.Task] = None
+
+
+def reconcile_once() -> int:
+    db = SessionLocal()
+    try:
+        corrected = crud.alert_counters.reconcile(db)
+    finally:
+        db.close()
+    if corrected:
+        logger.warning(f"Corrected {corrected} drifted unresolved-alert counters.")
+    return corrected
+
+
+async def _reconcile_loop() -> None:
+    while True:
+        try:
+            await asyncio.to_thread(reconcile_once)
+        except Exception as e:
+            logger.error(f"Alert counter reconciliation failed: {str(e)}")
+        await asyncio.sleep(settings.ALERT_COUNTER_RECONCILE_SECONDS)
+
+
+def start_reconciliation() -> None:
+    """Start the periodic reconciliation. Must be called from a running event loop."""
+    global reconcile_task
+    if settings.ALERT_COUNTER_RECONCILE_SECONDS <= 0:
+        return
+    if reconcile_task is None or reconcile_task.done():
+        reconcile_task = asyncio.create_task(_reconcile_loop())
+
+
+async def stop_reconciliation() -> None:
+    global reconcile_task
+    if reconcile_task is None:
+        return
+    reconcile_task.cancel()
+    try:
+        await reconcile_task
+    except asyncio.CancelledError:
+        pass
+    reconcile_task = None
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    reconcile_once()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,30 +3,41 @@ Fake Live Data Generator for Remote Health Monitoring System.
 
 This module provides a mechanism to generate realistic vital sign data
 for patients in the system, simulating a real-world health monitoring scenario.
+
+Simulator configuration lives in the `simulator_state` and `simulated_patients`
+tables, so every worker sees the same state and it survives restarts. Each worker
+runs a SimulatorCoordinator; the one holding a PostgreSQL advisory lock becomes
+the leader and is the only one generating readings. On other databases (SQLite
+in development) there is a single process, so it always leads.
 """
 
 import asyncio
 import logging
+import os
 import random
-import time
-from datetime import datetime, timedelta
+import socket
+from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
 
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.crud import vitals as crud_vitals
-from app.crud import patients as crud_patients
-from app.models import User
+from app.crud import simulator as crud_simulator
 from app.models.domain_models import DataSource
 from app.schemas.patient import VitalsCreate
-from app.db.session import SessionLocal
+from app.schemas.simulator import SimulatedPatientCreate
+from app.db.session import SessionLocal, engine
 
 logger = logging.getLogger(__name__)
 
-# Global state tracking for the data generator service
-generator_task = None
-is_running = False
-patients_to_simulate = {}  # Dict to store patient IDs and their simulation parameters
+# Identifies this worker in the simulator status
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Background coordinator task of this worker, started from the app lifespan
+coordinator_task: Optional[asyncio.Task] = None
 
 
 class VitalSignSimulator:
@@ -144,11 +155,32 @@ class VitalSignSimulator:
         logger.info(f"Generated anomaly for patient {self.patient_id}: {vital}={readings[vital]}")
 
 
-async def generate_data_for_patient(patient_id: int, 
+def _store_reading(patient_id: int, readings: Dict[str, float]) -> None:
+    """Persist one generated reading and bump the patient's throughput counters."""
+    db = SessionLocal()
+    try:
+        # VitalsCreate only accepts the API aliases for these two fields
+        vitals_create = VitalsCreate(
+            heartRate=readings["heart_rate"],
+            temperature=readings["temperature"],
+            oxygenSaturation=readings["spo2"],
+            systolic=readings["systolic"],
+            diastolic=readings["diastolic"],
+            pulse=readings["pulse"],
+            source=DataSource.SIMULATED.value
+        )
+        # Use the centralized function that includes anomaly checks
+        crud_vitals.create_and_check(db, obj_in=vitals_create, patient_id=patient_id)
+        crud_simulator.record_reading(db, patient_id=patient_id, generated_at=datetime.now(timezone.utc))
+    finally:
+        db.close()
+
+
+async def generate_data_for_patient(patient_id: int,
                                    interval_seconds: int = 60,
                                    patterns: List[str] = None) -> None:
     """
-    Generate data periodically for a specific patient.
+    Generate data periodically for a specific patient until the task is cancelled.
     
     Args:
         patient_id: The ID of the patient to generate data for
@@ -157,35 +189,12 @@ async def generate_data_for_patient(patient_id: int,
     """
     simulator = VitalSignSimulator(patient_id, patterns)
     
-    while is_running and patient_id in patients_to_simulate:
+    while True:
         try:
-            # Generate the vital signs
             vitals_data = simulator.generate_reading()
-            
-            # Create a database session
-            db = SessionLocal()
-            try:
-                # Create the vitals record
-                vitals_create = VitalsCreate(
-                    heart_rate=vitals_data["heart_rate"],
-                    temperature=vitals_data["temperature"],
-                    spo2=vitals_data["spo2"],
-                    systolic=vitals_data["systolic"],
-                    diastolic=vitals_data["diastolic"],
-                    pulse=vitals_data["pulse"],
-                    source=DataSource.SIMULATED.value
-                )
-                
-                # Save to database
-                # crud_vitals.create_with_patient(db, obj_in=vitals_create, patient_id=patient_id)
-                # Use the new centralized function that includes anomaly checks
-                crud_vitals.vitals.create_and_check(db, obj_in=vitals_create, patient_id=patient_id)
-
-                logger.info(f"Generated and checked vital signs for patient {patient_id}")
-                
-            finally:
-                db.close()
-                
+            # Database work is blocking, keep it off the event loop
+            await asyncio.to_thread(_store_reading, patient_id, vitals_data)
+            logger.info(f"Generated and checked vital signs for patient {patient_id}")
         except Exception as e:
             logger.error(f"Error generating data for patient {patient_id}: {str(e)}")
         
@@ -193,65 +202,194 @@ async def generate_data_for_patient(patient_id: int,
         await asyncio.sleep(interval_seconds)
 
 
-async def data_generator_service() -> None:
-    """Main service function that manages data generation for all patients."""
-    logger.info("Starting fake data generator service")
-    
-    while is_running:
-        # Start tasks for any new patients
-        for patient_id, config in patients_to_simulate.items():
-            # Create and schedule the task if not already running
-            asyncio.create_task(
+class SimulatorCoordinator:
+    """
+    Per-worker loop that elects a leader and keeps the leader's generator tasks
+    in line with the configuration stored in the database.
+    """
+
+    def __init__(self, lock_key: int = settings.SIMULATOR_ADVISORY_LOCK_KEY):
+        self.lock_key = lock_key
+        self.is_leader = False
+        self._lock_connection: Optional[Connection] = None
+        # patient_id -> (task, (interval_seconds, patterns)) for the config it was started with
+        self._tasks: Dict[int, Tuple[asyncio.Task, Tuple[int, Tuple[str, ...]]]] = {}
+
+    def _try_acquire_leadership(self) -> bool:
+        if engine.dialect.name != "postgresql":
+            return True
+
+        connection = engine.connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+            ).scalar()
+            # Session-level advisory locks outlive the transaction, end it so the
+            # connection does not sit idle in transaction while we hold the lock.
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+
+        if not acquired:
+            connection.close()
+            return False
+
+        self._lock_connection = connection
+        logger.info(f"Worker {WORKER_ID} became simulator leader")
+        return True
+
+    def _leadership_alive(self) -> bool:
+        if self._lock_connection is None:
+            return engine.dialect.name != "postgresql"
+        try:
+            self._lock_connection.execute(text("SELECT 1"))
+            self._lock_connection.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"Worker {WORKER_ID} lost its simulator lock connection: {e}")
+            self._release_leadership()
+            return False
+
+    def _release_leadership(self) -> None:
+        connection, self._lock_connection = self._lock_connection, None
+        self.is_leader = False
+        if connection is None:
+            return
+        try:
+            # Closing the connection also releases the session-level lock
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key})
+            connection.commit()
+        except Exception:
+            pass
+        finally:
+            connection.close()
+
+    def _load_config(self) -> Dict[int, Tuple[int, Tuple[str, ...]]]:
+        db = SessionLocal()
+        try:
+            crud_simulator.record_leader_heartbeat(db, leader_id=WORKER_ID)
+            if not crud_simulator.get_state(db).is_running:
+                return {}
+            return {
+                p.patient_id: (p.interval_seconds, tuple(p.patterns or ["diurnal"]))
+                for p in crud_simulator.get_all(db)
+            }
+        finally:
+            db.close()
+
+    def _reconcile(self, desired: Dict[int, Tuple[int, Tuple[str, ...]]]) -> None:
+        for patient_id in list(self._tasks):
+            task, config = self._tasks[patient_id]
+            if desired.get(patient_id) != config or task.done():
+                task.cancel()
+                del self._tasks[patient_id]
+
+        for patient_id, config in desired.items():
+            if patient_id in self._tasks:
+                continue
+            interval_seconds, patterns = config
+            task = asyncio.create_task(
                 generate_data_for_patient(
                     patient_id=patient_id,
-                    interval_seconds=config.get("interval_seconds", 60),
-                    patterns=config.get("patterns", ["diurnal"])
+                    interval_seconds=interval_seconds,
+                    patterns=list(patterns),
                 )
             )
-        
-        # Check every 5 seconds for changes in the patients list
-        await asyncio.sleep(5)
-    
-    logger.info("Fake data generator service stopped")
+            self._tasks[patient_id] = (task, config)
 
+    def _cancel_all(self) -> None:
+        for task, _ in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
 
-def start_data_generator() -> bool:
-    """Start the data generator service."""
-    global generator_task, is_running
-    
-    if is_running:
+    async def _tick(self) -> None:
+        if self.is_leader:
+            self.is_leader = await asyncio.to_thread(self._leadership_alive)
+        else:
+            self.is_leader = await asyncio.to_thread(self._try_acquire_leadership)
+
+        if not self.is_leader:
+            self._cancel_all()
+            return
+
+        desired = await asyncio.to_thread(self._load_config)
+        self._reconcile(desired)
+
+    async def run(self) -> None:
+        logger.info(f"Starting simulator coordinator on worker {WORKER_ID}")
+        try:
+            while True:
+                try:
+                    await self._tick()
+                except Exception as e:
+                    logger.error(f"Simulator coordinator error on worker {WORKER_ID}: {str(e)}")
+                await asyncio.sleep(settings.SIMULATOR_POLL_SECONDS)
+        finally:
+            self._cancel_all()
+            self._release_leadership()
+            logger.info(f"Simulator coordinator stopped on worker {WORKER_ID}")
+
+
+coordinator = SimulatorCoordinator()
+
+
+def start_coordinator() -> None:
+    """Start this worker's simulator coordinator. Must be called from a running event loop."""
+    global coordinator_task
+    if coordinator_task is None or coordinator_task.done():
+        coordinator_task = asyncio.create_task(coordinator.run())
+
+
+async def stop_coordinator() -> None:
+    """Stop this worker's simulator coordinator and release leadership."""
+    global coordinator_task
+    if coordinator_task is None:
+        return
+    coordinator_task.cancel()
+    try:
+        await coordinator_task
+    except asyncio.CancelledError:
+        pass
+    coordinator_task = None
+
+
+def is_simulation_running(db: Session) -> bool:
+    return crud_simulator.get_state(db).is_running
+
+
+def start_data_generator(db: Session) -> bool:
+    """Switch the shared simulator on. The leader worker picks it up on its next poll."""
+    if is_simulation_running(db):
         logger.warning("Data generator service is already running")
         return False
     
-    is_running = True
-    generator_task = asyncio.create_task(data_generator_service())
+    crud_simulator.set_running(db, is_running=True)
     logger.info("Data generator service started")
     return True
 
 
-def stop_data_generator() -> bool:
-    """Stop the data generator service."""
-    global is_running, generator_task, patients_to_simulate
-    
-    if not is_running:
+def stop_data_generator(db: Session) -> bool:
+    """Switch the shared simulator off and clear the simulated patients."""
+    if not is_simulation_running(db):
         logger.warning("Data generator service is not running")
         return False
     
-    is_running = False
-    patients_to_simulate = {}
-    
-    # Task will end by itself due to the is_running flag
+    crud_simulator.set_running(db, is_running=False)
+    crud_simulator.remove_all(db)
     logger.info("Data generator service stopping")
     return True
 
 
-def add_patient_to_simulation(patient_id: int, 
+def add_patient_to_simulation(db: Session,
+                             patient_id: int, 
                              interval_seconds: int = 60,
                              patterns: List[str] = None) -> bool:
     """
     Add a patient to the simulation.
     
     Args:
+        db: Database session
         patient_id: The ID of the patient to add
         interval_seconds: How often to generate data (in seconds)
         patterns: List of patterns to apply to this patient's data
@@ -259,55 +397,76 @@ def add_patient_to_simulation(patient_id: int,
     Returns:
         True if the patient was successfully added, False otherwise
     """
-    if patient_id in patients_to_simulate:
+    if crud_simulator.get_by_patient_id(db, patient_id=patient_id):
         logger.warning(f"Patient {patient_id} is already being simulated")
         return False
     
-    patients_to_simulate[patient_id] = {
-        "interval_seconds": interval_seconds,
-        "patterns": patterns or ["diurnal"],
-        "start_time": datetime.now(),
-    }
+    crud_simulator.create(db, obj_in=SimulatedPatientCreate(
+        patient_id=patient_id,
+        interval_seconds=interval_seconds,
+        patterns=patterns or ["diurnal"],
+    ))
     
     logger.info(f"Added patient {patient_id} to simulation with interval {interval_seconds}s")
     return True
 
 
-def remove_patient_from_simulation(patient_id: int) -> bool:
+def remove_patient_from_simulation(db: Session, patient_id: int) -> bool:
     """
     Remove a patient from the simulation.
     
     Args:
+        db: Database session
         patient_id: The ID of the patient to remove
     
     Returns:
         True if the patient was successfully removed, False otherwise
     """
-    if patient_id not in patients_to_simulate:
+    if not crud_simulator.remove_by_patient_id(db, patient_id=patient_id):
         logger.warning(f"Patient {patient_id} is not being simulated")
         return False
     
-    del patients_to_simulate[patient_id]
     logger.info(f"Removed patient {patient_id} from simulation")
     return True
 
 
-def get_simulation_status() -> Dict:
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def get_simulation_status(db: Session) -> Dict:
     """
     Get the current status of the data generator simulation.
     
     Returns:
-        Dict containing status information
+        Dict containing status information, including the measured throughput per patient
     """
+    state = crud_simulator.get_state(db)
+    now = datetime.now(timezone.utc)
+    patients = []
+    for simulated in crud_simulator.get_all(db):
+        started_at = _as_utc(simulated.started_at)
+        elapsed_minutes = (now - started_at).total_seconds() / 60
+        patients.append({
+            "id": simulated.patient_id,
+            "config": {
+                "interval_seconds": simulated.interval_seconds,
+                "patterns": simulated.patterns or ["diurnal"],
+                "start_time": started_at,
+            },
+            "running_time": str(now - started_at),
+            "readings_generated": simulated.readings_generated,
+            "last_generated_at": _as_utc(simulated.last_generated_at),
+            "readings_per_minute": round(simulated.readings_generated / elapsed_minutes, 3) if elapsed_minutes > 0 else 0.0,
+        })
+
     return {
-        "is_running": is_running,
-        "patient_count": len(patients_to_simulate),
-        "patients": [
-            {
-                "id": patient_id,
-                "config": config,
-                "running_time": str(datetime.now() - config["start_time"]) if "start_time" in config else "N/A"
-            }
-            for patient_id, config in patients_to_simulate.items()
-        ]
+        "is_running": state.is_running,
+        "patient_count": len(patients),
+        "leader_id": state.leader_id,
+        "leader_heartbeat_at": _as_utc(state.leader_heartbeat_at),
+        "patients": patients,
     }
@@ -0,0 +1,236 @@
+"""
+Maintenance of the monthly range partitions of the `vitals` table.
+
+On PostgreSQL `vitals` is partitioned by month on `timestamp` (see the
+migration that introduces partitioning). This module keeps partitions created
+ahead of time and applies the retention policy by detaching whole partitions
+(and dropping or archiving them) instead of running DELETE. On other
+databases `vitals` is a plain table and every function here is a no-op.
+
+Run it from cron, or let the in-app loop started from the lifespan handle it:
+    python -m app.services.partition_manager
+"""
+
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.crud.crud_resource_versions import VITALS
+from app.core.config import settings
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "vitals"
+# Catches readings outside every monthly partition (created by the migration)
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+PARTITION_NAME_RE = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+# Background maintenance task of this worker, started from the app lifespan
+maintenance_task: Optional[asyncio.Task] = None
+
+
+def _month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(db.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :name)"),
+        {"name": PARENT_TABLE},
+    ).scalar())
+
+
+def list_partitions(db: Session) -> List[Tuple[str, date]]:
+    """Monthly partitions currently attached to `vitals`, oldest first."""
+    rows = db.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :name"
+        ),
+        {"name": PARENT_TABLE},
+    ).scalars()
+    partitions = []
+    for name in rows:
+        match = PARTITION_NAME_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def _default_partition_months(db: Session) -> List[date]:
+    """Months with readings in the default partition, which should each have their own partition."""
+    if db.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar() is None:
+        return []
+    rows = db.execute(text(f"SELECT DISTINCT date_trunc('month', timestamp)::date FROM {DEFAULT_PARTITION}")).scalars()
+    return [month for month in rows if month is not None]
+
+
+def _create_partition(db: Session, month: date, *, move_from_default: bool) -> None:
+    name = partition_name(month)
+    bounds = f"FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+    if not move_from_default:
+        db.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} FOR VALUES {bounds}"))
+        return
+    # PARTITION OF fails while the default partition holds rows of the month:
+    # build the table on its own, move those rows into it, then attach it
+    # (which creates its indexes and re-checks the default partition).
+    db.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = db.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        {"start": month, "end": _add_months(month, 1)},
+    ).rowcount
+    db.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    logger.info(f"Moved {moved} readings from {DEFAULT_PARTITION} to {name}")
+
+
+def ensure_partitions(db: Session, *, months_ahead: Optional[int] = None, today: Optional[date] = None) -> List[str]:
+    """
+    Create the partitions for the current month and the next `months_ahead`
+    months, and for every month with readings in the default partition, moving
+    those readings into their new partition.
+    """
+    if not is_partitioned(db):
+        return []
+    months_ahead = settings.VITALS_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = _month_start(today or datetime.now(timezone.utc).date())
+    existing = {name for name, _ in list_partitions(db)}
+    in_default = set(_default_partition_months(db))
+    months = {_add_months(current, offset) for offset in range(months_ahead + 1)} | in_default
+
+    created = []
+    for month in sorted(months):
+        name = partition_name(month)
+        if name in existing:
+            continue
+        _create_partition(db, month, move_from_default=month in in_default)
+        created.append(name)
+    db.commit()
+    if created:
+        logger.info(f"Created vitals partitions: {', '.join(created)}")
+    return created
+
+
+def apply_retention(
+    db: Session,
+    *,
+    retention_months: Optional[int] = None,
+    mode: Optional[str] = None,
+    today: Optional[date] = None,
+) -> List[str]:
+    """
+    Detach every partition that ends before the retention cutoff, then drop it
+    or move it to the archive schema depending on `mode` ("drop" or "archive").
+    """
+    retention_months = settings.VITALS_RETENTION_MONTHS if retention_months is None else retention_months
+    mode = mode or settings.VITALS_RETENTION_MODE
+    if not retention_months or not is_partitioned(db):
+        return []
+    if mode not in ("drop", "archive"):
+        raise ValueError(f"Unknown vitals retention mode '{mode}'")
+
+    cutoff = _add_months(_month_start(today or datetime.now(timezone.utc).date()), -retention_months)
+    expired = [name for name, month in list_partitions(db) if _add_months(month, 1) <= cutoff]
+    if mode == "archive" and expired:
+        db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {settings.VITALS_ARCHIVE_SCHEMA}"))
+
+    for name in expired:
+        db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        if mode == "drop":
+            db.execute(text(f"DROP TABLE {name}"))
+        else:
+            db.execute(text(f"ALTER TABLE {name} SET SCHEMA {settings.VITALS_ARCHIVE_SCHEMA}"))
+    if expired:
+        # Readings left the parent table: dashboards counting them must revalidate
+        crud.resource_versions.mark(db, [VITALS])
+    db.commit()
+    if expired:
+        logger.info(f"Vitals retention ({mode}, {retention_months} months) removed partitions: {', '.join(expired)}")
+    return expired
+
+
+def run_maintenance(db: Session) -> None:
+    """Create upcoming partitions and apply retention, once across all workers."""
+    if not is_partitioned(db):
+        return
+    # Transaction-scoped lock: concurrent workers skip instead of racing on DDL
+    if not db.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": settings.VITALS_PARTITION_LOCK_KEY}
+    ).scalar():
+        db.rollback()
+        return
+    ensure_partitions(db)
+    # ensure_partitions committed, so take the lock again for the retention step
+    if db.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": settings.VITALS_PARTITION_LOCK_KEY}
+    ).scalar():
+        apply_retention(db)
+    else:
+        db.rollback()
+
+
+def _run_maintenance_once() -> None:
+    db = SessionLocal()
+    try:
+        run_maintenance(db)
+    finally:
+        db.close()
+
+
+async def _maintenance_loop() -> None:
+    while True:
+        try:
+            await asyncio.to_thread(_run_maintenance_once)
+        except Exception as e:
+            logger.error(f"Vitals partition maintenance failed: {str(e)}")
+        await asyncio.sleep(settings.VITALS_PARTITION_MAINTENANCE_SECONDS)
+
+
+def start_maintenance() -> None:
+    """Start the periodic partition maintenance. Must be called from a running event loop."""
+    global maintenance_task
+    if maintenance_task is None or maintenance_task.done():
+        maintenance_task = asyncio.create_task(_maintenance_loop())
+
+
+async def stop_maintenance() -> None:
+    global maintenance_task
+    if maintenance_task is None:
+        return
+    maintenance_task.cancel()
+    try:
+        await maintenance_task
+    except asyncio.CancelledError:
+        pass
+    maintenance_task = None
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    _run_maintenance_once()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Patient search by name and chronic disease.
+
+On PostgreSQL, name searches run in SQL against the pg_trgm GIN index on
+patient_profiles.full_name: ILIKE '%term%' filters and word-similarity
+typeahead both use it. Other databases (SQLite in development and tests) have
+no trigram index, so each worker keeps an in-process one: trigram postings of
+every patient name, rebuilt after PATIENT_SEARCH_CACHE_TTL_SECONDS and
+invalidated by profile writes made through the same worker. Names written by
+another worker are therefore found by that worker's searches only once its
+index expires, at most PATIENT_SEARCH_CACHE_TTL_SECONDS later.
+
+Chronic diseases are matched on the normalized tags in patient_disease_tags
+(see disease_tags()), which the typeahead also suggests: from the diseases
+dictionary on PostgreSQL, where a pg_trgm GIN index on diseases.key serves
+the substring match.
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, literal, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.config import settings
+from app.models.domain_models import Disease, PatientDiseaseTag, PatientProfile
+from app.models.user_model import User
+
+_DISEASE_SEPARATORS = re.compile(r"[,;/\n]+")
+_NO_DISEASE = {"", "none", "n/a", "na", "-", "no"}
+_WORD = re.compile(r"\w+")
+
+# (user_id, profile_id, full_name)
+PatientMatch = Tuple[int, int, str]
+
+# Name filters match more patients than this in SQL rather than binding their
+# ids (SQLite limits bound parameters per statement)
+MAX_INDEXED_MATCHES = 500
+
+
+def disease_key(name: str) -> str:
+    """Normalized form of a disease name: lowercase, single spaces."""
+    return " ".join(name.lower().split())
+
+
+def parse_diseases(chronic_diseases: Optional[str]) -> Dict[str, str]:
+    """Disease key -> spelling as written, for a free-text chronic disease list."""
+    diseases: Dict[str, str] = {}
+    for name in _DISEASE_SEPARATORS.split(chronic_diseases or ""):
+        key = disease_key(name)
+        if key not in _NO_DISEASE:
+            diseases.setdefault(key, " ".join(name.split()))
+    return diseases
+
+
+def disease_tags(chronic_diseases: Optional[str]) -> Set[str]:
+    """Normalized disease tags of a free-text chronic disease list."""
+    return set(parse_diseases(chronic_diseases))
+
+
+def trigrams(text: str, *, prefix: bool = False) -> Set[str]:
+    """
+    pg_trgm-style trigrams: each lowercased word padded with two leading
+    blanks and one trailing blank. With `prefix`, the last word is left
+    unterminated so partial input matches longer words.
+    """
+    words = _WORD.findall(text.lower())
+    grams: Set[str] = set()
+    for position, word in enumerate(words):
+        padded = "  " + word
+        if not (prefix and position == len(words) - 1):
+            padded += " "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _inner_trigrams(term: str) -> Set[str]:
+    """Trigrams every name containing `term` must have (windows inside its words)."""
+    grams: Set[str] = set()
+    for word in _WORD.findall(term.lower()):
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+class SearchIndex:
+    """Immutable in-process trigram index of patient names and disease tags."""
+
+    def __init__(self, patients: List[Tuple[int, int, Optional[int], Optional[str]]], tags: List[str]):
+        # user_id -> (profile_id, doctor_id, full_name)
+        self.patients: Dict[int, Tuple[int, Optional[int], str]] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        for user_id, profile_id, doctor_id, full_name in patients:
+            name = full_name or ""
+            self.patients[user_id] = (profile_id, doctor_id, name)
+            for gram in trigrams(name):
+                self.postings.setdefault(gram, set()).add(user_id)
+        self.tags = sorted(set(tags))
+        self.loaded_at = time.monotonic()
+
+    def containing(self, term: str) -> Set[int]:
+        """User ids whose name contains `term`, case-insensitively (ILIKE '%term%')."""
+        needle = term.lower()
+        grams = _inner_trigrams(term)
+        if grams:
+            candidates = set.intersection(*(self.postings.get(gram, set()) for gram in grams))
+        else:
+            candidates = self.patients.keys()
+        return {user_id for user_id in candidates if needle in self.patients[user_id][2].lower()}
+
+    def suggest(self, term: str, *, doctor_id: Optional[int] = None, limit: int = 10) -> List[PatientMatch]:
+        """Best name matches for partial input, most similar first."""
+        query = trigrams(term, prefix=True)
+        if not query:
+            return []
+        hits: Counter = Counter()
+        for gram in query:
+            hits.update(self.postings.get(gram, ()))
+        needle = term.lower().strip()
+        scored = []
+        for user_id, shared in hits.items():
+            profile_id, patient_doctor_id, name = self.patients[user_id]
+            if doctor_id is not None and patient_doctor_id != doctor_id:
+                continue
+            similarity = 1.0 if needle in name.lower() else shared / len(query)
+            if similarity >= settings.PATIENT_SEARCH_MIN_SIMILARITY:
+                scored.append((-similarity, name.lower(), user_id, profile_id, name))
+        scored.sort()
+        return [(user_id, profile_id, name) for _, _, user_id, profile_id, name in scored[:limit]]
+
+    def suggest_tags(self, term: str, *, limit: int = 10) -> List[str]:
+        needle = disease_key(term)
+        if not needle:
+            return []
+        matches = [tag for tag in self.tags if needle in tag]
+        matches.sort(key=lambda tag: (not tag.startswith(needle), tag))
+        return matches[:limit]
+
+
+_index: Optional[SearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index(db: Session) -> SearchIndex:
+    global _index
+    index = _index
+    if index is not None and time.monotonic() - index.loaded_at < settings.PATIENT_SEARCH_CACHE_TTL_SECONDS:
+        return index
+    with _index_lock:
+        index = _index
+        if index is None or time.monotonic() - index.loaded_at >= settings.PATIENT_SEARCH_CACHE_TTL_SECONDS:
+            patients = (
+                db.query(PatientProfile.user_id, PatientProfile.id, User.doctor_id, PatientProfile.full_name)
+                .join(User, User.id == PatientProfile.user_id)
+                .all()
+            )
+            tags = [tag for (tag,) in db.query(PatientDiseaseTag.tag).distinct()]
+            index = SearchIndex(patients, tags)
+            _index = index
+        return index
+
+
+def invalidate() -> None:
+    global _index
+    _index = None
+
+
+def _uses_trigram_sql(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def name_criterion(db: Session, term: str) -> ColumnElement:
+    """Filter on PatientProfile matching ILIKE '%term%', index-backed on every database."""
+    if _uses_trigram_sql(db):
+        return PatientProfile.full_name.ilike(f"%{term}%")
+    matches = get_index(db).containing(term)
+    if len(matches) > MAX_INDEXED_MATCHES:
+        # Too many for a bound id list: a scan, though one as fresh as the table
+        return PatientProfile.full_name.ilike(f"%{term}%")
+    return PatientProfile.user_id.in_(matches)
+
+
+def suggest_patients(db: Session, term: str, *, doctor_id: Optional[int] = None, limit: int = 10) -> List[PatientMatch]:
+    """Typeahead matches for `term`, restricted to `doctor_id`'s patients when given."""
+    if _uses_trigram_sql(db):
+        similarity = func.word_similarity(term, PatientProfile.full_name)
+        query = (
+            db.query(PatientProfile.user_id, PatientProfile.id, PatientProfile.full_name)
+            .join(User, User.id == PatientProfile.user_id)
+            # `<%` is pg_trgm's word-similarity operator, served by the GIN index
+            .filter(or_(PatientProfile.full_name.ilike(f"%{term}%"), literal(term).op("<%")(PatientProfile.full_name)))
+        )
+        if doctor_id is not None:
+            query = query.filter(User.doctor_id == doctor_id)
+        return [tuple(row) for row in query.order_by(similarity.desc(), PatientProfile.full_name).limit(limit)]
+
+    matches = get_index(db).suggest(term, doctor_id=doctor_id, limit=limit)
+    if not matches or doctor_id is None:
+        return matches
+    # The index may lag patient reassignments; never suggest another doctor's patient
+    allowed = {
+        user_id for (user_id,) in
+        db.query(User.id).filter(User.id.in_([m[0] for m in matches]), User.doctor_id == doctor_id)
+    }
+    return [match for match in matches if match[0] in allowed]
+
+
+def suggest_diseases(db: Session, term: str, *, limit: int = 10) -> List[str]:
+    if _uses_trigram_sql(db):
+        needle = disease_key(term)
+        if not needle:
+            return []
+        # Substring match on the (distinct) dictionary keys via their trigram
+        # index, kept to diseases some patient is tagged with
+        rows = (
+            db.query(Disease.key)
+            .filter(
+                Disease.key.like(f"%{needle}%"),
+                db.query(PatientDiseaseTag.tag).filter(PatientDiseaseTag.tag == Disease.key).exists(),
+            )
+            .order_by(Disease.key.like(f"{needle}%").desc(), Disease.key)
+            .limit(limit)
+        )
+        return [key for (key,) in rows]
+    return get_index(db).suggest_tags(term, limit=limit)
@@ -0,0 +1,180 @@
+"""
+In-process sampling profiler for live workers.
+
+A daemon thread snapshots the Python stack of every thread in the worker
+(sys._current_frames()) at a fixed interval and counts identical stacks.
+Results are returned as collapsed stacks, one `thread;outer;...;leaf count`
+line per stack, which flamegraph.pl, speedscope and most flamegraph viewers
+read directly.
+
+Two entry points:
+- the admin profiling endpoint samples the whole worker for N seconds;
+- ProfilingMiddleware samples while a single request runs when it carries an
+  `X-Profile` header from a superuser, and keeps the result for later download
+  under the id returned in `X-Profile-Id`.
+
+Sampling sees every thread, so a per-request profile also contains whatever
+else the worker ran concurrently; profile requests against a quiet worker for
+the clearest picture.
+"""
+
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "x-profile-id"
+
+# Leaf frames of threads that are blocked waiting for work, not doing any:
+# idle threadpool workers and the event loop polling for I/O
+IDLE_LEAVES = frozenset({
+    "threading:wait",
+    "threading:_wait_for_tstate_lock",
+    "queue:get",
+    "selectors:select",
+    "selectors:poll",
+})
+
+
+def _frame_label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+class Profile:
+    def __init__(self, stacks: Counter, samples: int, seconds: float, label: str = ""):
+        self.stacks = stacks
+        self.samples = samples
+        self.seconds = seconds
+        self.label = label
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Sampler:
+    """Samples every other thread's stack each `interval` seconds until stopped."""
+
+    def __init__(self, interval: float, *, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._started_at = 0.0
+
+    def start(self) -> "Sampler":
+        self._started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self, label: str = "") -> Profile:
+        self._stop.set()
+        self._thread.join()
+        return Profile(self.stacks, self.samples, time.perf_counter() - self._started_at, label)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                if not labels or (not self.include_idle and labels[0] in IDLE_LEAVES):
+                    continue
+                labels.append(names.get(thread_id, str(thread_id)).replace(" ", "_"))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+
+# Only one worker-wide profile at a time; concurrent ones would sample each other
+_worker_lock = threading.Lock()
+
+
+def worker_profile_running() -> bool:
+    return _worker_lock.locked()
+
+
+def start_worker_profile(*, interval: float, include_idle: bool = False) -> Optional[Sampler]:
+    """Start a worker-wide profile, or return None when one is already running."""
+    if not _worker_lock.acquire(blocking=False):
+        return None
+    try:
+        return Sampler(interval, include_idle=include_idle).start()
+    except BaseException:
+        _worker_lock.release()
+        raise
+
+
+def stop_worker_profile(sampler: Sampler) -> Profile:
+    try:
+        return sampler.stop(label="worker")
+    finally:
+        _worker_lock.release()
+
+
+# Per-request profiles of this worker, oldest evicted first (event loop only)
+_request_profiles: "OrderedDict[str, Profile]" = OrderedDict()
+
+
+def get_request_profile(profile_id: str) -> Optional[Profile]:
+    return _request_profiles.get(profile_id)
+
+
+def _keep_request_profile(profile_id: str, profile: Profile) -> None:
+    _request_profiles[profile_id] = profile
+    while len(_request_profiles) > settings.PROFILING_KEEP_REQUESTS:
+        _request_profiles.popitem(last=False)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests that carry an `X-Profile` header. `authorize` receives
+    the bearer token and runs in the threadpool; requests it rejects are
+    served normally, unprofiled.
+    """
+
+    def __init__(self, app: ASGIApp, authorize: Callable[[str], bool]):
+        self.app = app
+        self.authorize = authorize
+
+    async def _authorized(self, headers: Headers) -> bool:
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        return await run_in_threadpool(self.authorize, token)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if PROFILE_HEADER not in headers or not await self._authorized(headers):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (PROFILE_ID_HEADER.encode(), profile_id.encode())]}
+            await send(message)
+
+        sampler = Sampler(settings.PROFILING_REQUEST_INTERVAL_MS / 1000).start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _keep_request_profile(profile_id, sampler.stop(label=f"{scope['method']} {scope['path']}"))
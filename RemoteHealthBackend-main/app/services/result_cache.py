@@ -0,0 +1,296 @@
+"""
+Result cache for aggregate endpoints (dashboard statistics).
+
+Results are cached per (endpoint, user scope, parameters) together with the
+resource versions they were computed from (app/crud/crud_resource_versions.py).
+A cached result is only served while those versions are current, so a write
+committed by any worker makes it stale at once; the in-process domain events
+raised on commit (new vital, alert raised or resolved, patient assigned)
+additionally drop this worker's stale entries right away.
+
+Backends:
+- LRUBackend (default): per-worker, bounded by RESULT_CACHE_SIZE entries.
+- StoreBackend: any external key/value store implementing ExternalStore
+  (get/set of bytes with a TTL, as Redis or memcached do), shared by all
+  workers. LocalStore is an in-process stand-in for development and tests.
+  Plug a real one in at startup with `set_backend(StoreBackend(store))`.
+
+Concurrent misses for the same key are computed once (single flight): the
+first request computes, the others wait for its result. This holds within a
+worker; workers sharing an external store may still compute a key once each.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Protocol, Set, Tuple
+
+import orjson
+
+from app.core import metrics
+from app.core.config import settings
+from app.crud import crud_resource_versions
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_REQUESTS = metrics.registry.register(metrics.Counter(
+    "result_cache_requests_total",
+    "Result cache lookups by endpoint and outcome (hit, miss, shared).",
+    ("endpoint", "outcome"),
+))
+
+Versions = Dict[str, int]
+
+
+class Entry(NamedTuple):
+    versions: Versions
+    value: Any
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[Entry]:
+        ...
+
+    def set(self, key: str, entry: Entry, ttl: float) -> None:
+        ...
+
+    def invalidate(self, resources: Set[str]) -> None:
+        """Drop entries computed from any of `resources`."""
+        ...
+
+
+class LRUBackend:
+    """Per-worker LRU of at most `size` entries, each expiring after its TTL."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries: "OrderedDict[str, Tuple[float, Entry]]" = OrderedDict()
+        # resource -> keys of the entries computed from it
+        self._keys_by_resource: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Entry, ttl: float) -> None:
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, entry)
+            for resource in self._index_names(entry):
+                self._keys_by_resource.setdefault(resource, set()).add(key)
+            while len(self._entries) > self.size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, resources: Set[str]) -> None:
+        with self._lock:
+            for resource in resources:
+                for key in list(self._keys_by_resource.get(resource, ())):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_resource.clear()
+
+    @staticmethod
+    def _index_names(entry: Entry) -> Set[str]:
+        # Per-doctor versions are also found through their family ("vitals@*"),
+        # which writes that cannot be attributed to a doctor invalidate
+        names = set(entry.versions)
+        names.update(filter(None, map(crud_resource_versions.doctor_family, entry.versions)))
+        return names
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        item = self._entries.pop(key, None)
+        if item is None:
+            return
+        for resource in self._index_names(item[1]):
+            keys = self._keys_by_resource.get(resource)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_resource[resource]
+
+
+class ExternalStore(Protocol):
+    """The subset of a Redis/memcached client the StoreBackend needs."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        ...
+
+
+class LocalStore:
+    """In-process ExternalStore for development and tests."""
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._values.get(key)
+        if item is None or item[0] <= time.monotonic():
+            return None
+        return item[1]
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._values[key] = (time.monotonic() + ttl, value)
+
+
+class StoreBackend:
+    """
+    Entries as JSON in an external store shared by every worker. Invalidation
+    is left to the versions stored with each entry: a worker cannot reach the
+    entries another one wrote, but it never serves them once stale.
+    """
+
+    def __init__(self, store: ExternalStore, prefix: str = "result-cache:"):
+        self.store = store
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Entry]:
+        try:
+            raw = self.store.get(self.prefix + key)
+        except Exception:
+            logger.warning("Result cache store unavailable, computing %s", key, exc_info=True)
+            return None
+        if raw is None:
+            return None
+        try:
+            versions, value = orjson.loads(raw)
+        except ValueError:
+            logger.warning("Ignoring unreadable result cache entry %s", key)
+            return None
+        return Entry(versions, value)
+
+    def set(self, key: str, entry: Entry, ttl: float) -> None:
+        self.store.set(self.prefix + key, orjson.dumps([entry.versions, entry.value]), max(int(ttl), 1))
+
+    def invalidate(self, resources: Set[str]) -> None:
+        pass
+
+
+class _Flight:
+    """A computation in progress, awaited by concurrent requests for the same key."""
+
+    def __init__(self, versions: Versions):
+        self.versions = versions
+        self.done = threading.Event()
+        self.value: Any = None
+        self.failed = False
+
+
+class ResultCache:
+    def __init__(self, backend: Optional[CacheBackend], ttl: float, wait_timeout: float = 30.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(endpoint: str, scope: Any, params: Dict[str, Any]) -> str:
+        return f"{endpoint}:{scope}:{sorted(params.items())!r}"
+
+    def get_or_compute(
+        self,
+        endpoint: str,
+        *,
+        scope: Any,
+        params: Dict[str, Any],
+        versions: Optional[Versions],
+        compute: Callable[[], Any],
+    ) -> Any:
+        """
+        The cached result of `endpoint` for `scope` and `params`, or `compute()`
+        stored under `versions`. Without versions (HTTP_CACHE_ENABLED off, so
+        nothing tracks writes) results are never cached.
+        """
+        if self.backend is None or versions is None:
+            return compute()
+        key = self.key(endpoint, scope, params)
+        entry = self.backend.get(key)
+        if entry is not None and entry.versions == versions:
+            RESULT_CACHE_REQUESTS.inc(endpoint, "hit")
+            return entry.value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(versions)
+        if not leader:
+            if flight.versions == versions and flight.done.wait(self.wait_timeout) and not flight.failed:
+                RESULT_CACHE_REQUESTS.inc(endpoint, "shared")
+                return flight.value
+            # Other versions, too slow or failed: compute this request's own result
+            RESULT_CACHE_REQUESTS.inc(endpoint, "miss")
+            return compute()
+
+        RESULT_CACHE_REQUESTS.inc(endpoint, "miss")
+        try:
+            flight.value = compute()
+            self._store(key, Entry(versions, flight.value))
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.value
+
+    def _store(self, key: str, entry: Entry) -> None:
+        try:
+            self.backend.set(key, entry, self.ttl)
+        except Exception:
+            # An unreachable store costs the next request a recomputation, not an error
+            logger.warning("Could not store result cache entry %s", key, exc_info=True)
+
+    def invalidate(self, resources: Iterable[str]) -> None:
+        if self.backend is not None:
+            self.backend.invalidate(set(resources))
+
+
+def _default_backend() -> Optional[CacheBackend]:
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+    if settings.RESULT_CACHE_BACKEND == "store":
+        return StoreBackend(LocalStore())
+    return LRUBackend(settings.RESULT_CACHE_SIZE)
+
+
+cache = ResultCache(_default_backend(), ttl=settings.RESULT_CACHE_TTL_SECONDS)
+
+
+def _invalidate_written(keys: Set[Tuple[str, int]]) -> None:
+    cache.invalidate(crud_resource_versions.affected_names(keys))
+
+
+crud_resource_versions.on_commit(_invalidate_written)
+
+
+def set_backend(backend: Optional[CacheBackend]) -> None:
+    """Swap the backend, e.g. for a StoreBackend over Redis at startup. None disables caching."""
+    cache.backend = backend
+
+
+def get_or_compute(endpoint: str, **kwargs: Any) -> Any:
+    return cache.get_or_compute(endpoint, **kwargs)
@@ -0,0 +1,225 @@
+"""
+Per-patient risk score.
+
+The score (0-100) is the sum of three cached components:
+
+* vitals (up to 40): an EWMA over the patient's readings of how far the worst
+  vital of each reading lies outside its normal range;
+* alerts (up to 40): points per open alert by severity;
+* chronic diseases (up to 20): points per disease listed on the profile.
+
+Each event touches only its own component, in O(1) queries: a new reading
+updates the EWMA in one UPDATE, an alert opened or resolved recounts that
+patient's open alerts, and a profile change re-reads its diseases. Patients
+seen for the first time get a full recompute, which replays their last
+RISK_VITALS_WINDOW readings. A full recompute of every patient backfills or
+repairs the table:
+    python -m app.services.risk_scoring
+"""
+
+import logging
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.domain_models import Alert, AlertSeverity, PatientProfile, PatientRiskScore, Vitals, VitalSign
+from app.models.user_model import User, UserRole
+from app.services import patient_search
+
+logger = logging.getLogger(__name__)
+
+VITALS_WEIGHT = 40.0
+ALERTS_CAP = 40.0
+CHRONIC_CAP = 20.0
+
+ALERT_POINTS = {AlertSeverity.RED: 10.0, AlertSeverity.YELLOW: 4.0, AlertSeverity.BLUE: 1.0}
+CHRONIC_POINTS = 5.0
+
+# Normal adult ranges; a value one range-width outside its range counts as maximal deviation
+NORMAL_RANGES = {
+    VitalSign.HEART_RATE: (60.0, 100.0),
+    VitalSign.TEMPERATURE: (36.1, 37.8),
+    VitalSign.SPO2: (95.0, 100.0),
+    VitalSign.SYSTOLIC: (90.0, 140.0),
+    VitalSign.DIASTOLIC: (60.0, 90.0),
+    VitalSign.PULSE: (60.0, 100.0),
+}
+
+def reading_risk(obj) -> float:
+    """Deviation (0-1) of the worst vital of a reading from its normal range."""
+    worst = 0.0
+    for vital, (low, high) in NORMAL_RANGES.items():
+        value = getattr(obj, vital.value, None)
+        # Zero or missing values mean "not measured"
+        if not value:
+            continue
+        if value < low:
+            distance = low - value
+        elif value > high:
+            distance = value - high
+        else:
+            continue
+        worst = max(worst, min(distance / (high - low), 1.0))
+    return worst
+
+
+def alerts_component(counts: Dict[AlertSeverity, int]) -> float:
+    return min(sum(ALERT_POINTS.get(severity, 0.0) * count for severity, count in counts.items()), ALERTS_CAP)
+
+
+def chronic_component(chronic_diseases: Optional[str]) -> float:
+    return min(len(patient_search.disease_tags(chronic_diseases)) * CHRONIC_POINTS, CHRONIC_CAP)
+
+
+def _open_alert_counts(db: Session, patient_id: int) -> Dict[AlertSeverity, int]:
+    rows = (
+        db.query(Alert.severity, func.count(Alert.id))
+        .filter(Alert.patient_id == patient_id, Alert.is_resolved == False)
+        .group_by(Alert.severity)
+        .all()
+    )
+    return {severity: count for severity, count in rows if severity is not None}
+
+
+def _chronic_text(db: Session, patient_id: int) -> Optional[str]:
+    return db.query(PatientProfile.chronic_diseases).filter(PatientProfile.user_id == patient_id).scalar()
+
+
+def _vitals_from_history(db: Session, patient_id: int) -> float:
+    rows = (
+        db.query(*(getattr(Vitals, vital.value) for vital in NORMAL_RANGES))
+        .filter(Vitals.patient_id == patient_id)
+        .order_by(Vitals.timestamp.desc(), Vitals.id.desc())
+        .limit(settings.RISK_VITALS_WINDOW)
+        .all()
+    )
+    # Same recurrence as record_reading(), starting from "no risk"
+    alpha = settings.RISK_VITALS_EWMA_ALPHA
+    ewma = 0.0
+    for row in reversed(rows):
+        ewma = alpha * reading_risk(row) + (1 - alpha) * ewma
+    return VITALS_WEIGHT * ewma
+
+
+def recompute_patient(db: Session, patient_id: int) -> PatientRiskScore:
+    """Compute every component of one patient from scratch. The caller commits."""
+    vitals = _vitals_from_history(db, patient_id)
+    alerts = alerts_component(_open_alert_counts(db, patient_id))
+    chronic = chronic_component(_chronic_text(db, patient_id))
+    row = db.get(PatientRiskScore, patient_id)
+    if row is None:
+        row = PatientRiskScore(patient_id=patient_id)
+        db.add(row)
+    else:
+        # More than a live reading's step: the history may have been rewritten
+        # (import, backfill), so streaming detectors look for what they missed
+        row.reading_count = PatientRiskScore.reading_count + 2
+    row.vitals_component = vitals
+    row.alerts_component = alerts
+    row.chronic_component = chronic
+    row.score = vitals + alerts + chronic
+    return row
+
+
+def _ensure(db: Session, patient_id: int) -> bool:
+    """Recompute a patient without a cached score; True when that happened."""
+    if db.query(PatientRiskScore.patient_id).filter(PatientRiskScore.patient_id == patient_id).first():
+        return False
+    recompute_patient(db, patient_id)
+    try:
+        db.flush()
+    except IntegrityError:
+        # A concurrent request inserted the row first, after this event was stored
+        db.rollback()
+    return True
+
+
+def record_reading(db: Session, vital: Vitals) -> Optional[int]:
+    """
+    Fold a newly stored reading into the patient's vitals component. Commits.
+    Call it before anything else refreshes the patient's score, so a first
+    recompute (which already replays this reading) is not followed by a fold.
+    Returns the patient's reading count including this reading, which the
+    same UPDATE increments atomically.
+    """
+    values = {"reading_count": PatientRiskScore.reading_count + 1}
+    if not _ensure(db, vital.patient_id):
+        alpha = settings.RISK_VITALS_EWMA_ALPHA
+        vitals = alpha * VITALS_WEIGHT * reading_risk(vital) + (1 - alpha) * PatientRiskScore.vitals_component
+        values.update(
+            vitals_component=vitals,
+            score=vitals + PatientRiskScore.alerts_component + PatientRiskScore.chronic_component,
+        )
+    count = db.execute(
+        update(PatientRiskScore)
+        .where(PatientRiskScore.patient_id == vital.patient_id)
+        .values(**values)
+        .returning(PatientRiskScore.reading_count)
+    ).scalar()
+    db.commit()
+    return count
+
+
+def refresh_alerts(db: Session, patient_ids: Iterable[int]) -> None:
+    """Recount the open alerts of patients whose alerts changed. Commits."""
+    for patient_id in set(patient_ids):
+        if _ensure(db, patient_id):
+            continue
+        alerts = alerts_component(_open_alert_counts(db, patient_id))
+        db.execute(
+            update(PatientRiskScore)
+            .where(PatientRiskScore.patient_id == patient_id)
+            .values(
+                alerts_component=alerts,
+                score=PatientRiskScore.vitals_component + alerts + PatientRiskScore.chronic_component,
+            )
+        )
+    db.commit()
+
+
+def refresh_chronic(db: Session, patient_id: int) -> None:
+    """Re-read the chronic diseases of a patient whose profile changed. Commits."""
+    if not _ensure(db, patient_id):
+        chronic = chronic_component(_chronic_text(db, patient_id))
+        db.execute(
+            update(PatientRiskScore)
+            .where(PatientRiskScore.patient_id == patient_id)
+            .values(
+                chronic_component=chronic,
+                score=PatientRiskScore.vitals_component + PatientRiskScore.alerts_component + chronic,
+            )
+        )
+    db.commit()
+
+
+def recompute(db: Session, patient_ids: Optional[Iterable[int]] = None) -> int:
+    """Full recompute of the given patients, or of every patient. Commits."""
+    if patient_ids is None:
+        patient_ids = [row.id for row in db.query(User.id).filter(User.role == UserRole.PATIENT)]
+    count = 0
+    for patient_id in patient_ids:
+        recompute_patient(db, patient_id)
+        count += 1
+    db.commit()
+    return count
+
+
+def get_score(db: Session, patient_id: int) -> Optional[float]:
+    return db.query(PatientRiskScore.score).filter(PatientRiskScore.patient_id == patient_id).scalar()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        logger.info(f"Recomputed the risk score of {recompute(db)} patients.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Compiled anomaly rules.
+
+Disease thresholds and the multi-condition rules in `anomaly_rules` are
+compiled into one flat evaluation plan: every condition becomes a closure over
+a reading tuple, so evaluating a reading is a loop of plain function calls
+with no attribute lookups, parsing or queries. The plan is rebuilt only when
+one of its cached sources (thresholds, active rules) is refreshed.
+
+A rule applies to the patients tagged with its disease; a rule with a blank
+disease applies to every patient. for_diseases() narrows a plan to one
+patient's tags.
+"""
+
+import operator
+import threading
+from datetime import datetime
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.models.domain_models import AlertSeverity, VitalSign
+from app.schemas.anomaly_rule import AnomalyRule, RuleCondition
+from app.schemas.threshold import DiseaseThreshold
+from app.services import patient_search
+
+# A reading is a plain tuple: one slot per VitalSign (in enum order), then the
+# timestamp as epoch seconds. Missing values are None.
+VITAL_INDEX = {vital: index for index, vital in enumerate(VitalSign)}
+TIMESTAMP_INDEX = len(VITAL_INDEX)
+
+Reading = Tuple[Optional[float], ...]
+Predicate = Callable[[Reading, Optional[Reading]], bool]
+
+_COMPARATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+def reading_from(obj) -> Reading:
+    """Build a reading from anything with the Vitals attributes (model instance or row)."""
+    timestamp: Optional[datetime] = getattr(obj, "timestamp", None)
+    return tuple(getattr(obj, vital.value) for vital in VitalSign) + (
+        timestamp.timestamp() if timestamp is not None else None,
+    )
+
+
+class CompiledRule:
+    __slots__ = (
+        "rule_id", "name", "disease", "disease_key", "severity", "predicate", "sustained",
+        "history_needed", "primary_vital", "threshold_min", "threshold_max", "message",
+    )
+
+    def __init__(
+        self,
+        *,
+        rule_id: Optional[int],
+        name: str,
+        disease: str,
+        severity: AlertSeverity,
+        predicate: Predicate,
+        sustained: int,
+        uses_rate: bool,
+        primary_vital: VitalSign,
+        threshold_min: Optional[float],
+        threshold_max: Optional[float],
+        message: Optional[str],
+    ):
+        self.rule_id = rule_id
+        self.name = name
+        self.disease = disease
+        # Matched against the patient's disease tags; "" applies to every patient
+        self.disease_key = patient_search.disease_key(disease or "")
+        self.severity = severity
+        self.predicate = predicate
+        self.sustained = sustained
+        # Earlier readings needed: the sustained window, plus one more for rates
+        self.history_needed = sustained - 1 + (1 if uses_rate else 0)
+        self.primary_vital = primary_vital
+        self.threshold_min = threshold_min
+        self.threshold_max = threshold_max
+        self.message = message
+
+    def actual_value(self, reading: Reading) -> Optional[float]:
+        return reading[VITAL_INDEX[self.primary_vital]]
+
+    def alert_message(self, actual_value: Optional[float]) -> str:
+        if self.message:
+            return self.message
+        return f"Anomaly in {self.disease}: value {actual_value} is outside the normal range."
+
+
+def _compile_condition(condition: RuleCondition) -> Predicate:
+    index = VITAL_INDEX[condition.vital]
+    # Zero or missing values mean "not measured" and never match, as before
+    if condition.kind == "range":
+        low, high = condition.min_value, condition.max_value
+        if low is None:
+            def check(cur, prev):
+                value = cur[index]
+                return bool(value) and value > high
+        elif high is None:
+            def check(cur, prev):
+                value = cur[index]
+                return bool(value) and value < low
+        else:
+            def check(cur, prev):
+                value = cur[index]
+                return bool(value) and (value < low or value > high)
+        return check
+
+    compare = _COMPARATORS[condition.op]
+    limit = condition.value
+    if condition.kind == "threshold":
+        def check(cur, prev):
+            value = cur[index]
+            return bool(value) and compare(value, limit)
+        return check
+
+    # Rate of change per minute against the previous reading
+    def check(cur, prev):
+        if prev is None:
+            return False
+        value, previous = cur[index], prev[index]
+        if not value or not previous or cur[TIMESTAMP_INDEX] is None or prev[TIMESTAMP_INDEX] is None:
+            return False
+        minutes = (cur[TIMESTAMP_INDEX] - prev[TIMESTAMP_INDEX]) / 60
+        return minutes > 0 and compare((value - previous) / minutes, limit)
+    return check
+
+
+def _combine(checks: Sequence[Predicate]) -> Predicate:
+    if len(checks) == 1:
+        return checks[0]
+    if len(checks) == 2:
+        first, second = checks
+        return lambda cur, prev: first(cur, prev) and second(cur, prev)
+    checks = tuple(checks)
+    return lambda cur, prev: all(check(cur, prev) for check in checks)
+
+
+def _bounds(condition: RuleCondition) -> Tuple[Optional[float], Optional[float]]:
+    if condition.kind == "range":
+        return condition.min_value, condition.max_value
+    if condition.kind == "threshold":
+        return (None, condition.value) if condition.op in (">", ">=") else (condition.value, None)
+    return None, None
+
+
+def _describe(condition: RuleCondition) -> str:
+    if condition.kind == "range":
+        if condition.min_value is None:
+            return f"{condition.vital.value} > {condition.max_value}"
+        if condition.max_value is None:
+            return f"{condition.vital.value} < {condition.min_value}"
+        return f"{condition.vital.value} outside {condition.min_value}-{condition.max_value}"
+    if condition.kind == "rate":
+        return f"{condition.vital.value} changing {condition.op} {condition.value}/min"
+    return f"{condition.vital.value} {condition.op} {condition.value}"
+
+
+def compile_threshold(threshold: DiseaseThreshold) -> CompiledRule:
+    condition = RuleCondition(
+        kind="range", vital=threshold.vital, min_value=threshold.min_value, max_value=threshold.max_value
+    )
+    return CompiledRule(
+        rule_id=None,
+        name=f"{threshold.disease} {threshold.vital.value}",
+        disease=threshold.disease,
+        severity=threshold.severity,
+        predicate=_compile_condition(condition),
+        sustained=1,
+        uses_rate=False,
+        primary_vital=threshold.vital,
+        threshold_min=threshold.min_value,
+        threshold_max=threshold.max_value,
+        message=None,
+    )
+
+
+def compile_rule(rule: AnomalyRule) -> CompiledRule:
+    primary = rule.conditions[0]
+    threshold_min, threshold_max = _bounds(primary)
+    description = " and ".join(_describe(condition) for condition in rule.conditions)
+    if rule.sustained_readings > 1:
+        description += f" for {rule.sustained_readings} readings"
+    return CompiledRule(
+        rule_id=rule.id,
+        name=rule.name,
+        disease=rule.disease,
+        severity=rule.severity,
+        predicate=_combine([_compile_condition(condition) for condition in rule.conditions]),
+        sustained=rule.sustained_readings,
+        uses_rate=any(condition.kind == "rate" for condition in rule.conditions),
+        primary_vital=primary.vital,
+        threshold_min=threshold_min,
+        threshold_max=threshold_max,
+        message=rule.message or f"Anomaly in {rule.disease}: {description}.",
+    )
+
+
+class EvaluationPlan:
+    def __init__(self, rules: Iterable[CompiledRule]):
+        self.rules: Tuple[CompiledRule, ...] = tuple(rules)
+        # How many earlier readings of the patient evaluate() may look at
+        self.history_depth = max((rule.history_needed for rule in self.rules), default=0)
+        self._by_diseases: Dict[FrozenSet[str], "EvaluationPlan"] = {}
+
+    def for_diseases(self, tags: FrozenSet[str]) -> "EvaluationPlan":
+        """
+        The rules of this plan that apply to a patient with the disease keys
+        `tags`: the global ones and those of their diseases. Cached per tag set,
+        of which there are few.
+        """
+        plan = self._by_diseases.get(tags)
+        if plan is None:
+            plan = EvaluationPlan(rule for rule in self.rules if not rule.disease_key or rule.disease_key in tags)
+            self._by_diseases[tags] = plan
+        return plan
+
+    def evaluate(self, reading: Reading, history: Sequence[Reading] = ()) -> List[CompiledRule]:
+        """
+        Rules matched by `reading`. `history` holds the patient's earlier
+        readings, newest first, at least `history_depth` of them when available.
+        """
+        previous = history[0] if history else None
+        matched = []
+        for rule in self.rules:
+            if not rule.predicate(reading, previous):
+                continue
+            if rule.sustained > 1:
+                if len(history) < rule.sustained - 1:
+                    continue
+                predicate = rule.predicate
+                sustained = True
+                for k in range(rule.sustained - 1):
+                    if not predicate(history[k], history[k + 1] if k + 1 < len(history) else None):
+                        sustained = False
+                        break
+                if not sustained:
+                    continue
+            matched.append(rule)
+        return matched
+
+
+def compile_plan(thresholds: Iterable[DiseaseThreshold], rules: Iterable[AnomalyRule]) -> EvaluationPlan:
+    return EvaluationPlan(
+        [compile_threshold(threshold) for threshold in thresholds]
+        + [compile_rule(rule) for rule in rules]
+    )
+
+
+_plan: Optional[Tuple[tuple, EvaluationPlan]] = None
+_plan_lock = threading.Lock()
+
+
+def get_plan(db: Session) -> EvaluationPlan:
+    """The compiled plan for the currently cached thresholds and active rules."""
+    global _plan
+    snapshot = crud.thresholds.get_snapshot(db)
+    rules = crud.anomaly_rules.get_active_cached(db)
+    cached = _plan
+    if cached is not None and cached[0][0] is snapshot and cached[0][1] is rules:
+        return cached[1]
+    with _plan_lock:
+        cached = _plan
+        if cached is None or cached[0][0] is not snapshot or cached[0][1] is not rules:
+            cached = ((snapshot, rules), compile_plan(snapshot.thresholds, rules))
+            _plan = cached
+        return cached[1]
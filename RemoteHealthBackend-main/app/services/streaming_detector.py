@@ -0,0 +1,356 @@
+"""
+Streaming windowed anomaly detection.
+
+Complements the threshold/rule checks, which look at one reading at a time,
+with per-patient rolling statistics kept in memory:
+
+* a ring buffer of the last STREAM_WINDOW_READINGS values per vital, with
+  windowed Welford mean/variance (z-score of each new value against the
+  window) and running least-squares sums (trend slope per hour);
+* an EWMA of each vital, reported alongside the scores;
+* a count of consecutive readings more than STREAM_ZSCORE_LIMIT standard
+  deviations away from the window mean (sustained excursion).
+
+Every update is O(1). State is built lazily from the patient's most recent
+vitals on first access and the least recently used patients are evicted past
+STREAM_MAX_PATIENTS. State is per worker: before scoring a reading, a worker
+first replays the patient's readings that other workers stored since it last
+saw the patient, so every worker scores against the same window. The patient's
+live reading count (kept by risk_scoring.record_reading) tells whether there
+are any: only when it moved by more than one since the state last saw it does
+an indexed range query look for them. Readings whose timestamp is older than
+the window's newest are skipped everywhere.
+
+Only slow trends and sustained excursions raise findings: single-reading
+spikes are left to the threshold rules.
+"""
+
+import logging
+import math
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.domain_models import Vitals, VitalSign
+
+logger = logging.getLogger(__name__)
+
+# Trend slope (units per hour, either direction) that raises a finding
+TREND_LIMITS_PER_HOUR: Dict[VitalSign, float] = {
+    VitalSign.HEART_RATE: 10.0,
+    VitalSign.TEMPERATURE: 0.3,
+    VitalSign.SPO2: 1.0,
+    VitalSign.SYSTOLIC: 10.0,
+    VitalSign.DIASTOLIC: 8.0,
+    VitalSign.PULSE: 10.0,
+}
+
+# Window times are re-anchored once the oldest point is this far from the origin
+REBASE_AFTER_HOURS = 24 * 7
+
+TREND = "trend"
+SUSTAINED = "sustained"
+
+
+class VitalScore:
+    __slots__ = ("vital", "value", "zscore", "ewma", "slope_per_hour", "excursion_count")
+
+    def __init__(self, vital, value, zscore, ewma, slope_per_hour, excursion_count):
+        self.vital = vital
+        self.value = value
+        self.zscore = zscore
+        self.ewma = ewma
+        self.slope_per_hour = slope_per_hour
+        self.excursion_count = excursion_count
+
+
+class Finding:
+    """A trend or sustained excursion detected on one vital of one reading."""
+    __slots__ = ("kind", "score")
+
+    def __init__(self, kind: str, score: VitalScore):
+        self.kind = kind
+        self.score = score
+
+    @property
+    def disease(self) -> str:
+        label = "Trend" if self.kind == TREND else "Sustained deviation"
+        return f"{label} ({self.score.vital.value})"
+
+    @property
+    def message(self) -> str:
+        vital = self.score.vital.value
+        if self.kind == TREND:
+            direction = "rising" if self.score.slope_per_hour > 0 else "falling"
+            return f"{vital} {direction} steadily at {self.score.slope_per_hour:+.2f}/h (now {self.score.value:g})."
+        return (
+            f"{vital} has stayed {abs(self.score.zscore):.1f} standard deviations from its recent mean "
+            f"for {self.score.excursion_count} readings (now {self.score.value:g})."
+        )
+
+
+class VitalStream:
+    """Rolling state of one vital of one patient."""
+    __slots__ = (
+        "window", "origin", "n", "mean", "m2", "ewma",
+        "sum_t", "sum_v", "sum_tt", "sum_tv", "excursions", "excursion_active", "trend_active",
+    )
+
+    def __init__(self, size: int):
+        # (hours since origin, value); times are kept small so the
+        # least-squares sums do not lose precision
+        self.window = deque(maxlen=size)
+        self.origin: Optional[float] = None
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ewma: Optional[float] = None
+        self.sum_t = self.sum_v = self.sum_tt = self.sum_tv = 0.0
+        self.excursions = 0
+        self.excursion_active = False
+        self.trend_active = False
+
+    def _add(self, t: float, value: float) -> None:
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        self.sum_t += t
+        self.sum_v += value
+        self.sum_tt += t * t
+        self.sum_tv += t * value
+
+    def _remove(self, t: float, value: float) -> None:
+        if self.n <= 1:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+        else:
+            previous_mean = self.mean
+            self.mean = (self.n * previous_mean - value) / (self.n - 1)
+            self.m2 = max(self.m2 - (value - previous_mean) * (value - self.mean), 0.0)
+            self.n -= 1
+        self.sum_t -= t
+        self.sum_v -= value
+        self.sum_tt -= t * t
+        self.sum_tv -= t * value
+
+    def slope(self) -> float:
+        if self.n < 2:
+            return 0.0
+        denominator = self.n * self.sum_tt - self.sum_t * self.sum_t
+        if denominator <= 1e-12:
+            return 0.0
+        return (self.n * self.sum_tv - self.sum_t * self.sum_v) / denominator
+
+    def _rebase(self, origin: float) -> None:
+        """Move the time origin and rebuild the sums from the window, which also
+        discards rounding drift accumulated by the incremental updates."""
+        shift = self.origin - origin
+        points = [(t + shift, value) for t, value in self.window]
+        self.origin = origin
+        self.window.clear()
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+        self.sum_t = self.sum_v = self.sum_tt = self.sum_tv = 0.0
+        for t, value in points:
+            self.window.append((t, value))
+            self._add(t, value)
+
+    def push(self, vital: VitalSign, t: float, value: float) -> VitalScore:
+        """Score `value` against the window, then add it. O(1) amortized."""
+        if self.origin is None:
+            self.origin = t
+        elif self.window and self.window[0][0] > REBASE_AFTER_HOURS:
+            self._rebase(self.origin + self.window[0][0])
+        t -= self.origin
+
+        zscore = 0.0
+        if self.n >= settings.STREAM_MIN_READINGS:
+            std = math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+            if std > 1e-9:
+                zscore = (value - self.mean) / std
+        self.excursions = self.excursions + 1 if abs(zscore) >= settings.STREAM_ZSCORE_LIMIT else 0
+
+        if len(self.window) == self.window.maxlen:
+            self._remove(*self.window[0])
+        self.window.append((t, value))
+        self._add(t, value)
+
+        alpha = settings.STREAM_EWMA_ALPHA
+        self.ewma = value if self.ewma is None else alpha * value + (1 - alpha) * self.ewma
+        return VitalScore(vital, value, zscore, self.ewma, self.slope(), self.excursions)
+
+    def span_hours(self) -> float:
+        return self.window[-1][0] - self.window[0][0] if self.window else 0.0
+
+
+class PatientState:
+    __slots__ = ("streams", "last_t", "last_id", "last_timestamp", "reading_count")
+
+    def __init__(self):
+        self.streams: Dict[VitalSign, VitalStream] = {}
+        self.last_t: Optional[float] = None
+        # Newest reading folded in, to find the ones other workers stored since
+        self.last_id: Optional[int] = None
+        self.last_timestamp = None
+        # The patient's reading count as of the last reading observed; None when unknown
+        self.reading_count: Optional[int] = None
+
+    def observe(self, t: float, values: Dict[VitalSign, Optional[float]]) -> List[Finding]:
+        if self.last_t is not None and t < self.last_t:
+            # Late readings would corrupt the time-ordered window; leave them to the rules
+            return []
+        self.last_t = t
+        findings = []
+        for vital, value in values.items():
+            if not value:
+                continue
+            stream = self.streams.get(vital)
+            if stream is None:
+                stream = self.streams[vital] = VitalStream(settings.STREAM_WINDOW_READINGS)
+            score = stream.push(vital, t, float(value))
+
+            # Both findings are edge-triggered, with hysteresis, so a long
+            # (noisy) episode raises one alert
+            if score.excursion_count >= settings.STREAM_SUSTAINED_READINGS and not stream.excursion_active:
+                stream.excursion_active = True
+                findings.append(Finding(SUSTAINED, score))
+            elif stream.excursion_active and abs(score.zscore) < settings.STREAM_ZSCORE_LIMIT / 2:
+                stream.excursion_active = False
+            limit = TREND_LIMITS_PER_HOUR[vital]
+            trending = (
+                abs(score.slope_per_hour) >= limit
+                and stream.n >= settings.STREAM_MIN_READINGS
+                and stream.span_hours() * 60 >= settings.STREAM_TREND_MIN_SPAN_MINUTES
+            )
+            if trending and not stream.trend_active:
+                stream.trend_active = True
+                findings.append(Finding(TREND, score))
+            elif stream.trend_active and abs(score.slope_per_hour) < limit / 2:
+                stream.trend_active = False
+        return findings
+
+
+def _hours(timestamp) -> float:
+    return timestamp.timestamp() / 3600.0
+
+
+def _values(obj) -> Dict[VitalSign, Optional[float]]:
+    return {vital: getattr(obj, vital.value) for vital in VitalSign}
+
+
+class StreamingDetector:
+    def __init__(self):
+        self._states: "OrderedDict[int, PatientState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _replay(state: PatientState, rows) -> None:
+        # Findings raised while replaying belong to readings that were already
+        # processed; only the resulting state (including active trends) is kept
+        for row in rows:
+            if row.timestamp is None or (state.last_id is not None and row.id <= state.last_id):
+                continue
+            state.observe(_hours(row.timestamp), _values(row))
+            state.last_id, state.last_timestamp = row.id, row.timestamp
+
+    @staticmethod
+    def _history(db: Session, patient_id: int):
+        return db.query(Vitals.id, Vitals.timestamp, *(getattr(Vitals, vital.value) for vital in VitalSign)).filter(
+            Vitals.patient_id == patient_id
+        )
+
+    def _rehydrate(self, db: Session, patient_id: int, before_id: int) -> PatientState:
+        state = PatientState()
+        rows = (
+            self._history(db, patient_id)
+            .filter(Vitals.id < before_id)
+            .order_by(Vitals.timestamp.desc(), Vitals.id.desc())
+            .limit(settings.STREAM_WINDOW_READINGS)
+            .all()
+        )
+        self._replay(state, reversed(rows))
+        return state
+
+    def _missed(self, db: Session, patient_id: int, last_id: Optional[int], last_timestamp, before_id: int) -> Optional[list]:
+        """
+        Readings of the patient stored after `last_id` and before `before_id`,
+        oldest first; None when there are more than a window's worth, so
+        rehydrating is cheaper.
+        """
+        if last_id is None:
+            return []
+        # Earlier timestamps would be skipped as late anyway; bounding by time
+        # keeps this a range scan of ix_vitals_patient_id_timestamp
+        rows = (
+            self._history(db, patient_id)
+            .filter(Vitals.timestamp >= last_timestamp, Vitals.id > last_id, Vitals.id < before_id)
+            .order_by(Vitals.timestamp, Vitals.id)
+            .limit(settings.STREAM_WINDOW_READINGS + 1)
+            .all()
+        )
+        return rows if len(rows) <= settings.STREAM_WINDOW_READINGS else None
+
+    def observe(self, db: Session, vital: Vitals, reading_count: Optional[int] = None) -> List[Finding]:
+        """
+        Score a newly stored reading and return its trend/sustained findings.
+        `reading_count` is the patient's live reading count including this
+        one; without it, every reading checks for missed ones.
+        """
+        if vital.timestamp is None:
+            return []
+        patient_id = vital.patient_id
+        with self._lock:
+            state = self._states.get(patient_id)
+            if state is not None:
+                self._states.move_to_end(patient_id)
+                last_id, last_timestamp = state.last_id, state.last_timestamp
+                up_to_date = (
+                    reading_count is not None
+                    and state.reading_count is not None
+                    and reading_count == state.reading_count + 1
+                )
+        if state is not None and not up_to_date:
+            missed = self._missed(db, patient_id, last_id, last_timestamp, vital.id)
+            if missed is None:
+                # Other workers stored more than a window since: start over
+                self.forget([patient_id])
+                state = None
+            elif missed:
+                with self._lock:
+                    self._replay(state, missed)
+        if state is None:
+            # Query outside the lock so other patients are not held up
+            rehydrated = self._rehydrate(db, patient_id, vital.id)
+            with self._lock:
+                state = self._states.get(patient_id)
+                if state is None:
+                    state = self._states[patient_id] = rehydrated
+                    while len(self._states) > settings.STREAM_MAX_PATIENTS:
+                        self._states.popitem(last=False)
+        with self._lock:
+            if state.last_id is not None and vital.id <= state.last_id:
+                # Already replayed by a concurrent request of this worker
+                return []
+            findings = state.observe(_hours(vital.timestamp), _values(vital))
+            state.last_id, state.last_timestamp = vital.id, vital.timestamp
+            if reading_count is not None:
+                state.reading_count = max(reading_count, state.reading_count or 0)
+            return findings
+
+    def forget(self, patient_ids: Iterable[int]) -> None:
+        """Drop state, e.g. after a bulk import rewrote a patient's history."""
+        with self._lock:
+            for patient_id in patient_ids:
+                self._states.pop(patient_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+detector = StreamingDetector()
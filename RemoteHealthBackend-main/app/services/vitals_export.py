@@ -0,0 +1,215 @@
+"""
+Streaming export of vital sign history.
+
+Rows are read through a server-side cursor (`yield_per`) and encoded chunk by
+chunk, so memory stays flat no matter how many rows are exported.
+"""
+
+import csv
+import enum
+import importlib.util
+import io
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.domain_models import Vitals
+from app.models.user_model import User
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = (
+    "id",
+    "patient_id",
+    "timestamp",
+    "heart_rate",
+    "temperature",
+    "spo2",
+    "systolic",
+    "diastolic",
+    "pulse",
+    "source",
+)
+
+
+class ExportFormat(str, enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+
+
+class HistoryFormat(str, enum.Enum):
+    """Encodings of a vitals history page."""
+    ROWS = "rows"
+    COLUMNAR = "columnar"
+    ARROW = "arrow"
+
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def pyarrow_available() -> bool:
+    # Parquet export and Arrow responses are optional; pyarrow is only imported
+    # once one actually runs, so it stays out of the app's import time
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _iter_row_chunks(
+    patient_ids: Optional[Sequence[int]],
+    doctor_id: Optional[int],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    chunk_size: int,
+) -> Iterator[List[tuple]]:
+    # The response body is produced after the request's own session has been
+    # handed back, so the stream owns a dedicated session for its whole lifetime.
+    db: Session = SessionLocal()
+    try:
+        query = db.query(*(getattr(Vitals, column) for column in EXPORT_COLUMNS))
+        if patient_ids is not None:
+            query = query.filter(Vitals.patient_id.in_(patient_ids))
+        if doctor_id is not None:
+            # A subquery, so a large cohort is never bound as a parameter list
+            query = query.filter(Vitals.patient_id.in_(select(User.id).where(User.doctor_id == doctor_id)))
+        if start_date is not None:
+            query = query.filter(Vitals.timestamp >= start_date)
+        if end_date is not None:
+            query = query.filter(Vitals.timestamp <= end_date)
+        query = query.order_by(Vitals.patient_id, Vitals.timestamp, Vitals.id)
+
+        chunk: List[tuple] = []
+        for row in query.yield_per(chunk_size):
+            chunk.append(tuple(row))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        db.close()
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _encode_csv(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunks:
+        writer.writerows([tuple(_plain(v) for v in row) for row in chunk])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Header only, when there were no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        lines = [
+            json.dumps({column: _plain(value) for column, value in zip(EXPORT_COLUMNS, row)})
+            for row in chunk
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.int64()),
+        ("patient_id", pa.int64()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("heart_rate", pa.float64()),
+        ("temperature", pa.float64()),
+        ("spo2", pa.float64()),
+        ("systolic", pa.int64()),
+        ("diastolic", pa.int64()),
+        ("pulse", pa.int64()),
+        ("source", pa.string()),
+    ])
+
+
+def _encode_parquet(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema()
+    sink = io.BytesIO()
+    # Every chunk becomes one row group; drain the sink after each so only a
+    # single row group is ever buffered.
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in chunks:
+            columns = list(zip(*chunk))
+            columns[EXPORT_COLUMNS.index("source")] = [_plain(v) for v in columns[EXPORT_COLUMNS.index("source")]]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate(0)
+    yield sink.getvalue()
+
+
+def encode_arrow(columns: Dict[str, list]) -> bytes:
+    """Parallel lists keyed by EXPORT_COLUMNS as an Arrow IPC stream of one record batch."""
+    import pyarrow as pa
+
+    schema = _arrow_schema()
+    values = dict(columns, source=[_plain(v) for v in columns["source"]])
+    arrays = [pa.array(values[field.name], type=field.type) for field in schema]
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(pa.record_batch(arrays, schema=schema))
+    return sink.getvalue().to_pybytes()
+
+
+def stream_vitals(
+    export_format: ExportFormat,
+    *,
+    patient_ids: Optional[Sequence[int]] = None,
+    doctor_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    chunk_size: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Stream vitals as encoded bytes.
+
+    Args:
+        export_format: Output encoding
+        patient_ids: Restrict to these patients (User IDs); None exports every patient
+        doctor_id: Restrict to the patients of this doctor (User ID)
+        start_date: Only readings taken on or after this time
+        end_date: Only readings taken on or before this time
+        chunk_size: Rows fetched from the cursor and encoded per chunk
+    """
+    chunks = _iter_row_chunks(patient_ids, doctor_id, start_date, end_date, chunk_size or settings.EXPORT_CHUNK_SIZE)
+    if export_format == ExportFormat.CSV:
+        return _encode_csv(chunks)
+    if export_format == ExportFormat.NDJSON:
+        return _encode_ndjson(chunks)
+    if not pyarrow_available():
+        raise RuntimeError("Parquet export requires the 'pyarrow' package")
+    return _encode_parquet(chunks)
@@ -0,0 +1,264 @@
+"""
+Bulk import of historical vital signs from CSV or NDJSON.
+
+Uploads are parsed as a stream, validated against the vitals schema in
+batches and loaded with COPY (PostgreSQL) or a chunked executemany (other
+databases). Anomaly evaluation is deferred to one set-based pass once all
+rows are in.
+
+Command line usage:
+    python -m app.services.vitals_import readings.csv [--patient-id 12] [--skip-anomalies]
+"""
+
+import argparse
+import codecs
+import csv
+import enum
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import vitals as crud_vitals
+from app.db.session import SessionLocal
+from app.models.domain_models import DataSource
+from app.models.user_model import User, UserRole
+from app.schemas.patient import VitalsImportRow, VitalsImportSummary
+from app.services import risk_scoring, streaming_detector
+
+logger = logging.getLogger(__name__)
+
+# Only the first errors are reported back; the counts stay exact
+MAX_REPORTED_ERRORS = 100
+
+_batch_adapter = TypeAdapter(List[VitalsImportRow])
+
+
+class ImportFormat(str, enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+def detect_format(filename: Optional[str]) -> Optional[ImportFormat]:
+    if not filename:
+        return None
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        return ImportFormat.CSV
+    if extension in ("ndjson", "jsonl"):
+        return ImportFormat.NDJSON
+    return None
+
+
+def _iter_records(stream: BinaryIO, import_format: ImportFormat) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, raw record) pairs without reading the whole upload into memory."""
+    text_stream = codecs.getreader("utf-8-sig")(stream)
+    if import_format == ImportFormat.CSV:
+        reader = csv.DictReader(text_stream)
+        for record in reader:
+            # Empty CSV cells mean "no value", not an empty string
+            yield reader.line_num, {k: (v if v != "" else None) for k, v in record.items() if k}
+    else:
+        for line_number, line in enumerate(text_stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, e
+
+
+def _iter_batches(stream: BinaryIO, import_format: ImportFormat, batch_size: int) -> Iterator[List[Tuple[int, object]]]:
+    batch: List[Tuple[int, object]] = []
+    for item in _iter_records(stream, import_format):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _ImportRun:
+    def __init__(self, db: Session, patient_id: Optional[int]):
+        self.db = db
+        self.patient_id = patient_id
+        self.known_patients: Set[int] = set()
+        self.unknown_patients: Set[int] = set()
+        self.rows_received = 0
+        self.rows_imported = 0
+        self.rows_rejected = 0
+        self.errors: List[str] = []
+        self.imported_at = datetime.now(timezone.utc)
+        # Stamped on every row, so the anomaly pass checks exactly this import
+        self.import_id = uuid.uuid4().hex
+
+    def reject(self, line_number: int, reason: str) -> None:
+        self.rows_rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {line_number}: {reason}")
+
+    def _validate(self, batch: List[Tuple[int, object]]) -> List[Tuple[int, VitalsImportRow]]:
+        candidates = []
+        for line_number, record in batch:
+            if not isinstance(record, dict):
+                self.reject(line_number, f"not a JSON object ({record})")
+            else:
+                candidates.append((line_number, record))
+
+        # Validate the whole batch at once; only on failure fall back to row by row
+        try:
+            rows = _batch_adapter.validate_python([record for _, record in candidates])
+            return [(line_number, row) for (line_number, _), row in zip(candidates, rows)]
+        except ValidationError:
+            pass
+
+        valid = []
+        for line_number, record in candidates:
+            try:
+                valid.append((line_number, VitalsImportRow.model_validate(record)))
+            except ValidationError as e:
+                self.reject(line_number, "; ".join(
+                    f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+                ))
+        return valid
+
+    def _check_patients(self, patient_ids: Set[int]) -> None:
+        unseen = patient_ids - self.known_patients - self.unknown_patients
+        if not unseen:
+            return
+        found = {
+            row.id for row in self.db.query(User.id).filter(User.id.in_(unseen), User.role == UserRole.PATIENT)
+        }
+        self.known_patients |= found
+        self.unknown_patients |= unseen - found
+
+    def load_batch(self, batch: List[Tuple[int, object]]) -> None:
+        self.rows_received += len(batch)
+        validated = self._validate(batch)
+
+        self._check_patients({
+            self.patient_id or row.patient_id for _, row in validated if (self.patient_id or row.patient_id)
+        })
+
+        rows: List[Dict] = []
+        for line_number, row in validated:
+            patient_id = self.patient_id or row.patient_id
+            if patient_id is None:
+                self.reject(line_number, "patient_id is required")
+                continue
+            if patient_id in self.unknown_patients:
+                self.reject(line_number, f"patient {patient_id} does not exist")
+                continue
+            try:
+                source = DataSource(row.source)
+            except ValueError:
+                self.reject(line_number, f"unknown source '{row.source}'")
+                continue
+            rows.append({
+                "patient_id": patient_id,
+                "heart_rate": row.heart_rate,
+                "temperature": row.temperature,
+                "spo2": row.spo2,
+                "systolic": row.systolic,
+                "diastolic": row.diastolic,
+                "pulse": row.pulse,
+                "timestamp": row.timestamp or self.imported_at,
+                "source": source,
+                "import_id": self.import_id,
+            })
+
+        self.rows_imported += crud_vitals.bulk_create(self.db, rows=rows)
+        # Commit per batch so a large import never holds one huge transaction
+        self.db.commit()
+
+
+def import_vitals(
+    db: Session,
+    stream: BinaryIO,
+    import_format: ImportFormat,
+    *,
+    patient_id: Optional[int] = None,
+    evaluate_anomalies: bool = True,
+    batch_size: Optional[int] = None,
+) -> VitalsImportSummary:
+    """
+    Import vitals from a CSV or NDJSON byte stream.
+
+    Args:
+        db: Database session
+        stream: Binary file object with the upload
+        import_format: Encoding of the stream
+        patient_id: Assign every row to this patient (User ID) instead of reading a patient_id column
+        evaluate_anomalies: Run the set-based anomaly pass over the imported rows once loading finishes
+        batch_size: Rows validated and loaded per batch
+    """
+    run = _ImportRun(db, patient_id)
+
+    for batch in _iter_batches(stream, import_format, batch_size or settings.IMPORT_BATCH_SIZE):
+        run.load_batch(batch)
+
+    # Imported history changes what the streaming detector should have seen
+    streaming_detector.detector.forget(run.known_patients)
+
+    anomalies_created = alerts_created = 0
+    if evaluate_anomalies and run.rows_imported:
+        anomalies_created, alerts_created = crud_vitals.check_anomalies_for_import(db, import_id=run.import_id)
+        db.commit()
+
+    # Replaying the imported history is cheaper than folding in each row
+    if run.rows_imported:
+        risk_scoring.recompute(db, run.known_patients)
+
+    logger.info(
+        f"Vitals import finished: {run.rows_imported} imported, {run.rows_rejected} rejected "
+        f"of {run.rows_received} rows; {anomalies_created} anomalies created."
+    )
+    return VitalsImportSummary(
+        rows_received=run.rows_received,
+        rows_imported=run.rows_imported,
+        rows_rejected=run.rows_rejected,
+        errors=run.errors,
+        anomalies_created=anomalies_created,
+        alerts_created=alerts_created,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk import vitals from a CSV or NDJSON file.")
+    parser.add_argument("path", help="CSV (.csv) or NDJSON (.ndjson/.jsonl) file")
+    parser.add_argument("--format", choices=[f.value for f in ImportFormat], help="Override format detection")
+    parser.add_argument("--patient-id", type=int, help="Assign every row to this patient User ID")
+    parser.add_argument("--skip-anomalies", action="store_true", help="Do not run the anomaly pass after loading")
+    parser.add_argument("--batch-size", type=int, default=settings.IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    import_format = ImportFormat(args.format) if args.format else detect_format(args.path)
+    if import_format is None:
+        parser.error("Could not detect the file format, pass --format")
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as stream:
+            summary = import_vitals(
+                db,
+                stream,
+                import_format,
+                patient_id=args.patient_id,
+                evaluate_anomalies=not args.skip_anomalies,
+                batch_size=args.batch_size,
+            )
+    finally:
+        db.close()
+    print(summary.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmarks for negotiated response compression: latency and bytes on the
+wire of a vitals history page, uncompressed against gzip (and Brotli when the
+optional package is installed), in the row, columnar JSON and Arrow formats,
+plus a streamed NDJSON export.
+
+Bytes sent are recorded in each benchmark's extra_info ("wire_bytes").
+"""
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.api import compression
+
+from conftest import auth_headers
+
+EXPORT_ROWS = 5000
+EXPORT_BATCH = 500
+
+
+def _vitals_page(client, vitals_dataset, accept_encoding: str, format: str = "rows"):
+    patient_id = vitals_dataset["patient_ids"][0]
+    return client.get(
+        f"/api/v1/patient-records/{patient_id}/vitals",
+        params={"limit": 1000, "format": format},
+        headers={**auth_headers(vitals_dataset["doctor_id"]), "Accept-Encoding": accept_encoding},
+    )
+
+
+def test_vitals_history_uncompressed(benchmark, client, vitals_dataset):
+    response = benchmark(_vitals_page, client, vitals_dataset, "identity")
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    benchmark.extra_info["wire_bytes"] = response.num_bytes_downloaded
+
+
+def test_vitals_history_gzip(benchmark, client, vitals_dataset):
+    uncompressed = _vitals_page(client, vitals_dataset, "identity")
+
+    response = benchmark(_vitals_page, client, vitals_dataset, "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == uncompressed.json()
+    # Field names repeat on every reading
+    assert response.num_bytes_downloaded * 4 < uncompressed.num_bytes_downloaded
+    benchmark.extra_info["wire_bytes"] = response.num_bytes_downloaded
+
+
+def test_vitals_history_brotli(benchmark, client, vitals_dataset):
+    if compression.brotli is None:
+        pytest.skip("brotli is not installed")
+    uncompressed = _vitals_page(client, vitals_dataset, "identity")
+
+    response = benchmark(_vitals_page, client, vitals_dataset, "br, gzip")
+
+    assert response.headers["content-encoding"] == "br"
+    assert response.json() == uncompressed.json()
+    benchmark.extra_info["wire_bytes"] = response.num_bytes_downloaded
+
+
+def test_vitals_history_columnar_gzip(benchmark, client, vitals_dataset):
+    rows = _vitals_page(client, vitals_dataset, "gzip")
+
+    response = benchmark(_vitals_page, client, vitals_dataset, "gzip", "columnar")
+
+    assert response.status_code == 200
+    columns = response.json()
+    assert len(columns["id"]) == len(rows.json())
+    assert [row["heartRate"] for row in rows.json()] == columns["heart_rate"]
+    assert response.num_bytes_downloaded < rows.num_bytes_downloaded
+    benchmark.extra_info["wire_bytes"] = response.num_bytes_downloaded
+
+
+def test_vitals_history_arrow(benchmark, client, vitals_dataset):
+    pa = pytest.importorskip("pyarrow")
+    rows = _vitals_page(client, vitals_dataset, "identity").json()
+
+    response = benchmark(_vitals_page, client, vitals_dataset, "gzip", "arrow")
+
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    # Binary, sent as it is
+    assert "content-encoding" not in response.headers
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == len(rows)
+    assert table.column("id").to_pylist() == [row["id"] for row in rows]
+    assert table.column("source").to_pylist() == [row["source"] for row in rows]
+    benchmark.extra_info["wire_bytes"] = response.num_bytes_downloaded
+
+
+def test_negotiate():
+    supported = (compression.BROTLI, compression.GZIP)
+    assert compression.negotiate("gzip, deflate, br", supported) == "br"
+    assert compression.negotiate("br;q=0.5, gzip", supported) == "gzip"
+    assert compression.negotiate("*;q=0.1, br;q=0", supported) == "gzip"
+    assert compression.negotiate("identity", supported) is None
+    assert compression.negotiate("", supported) is None
+
+
+@pytest.fixture(scope="module")
+def export_client():
+    start = datetime(2026, 1, 1)
+    rows = [
+        {
+            "patientId": 1 + n % 10,
+            "timestamp": (start + timedelta(minutes=n)).isoformat(),
+            "heartRate": 60 + n % 40,
+            "temperature": 36.5,
+            "oxygenSaturation": 97.0,
+            "systolic": 120,
+            "diastolic": 80,
+            "source": "SIMULATED",
+        }
+        for n in range(EXPORT_ROWS)
+    ]
+
+    async def batches():
+        for offset in range(0, EXPORT_ROWS, EXPORT_BATCH):
+            yield b"".join(orjson.dumps(row) + b"\n" for row in rows[offset:offset + EXPORT_BATCH])
+
+    app = FastAPI()
+
+    @app.get("/export")
+    def export():
+        return StreamingResponse(batches(), media_type="application/x-ndjson")
+
+    app.add_middleware(compression.CompressionMiddleware)
+    return TestClient(app)
+
+
+def test_streamed_export_gzip(benchmark, export_client):
+    uncompressed = export_client.get("/export", headers={"Accept-Encoding": "identity"})
+
+    response = benchmark(export_client.get, "/export", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content == uncompressed.content
+    assert len(response.content.splitlines()) == EXPORT_ROWS
+    benchmark.extra_info["wire_bytes"] = response.num_bytes_downloaded
+    benchmark.extra_info["uncompressed_bytes"] = uncompressed.num_bytes_downloaded
@@ -0,0 +1,26 @@
+"""
+Benchmarks for request metrics: the per-request cost of the timing middleware
+and rendering /metrics once every route has series.
+"""
+from app.core import metrics
+from app.main import app
+
+
+def test_middleware_overhead(benchmark, client):
+    # The cheapest route, so the middleware's share of the request is visible
+    response = benchmark(client.get, "/")
+
+    assert response.status_code == 200
+    assert metrics.REQUESTS_TOTAL.value("GET", "/", "200") > 0
+
+
+def test_render_metrics(benchmark):
+    routes = [route.path for route in app.routes]
+    for route in routes:
+        for status_code in ("200", "404"):
+            metrics.REQUESTS_TOTAL.inc("GET", route, status_code)
+        metrics.REQUEST_DURATION.observe(0.02, "GET", route)
+
+    text = benchmark(metrics.render)
+
+    assert f'route="{routes[0]}"' in text
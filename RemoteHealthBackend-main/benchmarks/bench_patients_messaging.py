@@ -0,0 +1,120 @@
+"""
+Benchmarks for doctor-scoped patient listing, patient search and chat partner lookup.
+
+Endpoint benchmarks also check per-request query budgets, read from the
+Server-Timing header.
+"""
+from app import crud
+from app.models.domain_models import AlertSeverity
+from app.schemas.user import User as UserSchema
+from app.services import patient_search
+
+from conftest import auth_headers, query_count
+
+# Statements per request of the patient list and chat partner endpoints,
+# whatever the number of patients: the current user lookup plus one list
+# query. More means an N+1 crept in.
+LIST_QUERY_BUDGET = 2
+# Patient lists answer conditional GETs: one more statement for the resource
+# versions, and a 304 stops right after it
+CONDITIONAL_LIST_QUERY_BUDGET = LIST_QUERY_BUDGET + 1
+NOT_MODIFIED_QUERY_BUDGET = 2
+
+
+def _doctor_schema(db, doctor_id: int) -> UserSchema:
+    return UserSchema.model_validate(crud.user.get(db, id=doctor_id))
+
+
+def test_get_multi_filtered_by_doctor(benchmark, db, cohort_dataset):
+    doctor_id = cohort_dataset["doctor_id"]
+
+    result = benchmark(crud.patients.get_multi_filtered, db, doctor_id=doctor_id, limit=100)
+
+    assert len(result) > 0
+
+
+def test_get_multi_filtered_name_and_disease(benchmark, db, cohort_dataset):
+    result = benchmark(
+        crud.patients.get_multi_filtered,
+        db,
+        name_search="patient 1",
+        chronic_disease_filter="copd",
+        limit=100,
+    )
+
+    assert len(result) > 0
+
+
+def test_suggest_patients(benchmark, db, cohort_dataset):
+    # Target: well under 10 ms per keystroke
+    result = benchmark(patient_search.suggest_patients, db, "pati", doctor_id=cohort_dataset["doctor_id"])
+
+    assert len(result) > 0
+
+
+def test_get_multi_filtered_by_severity(benchmark, db, cohort_dataset):
+    benchmark(
+        crud.patients.get_multi_filtered,
+        db,
+        doctor_id=cohort_dataset["doctor_id"],
+        alarm_severity_filter=AlertSeverity.RED,
+        limit=100,
+    )
+
+
+def test_get_chat_partners(benchmark, db, cohort_dataset):
+    doctor = _doctor_schema(db, cohort_dataset["doctor_id"])
+
+    result = benchmark(crud.message.get_chat_partners, db, current_user=doctor)
+
+    assert len(result) == len(cohort_dataset["patient_ids"])
+
+
+def test_endpoint_chat_partners(benchmark, client, cohort_dataset):
+    headers = auth_headers(cohort_dataset["doctor_id"])
+
+    response = benchmark(client.get, "/api/v1/messaging/partners", headers=headers)
+
+    assert response.status_code == 200
+    assert len(response.json()) == len(cohort_dataset["patient_ids"])
+    assert query_count(response) <= LIST_QUERY_BUDGET
+
+
+def test_endpoint_read_all_patient_profiles(benchmark, client, cohort_dataset):
+    headers = auth_headers(cohort_dataset["doctor_id"])
+
+    response = benchmark(client.get, "/api/v1/patient-records/", params={"limit": 100}, headers=headers)
+
+    assert response.status_code == 200
+    assert query_count(response) <= CONDITIONAL_LIST_QUERY_BUDGET
+
+
+def test_endpoint_read_all_patient_profiles_not_modified(benchmark, client, cohort_dataset):
+    headers = auth_headers(cohort_dataset["doctor_id"])
+    etag = client.get("/api/v1/patient-records/", params={"limit": 100}, headers=headers).headers["etag"]
+
+    response = benchmark(
+        client.get, "/api/v1/patient-records/", params={"limit": 100}, headers={**headers, "If-None-Match": etag}
+    )
+
+    assert response.status_code == 304
+    assert query_count(response) <= NOT_MODIFIED_QUERY_BUDGET
+
+
+def test_endpoint_get_my_patients(benchmark, client, cohort_dataset):
+    headers = auth_headers(cohort_dataset["doctor_id"])
+
+    response = benchmark(client.get, "/api/v1/doctors/me/patients", headers=headers)
+
+    assert response.status_code == 200
+    assert len(response.json()) == len(cohort_dataset["patient_ids"])
+    assert query_count(response) <= CONDITIONAL_LIST_QUERY_BUDGET
+
+
+def test_endpoint_patient_typeahead(benchmark, client, cohort_dataset):
+    headers = auth_headers(cohort_dataset["doctor_id"])
+
+    response = benchmark(client.get, "/api/v1/patient-records/typeahead", params={"q": "pat"}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["patients"]
@@ -0,0 +1,54 @@
+"""
+Benchmarks for evaluating one reading against a compiled anomaly rule plan.
+"""
+import os
+import random
+import time
+
+import pytest
+
+from app.models.domain_models import AlertSeverity, VitalSign
+from app.schemas.anomaly_rule import AnomalyRule, RuleCondition
+from app.schemas.threshold import DiseaseThreshold
+from app.services import rule_engine
+
+RULE_COUNTS = [int(v) for v in os.getenv("BENCH_RULE_COUNTS", "10,300").split(",") if v.strip()]
+
+
+def _build_plan(rule_count: int) -> rule_engine.EvaluationPlan:
+    rng = random.Random(rule_count)
+    vitals = list(VitalSign)
+    thresholds = [
+        DiseaseThreshold(id=i + 1, disease=f"Disease {i}", vital=vital, min_value=40.0, max_value=200.0)
+        for i, vital in enumerate(vitals)
+    ]
+    rules = []
+    for i in range(rule_count):
+        first, second = rng.sample(vitals, 2)
+        conditions = [
+            RuleCondition(kind="threshold", vital=first, op=">", value=rng.uniform(100, 200)),
+            RuleCondition(kind="threshold", vital=second, op="<", value=rng.uniform(20, 90)),
+        ]
+        if i % 5 == 0:
+            conditions.append(RuleCondition(kind="rate", vital=first, op=">", value=1.0))
+        rules.append(AnomalyRule(
+            id=i + 1,
+            name=f"rule {i}",
+            disease=f"Rule disease {i}",
+            severity=AlertSeverity.YELLOW,
+            conditions=conditions,
+            sustained_readings=1 + i % 3,
+        ))
+    return rule_engine.compile_plan(thresholds, rules)
+
+
+@pytest.mark.parametrize("rule_count", RULE_COUNTS)
+def test_evaluate_reading(benchmark, rule_count):
+    plan = _build_plan(rule_count)
+    now = time.time()
+    reading = (130.0, 38.2, 91.0, 150, 95, 130, now)
+    history = [(120.0, 37.9, 93.0, 145, 90, 120, now - 60 * k) for k in range(1, plan.history_depth + 1)]
+
+    result = benchmark(plan.evaluate, reading, history)
+
+    assert isinstance(result, list)
@@ -0,0 +1,61 @@
+"""
+Benchmarks for response serialization of a large vitals page: FastAPI's
+default response_model path against validate-once rendering with orjson.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.api.responses import model_list_response
+from app.models.domain_models import DataSource, Vitals
+from app.schemas.patient import Vitals as VitalsSchema
+
+PAGE_SIZE = 1000
+
+
+@pytest.fixture(scope="module")
+def vitals_page():
+    start = datetime(2026, 1, 1)
+    return [
+        Vitals(
+            id=n,
+            patient_id=1,
+            timestamp=start + timedelta(minutes=n),
+            heart_rate=60 + n % 40,
+            temperature=36.5,
+            spo2=97.0,
+            source=DataSource.SIMULATED,
+            systolic=120,
+            diastolic=80,
+            pulse=60 + n % 40,
+        )
+        for n in range(PAGE_SIZE)
+    ]
+
+
+def _default_response(loop, field, rows) -> bytes:
+    # What FastAPI does with a returned list and response_model=List[VitalsSchema]
+    content = loop.run_until_complete(serialize_response(field=field, response_content=rows, is_coroutine=True))
+    return JSONResponse(content).body
+
+
+def test_serialize_vitals_page_default(benchmark, vitals_page):
+    field = create_response_field(name="Response", type_=List[VitalsSchema])
+    loop = asyncio.new_event_loop()
+    try:
+        body = benchmark(_default_response, loop, field, vitals_page)
+    finally:
+        loop.close()
+
+    assert body.startswith(b"[{")
+
+
+def test_serialize_vitals_page_validate_once(benchmark, vitals_page):
+    response = benchmark(model_list_response, VitalsSchema, vitals_page)
+
+    assert response.body.startswith(b"[{")
@@ -0,0 +1,33 @@
+"""
+Benchmarks for worker cold start: importing app.main in a fresh interpreter.
+
+The database URL points into a directory that does not exist, so the import
+fails if anything tries to connect (create tables, seed data, warm caches).
+"""
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+# Builds the app and every route; the OpenAPI schema is only generated on first request
+COLD_START = "import app.main"
+
+
+def _cold_start(database_url: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-c", COLD_START],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, "DATABASE_URL": database_url},
+        capture_output=True,
+        text=True,
+    )
+
+
+def test_cold_start_without_database(benchmark, tmp_path):
+    database_path = tmp_path / "missing" / "app.db"
+
+    result = benchmark.pedantic(_cold_start, args=(f"sqlite:///{database_path}",), rounds=3, iterations=1)
+
+    assert result.returncode == 0, result.stderr
+    assert not database_path.exists()
@@ -0,0 +1,28 @@
+"""
+Benchmarks for scoring one reading against a patient's rolling window.
+"""
+import random
+
+from app.models.domain_models import VitalSign
+from app.services.streaming_detector import PatientState
+
+
+def test_observe_reading(benchmark):
+    rng = random.Random(7)
+    state = PatientState()
+    t = 480000.0
+    # Fill the window first so every benchmarked call also evicts a point
+    for _ in range(1000):
+        t += 1 / 60
+        state.observe(t, {vital: 80.0 + rng.gauss(0, 2) for vital in VitalSign})
+    readings = [{vital: 80.0 + rng.gauss(0, 2) for vital in VitalSign} for _ in range(256)]
+    clock = {"t": t, "i": 0}
+
+    def observe():
+        clock["t"] += 1 / 60
+        clock["i"] += 1
+        return state.observe(clock["t"], readings[clock["i"] % len(readings)])
+
+    result = benchmark(observe)
+
+    assert isinstance(result, list)
@@ -0,0 +1,175 @@
+"""
+Benchmarks for the vitals write path, the alert list queries and the
+dashboard statistics.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import crud
+from app.models.domain_models import AlertSeverity
+from app.schemas.patient import VitalsCreate
+from app.services import result_cache
+
+from conftest import auth_headers, query_count
+
+
+def _anomalous_vital() -> VitalsCreate:
+    return VitalsCreate(
+        heartRate=130,
+        temperature=38.2,
+        oxygenSaturation=91,
+        source="simulated",
+        systolic=150,
+        diastolic=95,
+        pulse=130,
+    )
+
+
+def test_create_and_check(benchmark, db, vitals_dataset):
+    patient_id = vitals_dataset["patient_ids"][0]
+    vital_in = _anomalous_vital()
+
+    result = benchmark(crud.vitals.create_and_check, db, obj_in=vital_in, patient_id=patient_id)
+
+    assert result.id is not None
+
+
+def test_get_all_alerts(benchmark, db, vitals_dataset):
+    result = benchmark(crud.alert.get_all_alerts, db, limit=100)
+
+    assert len(result) > 0
+
+
+def test_get_all_alerts_filtered(benchmark, db, vitals_dataset):
+    patient_id = vitals_dataset["patient_ids"][0]
+
+    benchmark(
+        crud.alert.get_all_alerts,
+        db,
+        limit=100,
+        patient_id_filter=patient_id,
+        severity_filter=AlertSeverity.RED,
+        is_resolved_filter=False,
+        sort_by="severity_desc",
+    )
+
+
+def test_get_all_alerts_by_disease_cohort(benchmark, db, vitals_dataset):
+    result = benchmark(crud.alert.get_all_alerts, db, limit=100, disease_filter="COPD")
+
+    assert len(result) > 0
+    cohort = crud.diseases.get_cohort(db, disease="COPD")
+    assert {row.patient_id for row in result} <= cohort
+
+
+def test_get_alert_feed(benchmark, db, vitals_dataset):
+    alerts, _ = benchmark(
+        crud.alert.get_feed,
+        db,
+        doctor_id=vitals_dataset["doctor_id"],
+        limit=100,
+        is_resolved_filter=False,
+        sort_by="severity_desc",
+    )
+
+    assert len(alerts) > 0
+
+
+def test_endpoint_read_patient_vitals(benchmark, client, vitals_dataset):
+    patient_id = vitals_dataset["patient_ids"][0]
+    headers = auth_headers(vitals_dataset["doctor_id"])
+
+    response = benchmark(client.get, f"/api/v1/patient-records/{patient_id}/vitals", headers=headers)
+
+    assert response.status_code == 200
+
+
+def test_endpoint_create_patient_vital(benchmark, client, vitals_dataset):
+    patient_id = vitals_dataset["patient_ids"][0]
+    headers = auth_headers(vitals_dataset["doctor_id"])
+    payload = _anomalous_vital().model_dump(by_alias=True)
+
+    response = benchmark(client.post, f"/api/v1/patient-records/{patient_id}/vitals", json=payload, headers=headers)
+
+    assert response.status_code == 201
+
+
+def test_endpoint_get_all_alerts(benchmark, client, vitals_dataset):
+    headers = auth_headers(vitals_dataset["doctor_id"])
+
+    response = benchmark(client.get, "/api/v1/alerts/", params={"limit": 100}, headers=headers)
+
+    assert response.status_code == 200
+
+
+def test_endpoint_alert_feed(benchmark, client, vitals_dataset):
+    headers = auth_headers(vitals_dataset["doctor_id"])
+
+    response = benchmark(client.get, "/api/v1/alerts/feed", params={"limit": 100}, headers=headers)
+
+    assert response.status_code == 200
+
+
+def test_endpoint_clinical_overview_stats(benchmark, client, vitals_dataset):
+    headers = auth_headers(vitals_dataset["doctor_id"])
+    url = "/api/v1/patient-records/clinical-overview/stats"
+    first = client.get(url, headers=headers)
+
+    # Polls without If-None-Match: every round after the first is a result cache hit
+    response = benchmark(client.get, url, headers=headers)
+
+    assert response.status_code == 200
+    assert response.json() == first.json()
+    assert "etag" in response.headers
+    assert query_count(response) <= 2  # current user and resource versions
+
+
+def test_endpoint_clinical_overview_stats_not_modified(benchmark, client, vitals_dataset):
+    # A dashboard poll with nothing new: answered from the version counters alone
+    headers = auth_headers(vitals_dataset["doctor_id"])
+    url = "/api/v1/patient-records/clinical-overview/stats"
+    etag = client.get(url, headers=headers).headers["etag"]
+
+    response = benchmark(client.get, url, headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert query_count(response) <= 2  # current user and resource versions
+
+
+def test_vitals_stats_revalidate_after_write(client, vitals_dataset):
+    headers = auth_headers(vitals_dataset["doctor_id"])
+    url = "/api/v1/patient-records/vital-signs/stats"
+    etag = client.get(url, headers=headers).headers["etag"]
+    assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    before = sum(month["count"] for month in client.get(url, headers=headers).json())
+    payload = _anomalous_vital().model_dump(by_alias=True)
+    client.post(f"/api/v1/patient-records/{vitals_dataset['patient_ids'][0]}/vitals", json=payload, headers=headers)
+
+    response = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    # The cached statistics were recomputed, not served stale
+    assert sum(month["count"] for month in response.json()) == before + 1
+
+
+def test_result_cache_single_flight():
+    cache = result_cache.ResultCache(result_cache.LRUBackend(16), ttl=60)
+    calls = []
+
+    def slow_stats():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"total": 1}
+
+    def request():
+        return cache.get_or_compute("stats", scope=1, params={}, versions={"vitals": 1}, compute=slow_stats)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: request(), range(8)))
+
+    assert results == [{"total": 1}] * 8
+    assert len(calls) == 1
+    cache.invalidate({"vitals"})
+    request()
+    assert len(calls) == 2
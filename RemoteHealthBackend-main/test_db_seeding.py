@@ -26,7 +26,7 @@ def test_db_seeding():
         thresholds = db.query(DiseaseThresholds).all()
         print(f"\nTotal disease thresholds: {len(thresholds)}")
         for threshold in thresholds:
-            print(f"  - {threshold.disease}: HR {threshold.heart_rate_min}-{threshold.heart_rate_max}")
+            print(f"  - {threshold.disease}: {threshold.vital.value} {threshold.min_value}-{threshold.max_value}")
         
         # Check if vitals were created
         vitals = db.query(VitalsModel).all()
@@ -0,0 +1,83 @@
+"""
+Shared fixtures for the unit tests: a fresh in-memory SQLite database per
+test and helpers to seed users. Run with `pytest tests/`.
+"""
+import os
+import sys
+
+# app.core.config reads DATABASE_URL at import time, so it must be set before
+# anything from the app package is imported.
+os.environ["DATABASE_URL"] = "sqlite://"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud
+from app.models.base import Base
+from app.models.user_model import User, UserRole
+from app.services import patient_search, streaming_detector
+
+# Seeded users never log in, so any non-empty hash will do
+FAKE_PASSWORD_HASH = "test-not-a-real-hash"
+
+
+def _reset_caches() -> None:
+    crud.thresholds.invalidate()
+    crud.anomaly_rules.invalidate()
+    crud.alert.invalidate_open_index()
+    crud.diseases.invalidate_cohorts()
+    streaming_detector.detector.clear()
+    patient_search.invalidate()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    _reset_caches()
+    yield engine
+    _reset_caches()
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Create and commit a user: make_user(UserRole.PATIENT, doctor_id=...)."""
+    created = []
+
+    def make(role: UserRole = UserRole.PATIENT, *, doctor_id=None, **fields) -> User:
+        n = len(created) + 1
+        user = User(
+            email=f"{role.value.lower()}{n}@example.com",
+            first_name=role.value.title(),
+            last_name=str(n),
+            role=role,
+            hashed_password=FAKE_PASSWORD_HASH,
+            doctor_id=doctor_id,
+            is_active=True,
+            is_superuser=False,
+            **fields,
+        )
+        db.add(user)
+        db.commit()
+        created.append(user)
+        return user
+
+    return make
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.crud.crud_alert import CRUDAlert
+from app.models.domain_models import Alert, AlertSeverity, VitalSign
+from app.models.user_model import UserRole
+from app.schemas.alert import AlertCreate
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+WINDOW = timedelta(minutes=settings.ALERT_COALESCE_WINDOW_MINUTES)
+
+
+@pytest.fixture
+def patient(make_user):
+    doctor = make_user(UserRole.DOCTOR)
+    return make_user(UserRole.PATIENT, doctor_id=doctor.id)
+
+
+def alert_in(patient, vital=VitalSign.HEART_RATE, severity=AlertSeverity.RED) -> AlertCreate:
+    return AlertCreate(patient_id=patient.id, severity=severity, vital=vital, message="Heart rate out of range")
+
+
+def alerts(db):
+    db.expire_all()
+    return db.query(Alert).order_by(Alert.id).all()
+
+
+def test_repeat_within_window_folds_into_open_alert(db, patient):
+    worker = CRUDAlert(Alert)
+
+    created = worker.raise_alert(db, obj_in=alert_in(patient), seen_at=NOW)
+    assert created is not None
+    assert worker.raise_alert(db, obj_in=alert_in(patient), seen_at=NOW + timedelta(minutes=5)) is None
+    # An older reading processed late counts, without moving last_seen_at back
+    assert worker.raise_alert(db, obj_in=alert_in(patient), seen_at=NOW + timedelta(minutes=1)) is None
+
+    [alert] = alerts(db)
+    assert alert.id == created.id
+    assert alert.occurrence_count == 3
+    assert alert.last_seen_at.replace(tzinfo=timezone.utc) == NOW + timedelta(minutes=5)
+    assert alert.coalescing
+
+
+def test_other_vital_or_severity_opens_its_own_alert(db, patient):
+    worker = CRUDAlert(Alert)
+
+    worker.raise_alert(db, obj_in=alert_in(patient), seen_at=NOW)
+    assert worker.raise_alert(db, obj_in=alert_in(patient, vital=VitalSign.SPO2), seen_at=NOW) is not None
+    assert worker.raise_alert(db, obj_in=alert_in(patient, severity=AlertSeverity.YELLOW), seen_at=NOW) is not None
+
+    assert [alert.occurrence_count for alert in alerts(db)] == [1, 1, 1]
+
+
+def test_repeat_after_quiet_window_opens_new_alert(db, patient):
+    worker = CRUDAlert(Alert)
+
+    first = worker.raise_alert(db, obj_in=alert_in(patient), seen_at=NOW)
+    second = worker.raise_alert(db, obj_in=alert_in(patient), seen_at=NOW + WINDOW + timedelta(minutes=1))
+
+    assert second is not None and second.id != first.id
+    old, new = alerts(db)
+    # The key moved to the new alert; the old one stays open but absorbs nothing more
+    assert not old.coalescing and not old.is_resolved
+    assert new.coalescing
+
+
+def test_resolved_alert_does_not_absorb_repeats(db, patient):
+    worker = CRUDAlert(Alert)
+
+    first = worker.raise_alert(db, obj_in=alert_in(patient), seen_at=NOW)
+    worker.resolve_alert(db, alert_id=first.id)
+    second = worker.raise_alert(db, obj_in=alert_in(patient), seen_at=NOW + timedelta(minutes=1))
+
+    assert second is not None
+    old, new = alerts(db)
+    assert old.is_resolved and old.occurrence_count == 1
+    assert new.coalescing and not new.is_resolved
+
+
+def test_alerts_without_vital_never_coalesce(db, patient):
+    worker = CRUDAlert(Alert)
+
+    for _ in range(2):
+        assert worker.raise_alert(db, obj_in=alert_in(patient, vital=None), seen_at=NOW) is not None
+
+    assert [alert.coalescing for alert in alerts(db)] == [False, False]
+
+
+def test_workers_with_stale_indexes_share_one_alert(db, session_factory, patient):
+    # Two workers whose open alert indexes were loaded before either raised the alert
+    worker_a, worker_b = CRUDAlert(Alert), CRUDAlert(Alert)
+    other_db = session_factory()
+    try:
+        worker_b._open_index(other_db)
+
+        assert worker_a.raise_alert(db, obj_in=alert_in(patient), seen_at=NOW) is not None
+        # Worker B misses it in its index; the unique index on the coalescing key folds it instead
+        assert worker_b.raise_alert(other_db, obj_in=alert_in(patient), seen_at=NOW + timedelta(minutes=1)) is None
+    finally:
+        other_db.close()
+
+    [alert] = alerts(db)
+    assert alert.occurrence_count == 2
+    assert alert.last_seen_at.replace(tzinfo=timezone.utc) == NOW + timedelta(minutes=1)
+
+
+def test_unique_index_rejects_second_coalescing_alert(db, patient):
+    for _ in range(2):
+        db.add(Alert(
+            patient_id=patient.id, severity=AlertSeverity.RED, vital=VitalSign.HEART_RATE,
+            message="m", last_seen_at=NOW, coalescing=True,
+        ))
+    with pytest.raises(IntegrityError):
+        db.commit()
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import crud
+from app.crud.crud_alert_counters import ALL_PATIENTS
+from app.db import upsert
+from app.models.domain_models import Alert, AlertCounter, AlertSeverity
+from app.models.user_model import UserRole
+from app.schemas.alert import AlertCreate
+
+RED, YELLOW = AlertSeverity.RED, AlertSeverity.YELLOW
+
+
+@pytest.fixture
+def doctor(make_user):
+    return make_user(UserRole.DOCTOR)
+
+
+@pytest.fixture
+def patients(make_user, doctor):
+    return [make_user(UserRole.PATIENT, doctor_id=doctor.id) for _ in range(2)]
+
+
+def counts(db, doctor_id=ALL_PATIENTS):
+    db.expire_all()
+    return crud.alert_counters.get_counts(db, doctor_id=doctor_id)
+
+
+def open_alert(db, patient, severity=RED) -> Alert:
+    return crud.alert.create_alert(db, obj_in=AlertCreate(patient_id=patient.id, severity=severity, message="m"))
+
+
+@pytest.mark.parametrize("native_upsert", [True, False], ids=["on-conflict", "portable"])
+def test_adjust_counts_doctor_and_all_patients(db, doctor, patients, make_user, monkeypatch, native_upsert):
+    if not native_upsert:
+        # The UPDATE-then-INSERT path databases without ON CONFLICT take
+        monkeypatch.setattr(upsert, "_ON_CONFLICT_INSERTS", {})
+    unassigned = make_user(UserRole.PATIENT)
+
+    crud.alert_counters.adjust(db, patient_id=patients[0].id, severity=RED, delta=1)
+    crud.alert_counters.adjust(db, patient_id=patients[1].id, severity=RED, delta=1)
+    crud.alert_counters.adjust(db, patient_id=unassigned.id, severity=YELLOW, delta=1)
+    crud.alert_counters.adjust(db, patient_id=patients[0].id, severity=RED, delta=-1)
+    db.commit()
+
+    assert counts(db, doctor.id)[RED] == 1
+    assert counts(db, doctor.id)[YELLOW] == 0
+    assert counts(db)[RED] == 1
+    assert counts(db)[YELLOW] == 1
+    assert db.query(AlertCounter).count() == 3
+
+
+def test_adjust_many_groups_per_counter(db, doctor, patients):
+    crud.alert_counters.adjust_many(db, [(patients[0].id, RED), (patients[1].id, RED), (patients[1].id, YELLOW), (patients[0].id, None)])
+    db.commit()
+
+    assert counts(db, doctor.id) == {RED: 2, YELLOW: 1, AlertSeverity.BLUE: 0}
+    assert counts(db) == counts(db, doctor.id)
+
+
+def test_counts_never_go_negative(db, doctor, patients):
+    crud.alert_counters.adjust(db, patient_id=patients[0].id, severity=RED, delta=-1)
+    db.commit()
+
+    assert counts(db, doctor.id)[RED] == 0
+
+
+def test_resolve_alert_decrements_once(db, doctor, patients):
+    alert = open_alert(db, patients[0])
+    assert counts(db, doctor.id)[RED] == 1
+
+    crud.alert.resolve_alert(db, alert_id=alert.id)
+    crud.alert.resolve_alert(db, alert_id=alert.id)
+
+    assert counts(db, doctor.id)[RED] == 0
+    assert counts(db)[RED] == 0
+
+
+def test_resolve_many_by_criteria(db, doctor, patients):
+    red_0 = open_alert(db, patients[0])
+    yellow_0 = open_alert(db, patients[0], YELLOW)
+    red_1 = open_alert(db, patients[1])
+
+    resolved = crud.alert.resolve_many(db, patient_id=patients[0].id, severity=RED)
+
+    assert resolved == [(red_0.id, patients[0].id, RED)]
+    assert counts(db, doctor.id) == {RED: 1, YELLOW: 1, AlertSeverity.BLUE: 0}
+
+    resolved = crud.alert.resolve_many(db, alert_ids=[red_0.id, yellow_0.id, red_1.id])
+
+    # Already resolved alerts are skipped and not decremented again
+    assert sorted(alert_id for alert_id, _, _ in resolved) == [yellow_0.id, red_1.id]
+    assert counts(db, doctor.id) == {RED: 0, YELLOW: 0, AlertSeverity.BLUE: 0}
+    assert counts(db) == counts(db, doctor.id)
+
+
+def test_resolve_many_before(db, doctor, patients):
+    old = open_alert(db, patients[0])
+    old.created_at = datetime.now(timezone.utc) - timedelta(days=2)
+    db.commit()
+    recent = open_alert(db, patients[1])
+
+    resolved = crud.alert.resolve_many(db, before=datetime.now(timezone.utc) - timedelta(days=1))
+
+    assert [alert_id for alert_id, _, _ in resolved] == [old.id]
+    db.expire_all()
+    assert not db.get(Alert, recent.id).is_resolved
+    assert counts(db, doctor.id)[RED] == 1
+
+
+def test_resolve_many_for_doctor_leaves_other_doctors_alerts(db, doctor, patients, make_user):
+    other_doctor = make_user(UserRole.DOCTOR)
+    own = open_alert(db, patients[0])
+    others = open_alert(db, make_user(UserRole.PATIENT, doctor_id=other_doctor.id))
+
+    assert crud.alert.resolve_many(db, severity=RED, doctor_id=doctor.id) == [(own.id, patients[0].id, RED)]
+    assert crud.alert.resolve_many(db, alert_ids=[others.id], doctor_id=doctor.id) == []
+
+    db.expire_all()
+    assert not db.get(Alert, others.id).is_resolved
+    assert counts(db, other_doctor.id)[RED] == 1
+
+
+def test_reconcile_corrects_drift(db, doctor, patients):
+    open_alert(db, patients[0])
+    open_alert(db, patients[1], YELLOW)
+    # Drift: a counter that is off and one for an alert that no longer exists
+    crud.alert_counters.apply(db, {(doctor.id, RED): 3, (ALL_PATIENTS, AlertSeverity.BLUE): 1})
+    db.commit()
+
+    assert crud.alert_counters.reconcile(db) == 2
+    assert counts(db, doctor.id) == {RED: 1, YELLOW: 1, AlertSeverity.BLUE: 0}
+    assert counts(db) == counts(db, doctor.id)
+    assert crud.alert_counters.reconcile(db) == 0
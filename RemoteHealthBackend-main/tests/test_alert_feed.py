@@ -0,0 +1,128 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import crud
+from app.crud.crud_alert import FEED_SORTS, SEVERITY_PRIORITY, _decode_cursor, _encode_cursor
+from app.models.domain_models import Alert, AlertSeverity
+from app.models.user_model import UserRole
+
+START = datetime(2026, 3, 1, 8, 0)
+SEVERITIES = list(AlertSeverity)
+
+
+@pytest.fixture
+def feed(db, make_user):
+    """Two doctors with two patients each and 12 alerts per patient, many sharing a timestamp."""
+    doctors = [make_user(UserRole.DOCTOR) for _ in range(2)]
+    patients = {doctor.id: [make_user(UserRole.PATIENT, doctor_id=doctor.id) for _ in range(2)] for doctor in doctors}
+    for doctor_patients in patients.values():
+        for patient in doctor_patients:
+            for n in range(12):
+                db.add(Alert(
+                    patient_id=patient.id,
+                    severity=SEVERITIES[n % len(SEVERITIES)],
+                    message=f"alert {n}",
+                    # Pairs of alerts created in the same second, to exercise ties
+                    created_at=START + timedelta(seconds=n // 2),
+                    is_resolved=n % 4 == 0,
+                ))
+    db.commit()
+    return doctors, patients
+
+
+def walk(db, page_size: int, **filters):
+    pages, cursor = [], None
+    while True:
+        rows, cursor = crud.alert.get_feed(db, limit=page_size, cursor=cursor, **filters)
+        pages.append([row.id for row in rows])
+        if cursor is None:
+            return pages
+
+
+def expected_order(db, sort_by):
+    alerts = db.query(Alert).all()
+    key = {
+        "created_at": lambda alert: (alert.created_at, alert.id),
+        "severity": lambda alert: (SEVERITY_PRIORITY[alert.severity], alert.created_at, alert.id),
+    }[sort_by.rsplit("_", 1)[0]]
+    return [alert.id for alert in sorted(alerts, key=key, reverse=sort_by.endswith("_desc"))]
+
+
+@pytest.mark.parametrize("sort_by", FEED_SORTS)
+def test_pages_cover_every_alert_once_in_order(db, feed, sort_by):
+    pages = walk(db, 5, sort_by=sort_by)
+
+    assert [len(page) for page in pages[:-1]] == [5] * (len(pages) - 1)
+    assert [alert_id for page in pages for alert_id in page] == expected_order(db, sort_by)
+
+
+def test_pages_are_scoped_to_doctor_and_filters(db, feed):
+    doctors, patients = feed
+    own = {patient.id for patient in patients[doctors[0].id]}
+
+    ids = [alert_id for page in walk(db, 4, doctor_id=doctors[0].id, is_resolved_filter=False) for alert_id in page]
+
+    alerts = {alert.id: alert for alert in db.query(Alert).filter(Alert.id.in_(ids))}
+    assert len(ids) == len(set(ids)) == 2 * 9
+    assert all(alert.patient_id in own and not alert.is_resolved for alert in alerts.values())
+
+
+def test_last_page_has_no_cursor(db, feed):
+    rows, cursor = crud.alert.get_feed(db, limit=1000)
+
+    assert len(rows) == 48
+    assert cursor is None
+
+
+def test_cursor_round_trip():
+    key = [3, "2026-03-01 08:00:01.000", 17]
+
+    assert _decode_cursor(_encode_cursor(key), 3, parse_time=False) == key
+    assert _decode_cursor(_encode_cursor(key), 3, parse_time=True) == [3, datetime(2026, 3, 1, 8, 0, 1), 17]
+    # Any ISO spelling is normalized to the format SQLite timestamps are compared in
+    assert _decode_cursor(_encode_cursor(["2026-03-01T08:00:01", 17]), 2, parse_time=False) == [
+        "2026-03-01 08:00:01.000", 17,
+    ]
+
+
+def _raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+@pytest.mark.parametrize("cursor, length", [
+    ("not base64 at all!", 2),
+    (base64.urlsafe_b64encode(b"\xff\xfe").decode(), 2),
+    (_raw_cursor({"created_at": "2026-03-01T08:00:00", "id": 1}), 2),
+    # Cursor of another sort order
+    (_raw_cursor(["2026-03-01T08:00:00", 1]), 3),
+    (_raw_cursor(["2026-03-01T08:00:00", "1"]), 2),
+    (_raw_cursor(["2026-03-01T08:00:00", True]), 2),
+    (_raw_cursor(["2026-03-01T08:00:00", 1.5]), 2),
+    (_raw_cursor([1234567890, 1]), 2),
+    (_raw_cursor(["yesterday", 1]), 2),
+    (_raw_cursor(["2026-03-01T08:00:00' OR '1'='1", 1]), 2),
+    # Severity priorities are small known integers, never names or arbitrary values
+    (_raw_cursor(["RED", "2026-03-01T08:00:00", 1]), 3),
+    (_raw_cursor([7, "2026-03-01T08:00:00", 1]), 3),
+    (_raw_cursor([2.5, "2026-03-01T08:00:00", 1]), 3),
+    (_raw_cursor([None, "2026-03-01T08:00:00", 1]), 3),
+    (_raw_cursor([False, "2026-03-01T08:00:00", 1]), 3),
+    (_raw_cursor([[3], "2026-03-01T08:00:00", 1]), 3),
+])
+def test_tampered_cursors_are_rejected(cursor, length):
+    with pytest.raises(ValueError):
+        _decode_cursor(cursor, length, parse_time=True)
+    with pytest.raises(ValueError):
+        _decode_cursor(cursor, length, parse_time=False)
+
+
+@pytest.mark.parametrize("sort_by", ["created_at_desc", "severity_desc"])
+def test_feed_rejects_cursor_of_other_sort(db, feed, sort_by):
+    other = "severity_desc" if sort_by == "created_at_desc" else "created_at_desc"
+    _, cursor = crud.alert.get_feed(db, limit=5, sort_by=other)
+
+    with pytest.raises(ValueError):
+        crud.alert.get_feed(db, limit=5, cursor=cursor, sort_by=sort_by)
@@ -0,0 +1,209 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from starlette.requests import Request
+
+from app.api import http_cache
+from app.core.config import settings
+from app.crud.crud_resource_versions import ALERTS, PATIENTS, VITALS
+from app.models.domain_models import PatientRiskScore, Vitals
+from app.models.user_model import UserRole
+from app.services import result_cache
+
+MODIFIED = datetime(2026, 3, 1, 8, 0, 30, 500000, tzinfo=timezone.utc)
+
+
+def request(path: str = "/api/v1/patient-records/", query: str = "", **headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    ('W/"abc"', True),
+    ('"abc"', True),
+    (' W/"abc" ', True),
+    ('"xyz", W/"abc"', True),
+    ('"xyz","abc"', True),
+    ("*", True),
+    (" * ", True),
+    ('"xyz"', False),
+    ('W/"abcd"', False),
+    ("abc", False),
+    ("", False),
+])
+def test_etag_matches_weakly(if_none_match, matches):
+    assert http_cache.etag_matches(if_none_match, 'W/"abc"') is matches
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    validators = http_cache.Validators('W/"abc"', MODIFIED)
+    since = format_datetime(MODIFIED + timedelta(days=1), usegmt=True)
+
+    assert not validators.fresh(request(if_none_match='"other"', if_modified_since=since))
+    assert validators.fresh(request(if_none_match='W/"abc"'))
+
+
+@pytest.mark.parametrize("if_modified_since, fresh", [
+    # HTTP dates have whole seconds: the sub-second part of the write is dropped
+    ("Sun, 01 Mar 2026 08:00:30 GMT", True),
+    ("Sun, 01 Mar 2026 08:00:31 GMT", True),
+    ("Sun, 01 Mar 2026 08:00:29 GMT", False),
+    # No zone: read as UTC
+    ("Sun, 01 Mar 2026 08:00:30", True),
+    ("Sun, 01 Mar 2026 09:00:30 +0100", True),
+    ("Sun, 01 Mar 2026 07:00:29 -0100", False),
+    ("yesterday", False),
+    ("", False),
+])
+def test_if_modified_since(if_modified_since, fresh):
+    validators = http_cache.Validators('W/"abc"', MODIFIED)
+
+    assert validators.fresh(request(if_modified_since=if_modified_since)) is fresh
+    assert validators.headers["Last-Modified"] == "Sun, 01 Mar 2026 08:00:30 GMT"
+
+
+def test_without_last_modified_only_etag_is_checked():
+    validators = http_cache.Validators('W/"abc"')
+
+    assert not validators.fresh(request(if_modified_since="Sun, 01 Mar 2026 08:00:30 GMT"))
+    assert "Last-Modified" not in validators.headers
+
+
+def test_not_modified_response_carries_validators():
+    response = http_cache.Validators('W/"abc"', MODIFIED, vary="Authorization").not_modified()
+
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == 'W/"abc"'
+    assert response.headers["cache-control"] == http_cache.CACHE_CONTROL
+    assert response.headers["vary"] == "Authorization"
+
+
+def test_disabled_cache_never_matches(db, monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_CACHE_ENABLED", False)
+
+    validators = http_cache.for_resources(db, request(if_none_match="*"), (VITALS,), scope=1)
+
+    assert validators.etag is None
+    assert validators.versions is None
+    assert not validators.fresh(request(if_none_match="*"))
+    assert validators.headers == {}
+
+
+@pytest.fixture
+def practice(make_user):
+    doctors = [make_user(UserRole.DOCTOR) for _ in range(2)]
+    patients = [make_user(UserRole.PATIENT, doctor_id=doctor.id) for doctor in doctors]
+    return doctors, patients
+
+
+def etag(db, user_id, doctor_id, resources=(PATIENTS, VITALS, ALERTS), **request_kwargs):
+    return http_cache.for_resources(db, request(**request_kwargs), resources, scope=user_id, doctor_id=doctor_id).etag
+
+
+def add_vital(db, patient):
+    db.add(Vitals(patient_id=patient.id, heart_rate=80, timestamp=datetime.now(timezone.utc)))
+    db.commit()
+
+
+def test_etag_changes_with_route_query_and_caller(db, practice):
+    doctors, _ = practice
+
+    tag = etag(db, doctors[0].id, doctors[0].id)
+    assert tag == etag(db, doctors[0].id, doctors[0].id)
+    assert tag != etag(db, doctors[0].id, doctors[0].id, query="limit=10")
+    assert tag != etag(db, doctors[0].id, doctors[0].id, path="/api/v1/doctors/my-patients")
+    assert tag != etag(db, doctors[1].id, doctors[1].id)
+
+
+def test_writes_only_change_the_etags_of_their_doctor(db, practice, make_user):
+    doctors, patients = practice
+    admin = make_user(UserRole.ADMIN)
+    before = [etag(db, doctor.id, doctor.id) for doctor in doctors]
+    admin_before = etag(db, admin.id, None)
+
+    add_vital(db, patients[0])
+
+    assert etag(db, doctors[0].id, doctors[0].id) != before[0]
+    assert etag(db, doctors[1].id, doctors[1].id) == before[1]
+    assert etag(db, admin.id, None) != admin_before
+
+
+def test_reassigned_patient_changes_both_doctors(db, practice):
+    doctors, patients = practice
+    before = [etag(db, doctor.id, doctor.id, (PATIENTS,)) for doctor in doctors]
+
+    patients[0].doctor_id = doctors[1].id
+    db.commit()
+
+    assert all(etag(db, doctor.id, doctor.id, (PATIENTS,)) != tag for doctor, tag in zip(doctors, before))
+
+
+def test_unattributed_bulk_write_changes_every_etag(db, practice):
+    doctors, patients = practice
+    before = [etag(db, doctor.id, doctor.id) for doctor in doctors]
+
+    # A bulk statement the session cannot attribute to patients
+    db.query(Vitals).filter(Vitals.heart_rate > 500).delete()
+    db.commit()
+
+    assert all(etag(db, doctor.id, doctor.id) != tag for doctor, tag in zip(doctors, before))
+
+
+def test_derived_tables_do_not_change_etags(db, practice):
+    doctors, patients = practice
+    before = etag(db, doctors[0].id, doctors[0].id)
+
+    db.add(PatientRiskScore(patient_id=patients[0].id, score=42.0))
+    db.commit()
+
+    assert etag(db, doctors[0].id, doctors[0].id) == before
+
+
+def test_last_modified_follows_the_latest_write_in_view(db, practice):
+    doctors, patients = practice
+    validators = http_cache.for_resources(db, request(), (VITALS,), scope=doctors[0].id, doctor_id=doctors[0].id)
+    assert validators.last_modified is None
+
+    add_vital(db, patients[0])
+
+    validators = http_cache.for_resources(db, request(), (VITALS,), scope=doctors[0].id, doctor_id=doctors[0].id)
+    assert validators.last_modified is not None
+    since = format_datetime(validators.last_modified, usegmt=True)
+    assert validators.fresh(request(if_modified_since=since))
+    not_before = validators.last_modified + timedelta(hours=1)
+    later = http_cache.for_resources(
+        db, request(), (VITALS,), scope=doctors[0].id, doctor_id=doctors[0].id, not_before=not_before,
+    )
+    assert later.last_modified == not_before
+    assert not later.fresh(request(if_modified_since=since))
+
+
+def test_result_cache_drops_entries_of_the_written_doctor(db, practice, monkeypatch):
+    doctors, patients = practice
+    cache = result_cache.ResultCache(result_cache.LRUBackend(16), ttl=60)
+    monkeypatch.setattr(result_cache, "cache", cache)
+
+    def cached(user_id, doctor_id):
+        validators = http_cache.for_resources(db, request(), (VITALS,), scope=user_id, doctor_id=doctor_id)
+        cache.get_or_compute("stats", scope=user_id, params={}, versions=validators.versions, compute=lambda: user_id)
+
+    for doctor in doctors:
+        cached(doctor.id, doctor.id)
+    cached(0, None)
+    assert len(cache.backend) == 3
+
+    add_vital(db, patients[0])
+    assert len(cache.backend) == 1  # doctor 1's entry survives
+
+    # Unattributed writes reach every doctor's entries
+    cached(doctors[0].id, doctors[0].id)
+    db.query(Vitals).filter(Vitals.heart_rate > 500).delete()
+    db.commit()
+    assert len(cache.backend) == 0
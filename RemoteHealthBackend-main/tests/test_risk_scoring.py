@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.models.domain_models import PatientRiskScore, Vitals
+from app.services import risk_scoring
+
+START = datetime(2026, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+
+def store(db, patient, n: int, heart_rate: float) -> Vitals:
+    vital = Vitals(patient_id=patient.id, timestamp=START + timedelta(minutes=15 * n), heart_rate=heart_rate, spo2=97)
+    db.add(vital)
+    db.commit()
+    return vital
+
+
+def stored_score(db, patient) -> PatientRiskScore:
+    db.expire_all()
+    return db.get(PatientRiskScore, patient.id)
+
+
+def test_reading_risk_scales_with_distance_from_normal_range():
+    assert risk_scoring.reading_risk(Vitals(heart_rate=80, spo2=97)) == 0.0
+    # Half a range-width (40) above 100
+    assert risk_scoring.reading_risk(Vitals(heart_rate=120)) == pytest.approx(0.5)
+    assert risk_scoring.reading_risk(Vitals(heart_rate=250)) == 1.0
+    # Missing and zero values are not measured
+    assert risk_scoring.reading_risk(Vitals(heart_rate=0, spo2=None)) == 0.0
+
+
+def test_folded_readings_match_a_recompute_from_history(db, make_user):
+    patient = make_user()
+    for n, heart_rate in enumerate([80, 130, 95, 150, 110, 70]):
+        risk_scoring.record_reading(db, store(db, patient, n, heart_rate))
+
+    score = stored_score(db, patient)
+    expected = risk_scoring._vitals_from_history(db, patient.id)
+    assert score.vitals_component == pytest.approx(expected)
+    assert score.score == pytest.approx(score.vitals_component + score.alerts_component + score.chronic_component)
+
+
+def test_history_recompute_only_replays_the_window(db, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "RISK_VITALS_WINDOW", 3)
+    patient = make_user()
+    heart_rates = [150, 150, 80, 120, 90]
+    for n, heart_rate in enumerate(heart_rates):
+        store(db, patient, n, heart_rate)
+
+    alpha = settings.RISK_VITALS_EWMA_ALPHA
+    ewma = 0.0
+    for heart_rate in heart_rates[-3:]:
+        ewma = alpha * risk_scoring.reading_risk(Vitals(heart_rate=heart_rate)) + (1 - alpha) * ewma
+    assert risk_scoring._vitals_from_history(db, patient.id) == pytest.approx(risk_scoring.VITALS_WEIGHT * ewma)
+
+
+def test_record_reading_counts_readings(db, make_user):
+    patient = make_user()
+
+    counts = [risk_scoring.record_reading(db, store(db, patient, n, 80)) for n in range(3)]
+    assert counts == [1, 2, 3]
+
+    # A full recompute moves the count by more than one reading would
+    risk_scoring.recompute(db, [patient.id])
+    assert stored_score(db, patient).reading_count == 5
+
+
+def test_ensure_survives_a_concurrent_first_insert(db, session_factory, make_user, monkeypatch):
+    patient = make_user()
+    vital = store(db, patient, 0, 130)
+    recompute_patient = risk_scoring.recompute_patient
+
+    def racing_recompute(session, patient_id):
+        row = recompute_patient(session, patient_id)
+        # Another request creates the row before this one is flushed
+        other = session_factory()
+        try:
+            recompute_patient(other, patient_id)
+            other.commit()
+        finally:
+            other.close()
+        return row
+
+    monkeypatch.setattr(risk_scoring, "recompute_patient", racing_recompute)
+
+    assert risk_scoring.record_reading(db, vital) == 1
+    score = stored_score(db, patient)
+    assert score.vitals_component == pytest.approx(risk_scoring._vitals_from_history(db, patient.id))
+    assert db.query(PatientRiskScore).count() == 1
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app import crud
+from app.models.domain_models import AlertSeverity, VitalSign
+from app.schemas.anomaly_rule import AnomalyRule, AnomalyRuleCreate, RuleCondition
+from app.schemas.threshold import DiseaseThreshold
+from app.services import rule_engine
+
+START = datetime(2026, 1, 1, 8, 0)
+
+
+def reading(minute: float = 0, **vitals) -> rule_engine.Reading:
+    values = {vital.value: None for vital in VitalSign}
+    values.update(vitals)
+    return rule_engine.reading_from(SimpleNamespace(timestamp=START + timedelta(minutes=minute), **values))
+
+
+def rule(*conditions: RuleCondition, sustained: int = 1, message=None) -> rule_engine.CompiledRule:
+    return rule_engine.compile_rule(AnomalyRule(
+        id=1,
+        name="test rule",
+        disease="Hypertension",
+        severity=AlertSeverity.YELLOW,
+        conditions=list(conditions),
+        sustained_readings=sustained,
+        message=message,
+    ))
+
+
+def matches(compiled: rule_engine.CompiledRule, current, *history) -> bool:
+    return compiled in rule_engine.EvaluationPlan([compiled]).evaluate(current, list(history))
+
+
+def test_threshold_condition_compares_with_operator():
+    compiled = rule(RuleCondition(kind="threshold", vital=VitalSign.HEART_RATE, op=">=", value=120))
+
+    assert matches(compiled, reading(heart_rate=120))
+    assert not matches(compiled, reading(heart_rate=119.9))
+
+
+def test_range_conditions_with_one_or_both_bounds():
+    both = rule(RuleCondition(kind="range", vital=VitalSign.SPO2, min_value=95, max_value=100))
+    low_only = rule(RuleCondition(kind="range", vital=VitalSign.SPO2, min_value=95))
+    high_only = rule(RuleCondition(kind="range", vital=VitalSign.SPO2, max_value=100))
+
+    assert matches(both, reading(spo2=90)) and matches(both, reading(spo2=101))
+    assert not matches(both, reading(spo2=97))
+    assert matches(low_only, reading(spo2=90)) and not matches(low_only, reading(spo2=101))
+    assert matches(high_only, reading(spo2=101)) and not matches(high_only, reading(spo2=90))
+
+
+def test_missing_or_zero_values_never_match():
+    compiled = rule(RuleCondition(kind="range", vital=VitalSign.TEMPERATURE, min_value=36, max_value=37.5))
+
+    assert not matches(compiled, reading(temperature=None))
+    assert not matches(compiled, reading(temperature=0))
+
+
+def test_rate_condition_uses_change_per_minute_since_previous_reading():
+    rising = rule(RuleCondition(kind="rate", vital=VitalSign.TEMPERATURE, op=">", value=0.05))
+
+    assert matches(rising, reading(10, temperature=37.6), reading(0, temperature=37.0))
+    assert not matches(rising, reading(10, temperature=37.4), reading(0, temperature=37.0))
+    # No previous reading, or no time elapsed: nothing to compare
+    assert not matches(rising, reading(10, temperature=37.6))
+    assert not matches(rising, reading(0, temperature=37.6), reading(0, temperature=37.0))
+
+
+def test_all_conditions_must_hold():
+    compiled = rule(
+        RuleCondition(kind="threshold", vital=VitalSign.HEART_RATE, op=">", value=110),
+        RuleCondition(kind="threshold", vital=VitalSign.SPO2, op="<", value=92),
+        RuleCondition(kind="threshold", vital=VitalSign.TEMPERATURE, op=">", value=38),
+    )
+
+    assert matches(compiled, reading(heart_rate=120, spo2=90, temperature=38.5))
+    assert not matches(compiled, reading(heart_rate=120, spo2=90, temperature=37))
+
+
+def test_sustained_rule_needs_enough_matching_history():
+    compiled = rule(RuleCondition(kind="threshold", vital=VitalSign.HEART_RATE, op=">", value=120), sustained=3)
+    high = [reading(2, heart_rate=130), reading(1, heart_rate=125), reading(0, heart_rate=128)]
+
+    assert compiled.history_needed == 2
+    assert matches(compiled, *high)
+    # Too little history, or one earlier reading back in range
+    assert not matches(compiled, high[0], high[1])
+    assert not matches(compiled, high[0], reading(1, heart_rate=90), high[2])
+
+
+def test_sustained_rate_rule_looks_one_reading_further_back():
+    compiled = rule(RuleCondition(kind="rate", vital=VitalSign.HEART_RATE, op=">", value=1), sustained=2)
+    climbing = [reading(2, heart_rate=100), reading(1, heart_rate=95), reading(0, heart_rate=90)]
+
+    assert compiled.history_needed == 2
+    assert matches(compiled, *climbing)
+    assert not matches(compiled, climbing[0], climbing[1], reading(0, heart_rate=95))
+
+
+def test_compiled_rule_reports_primary_condition():
+    compiled = rule(
+        RuleCondition(kind="threshold", vital=VitalSign.HEART_RATE, op=">", value=120),
+        RuleCondition(kind="threshold", vital=VitalSign.SPO2, op="<", value=92),
+        sustained=2,
+    )
+
+    assert compiled.primary_vital == VitalSign.HEART_RATE
+    assert (compiled.threshold_min, compiled.threshold_max) == (None, 120)
+    assert compiled.actual_value(reading(heart_rate=130, spo2=90)) == 130
+    assert compiled.alert_message(130) == (
+        "Anomaly in Hypertension: heart_rate > 120.0 and spo2 < 92.0 for 2 readings."
+    )
+    assert rule(RuleCondition(vital=VitalSign.SPO2, op="<", value=92), message="Low oxygen").alert_message(90) == "Low oxygen"
+
+
+def test_threshold_compiles_to_range_rule():
+    compiled = rule_engine.compile_threshold(DiseaseThreshold(
+        id=1, disease="COPD", vital=VitalSign.SPO2, min_value=88, max_value=100, severity=AlertSeverity.RED,
+    ))
+
+    assert compiled.rule_id is None
+    assert compiled.history_needed == 0
+    assert matches(compiled, reading(spo2=85))
+    assert not matches(compiled, reading(spo2=92))
+    assert compiled.alert_message(85) == "Anomaly in COPD: value 85 is outside the normal range."
+
+
+def test_plan_history_depth_is_the_deepest_rule():
+    plan = rule_engine.compile_plan([], [
+        AnomalyRule(id=1, name="a", disease="x", conditions=[RuleCondition(vital=VitalSign.PULSE, op=">", value=1)]),
+        AnomalyRule(
+            id=2, name="b", disease="x", sustained_readings=4,
+            conditions=[RuleCondition(kind="rate", vital=VitalSign.PULSE, op=">", value=1)],
+        ),
+    ])
+
+    assert plan.history_depth == 4
+    assert rule_engine.EvaluationPlan([]).history_depth == 0
+
+
+def test_get_plan_is_rebuilt_only_when_rules_change(db):
+    first = rule_engine.get_plan(db)
+    assert first.rules == ()
+    assert rule_engine.get_plan(db) is first
+
+    crud.anomaly_rules.create(db, obj_in=AnomalyRuleCreate(
+        name="tachycardia",
+        disease="Hypertension",
+        conditions=[RuleCondition(vital=VitalSign.HEART_RATE, op=">", value=120)],
+    ))
+
+    rebuilt = rule_engine.get_plan(db)
+    assert rebuilt is not first
+    assert [compiled.name for compiled in rebuilt.rules] == ["tachycardia"]
@@ -0,0 +1,168 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.db import query_stats
+from app.models.domain_models import Vitals, VitalSign
+from app.services.streaming_detector import StreamingDetector, VitalStream
+
+START = datetime(2026, 1, 1, 8, 0, tzinfo=timezone.utc)
+HR = VitalSign.HEART_RATE
+
+
+@pytest.fixture
+def small_window(monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_WINDOW_READINGS", 8)
+    return 8
+
+
+def heart_rate(n: int) -> float:
+    # Noisy upward drift, so mean, variance and slope all move
+    return 70 + 0.5 * n + 3 * math.sin(n)
+
+
+def full_stats(points):
+    """Mean, sample variance and least-squares slope of (hours, value) points, from scratch."""
+    n = len(points)
+    mean = sum(value for _, value in points) / n
+    variance = sum((value - mean) ** 2 for _, value in points) / (n - 1)
+    mean_t = sum(t for t, _ in points) / n
+    slope = sum((t - mean_t) * (value - mean) for t, value in points) / sum((t - mean_t) ** 2 for t, _ in points)
+    return mean, variance, slope
+
+
+def stream_stats(stream: VitalStream):
+    return stream.mean, stream.m2 / (stream.n - 1), stream.slope()
+
+
+def ewma(values):
+    alpha = settings.STREAM_EWMA_ALPHA
+    result = None
+    for value in values:
+        result = value if result is None else alpha * value + (1 - alpha) * result
+    return result
+
+
+@pytest.mark.parametrize("hours_apart", [0.25, 30.0], ids=["same-origin", "rebased"])
+def test_window_statistics_match_a_full_recompute(small_window, hours_apart):
+    stream = VitalStream(small_window)
+    points = []
+    for n in range(30):
+        t, value = n * hours_apart, heart_rate(n)
+        stream.push(HR, t, value)
+        points.append((t, value))
+
+    window = points[-small_window:]
+    # Times are compared relative to the stream's (possibly moved) origin
+    assert stream_stats(stream) == pytest.approx(full_stats(window), rel=1e-9)
+    assert [value for _, value in stream.window] == [value for _, value in window]
+    assert stream.ewma == pytest.approx(ewma(value for _, value in points))
+
+
+def test_zscore_is_taken_against_the_window_before_the_value(small_window, monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_MIN_READINGS", 3)
+    stream = VitalStream(small_window)
+    values = [heart_rate(n) for n in range(12)]
+    for n, value in enumerate(values):
+        stream.push(HR, n * 0.25, value)
+
+    mean, variance, _ = full_stats([(n * 0.25, value) for n, value in enumerate(values)][-small_window:])
+    score = stream.push(HR, 12 * 0.25, 200.0)
+
+    assert score.zscore == pytest.approx((200.0 - mean) / math.sqrt(variance))
+
+
+def store(db, patient, n: int) -> Vitals:
+    vital = Vitals(patient_id=patient.id, timestamp=START + timedelta(minutes=15 * n), heart_rate=heart_rate(n))
+    db.add(vital)
+    db.commit()
+    return vital
+
+
+def observe_all(detector: StreamingDetector, db, vitals, first_count: int = 1) -> None:
+    for count, vital in enumerate(vitals, start=first_count):
+        detector.observe(db, vital, count)
+
+
+def heart_rate_stream(detector: StreamingDetector, patient) -> VitalStream:
+    return detector._states[patient.id].streams[HR]
+
+
+def assert_same_stream(actual: VitalStream, expected: VitalStream) -> None:
+    assert [value for _, value in actual.window] == [value for _, value in expected.window]
+    assert stream_stats(actual) == pytest.approx(stream_stats(expected), rel=1e-9)
+    assert actual.ewma == pytest.approx(expected.ewma)
+
+
+def test_rehydrated_state_after_eviction_matches_continuous_state(db, make_user, small_window, monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_MAX_PATIENTS", 1)
+    patient, other = make_user(), make_user()
+    continuous, evicting = StreamingDetector(), StreamingDetector()
+
+    # Fewer readings than the window, so the rehydrated EWMA saw them all too
+    vitals = [store(db, patient, n) for n in range(small_window)]
+    observe_all(continuous, db, vitals)
+    observe_all(evicting, db, vitals[:4])
+    evicting.observe(db, store(db, other, 0), 1)
+    assert patient.id not in evicting._states
+
+    observe_all(evicting, db, vitals[4:], first_count=5)
+
+    assert_same_stream(heart_rate_stream(evicting, patient), heart_rate_stream(continuous, patient))
+
+
+def test_readings_stored_by_another_worker_are_replayed(db, make_user):
+    patient = make_user()
+    single, worker_a, worker_b = StreamingDetector(), StreamingDetector(), StreamingDetector()
+    vitals = [store(db, patient, n) for n in range(20)]
+    observe_all(single, db, vitals)
+
+    observe_all(worker_a, db, vitals[:10])
+    # Worker B rehydrates and takes the next two readings; A learns from the count jump
+    observe_all(worker_b, db, vitals[10:12], first_count=11)
+    observe_all(worker_a, db, vitals[12:], first_count=13)
+
+    assert_same_stream(heart_rate_stream(worker_a, patient), heart_rate_stream(single, patient))
+
+
+def test_consecutive_counts_skip_the_catch_up_query(engine, db, make_user):
+    query_stats.instrument_engine(engine)
+    patient = make_user()
+    detector = StreamingDetector()
+    vitals = [store(db, patient, n) for n in range(5)]
+    observe_all(detector, db, vitals[:4])
+    # Load the reading's expired attributes outside the count
+    db.refresh(vitals[4])
+
+    with query_stats.track_queries() as stats:
+        detector.observe(db, vitals[4], 5)
+
+    assert stats.count == 0
+
+
+def test_count_gap_triggers_the_catch_up_query(engine, db, make_user):
+    query_stats.instrument_engine(engine)
+    patient = make_user()
+    detector = StreamingDetector()
+    vitals = [store(db, patient, n) for n in range(5)]
+    observe_all(detector, db, vitals[:3])
+    # Load the reading's expired attributes outside the count
+    db.refresh(vitals[4])
+
+    with query_stats.track_queries() as stats:
+        detector.observe(db, vitals[4], 5)
+
+    assert stats.count == 1
+    assert detector._states[patient.id].streams[HR].n == 5
+
+
+def test_late_readings_are_skipped(db, make_user):
+    patient = make_user()
+    detector = StreamingDetector()
+    observe_all(detector, db, [store(db, patient, n) for n in (1, 2)])
+    late = store(db, patient, 0)
+
+    assert detector.observe(db, late, 3) == []
+    assert heart_rate_stream(detector, patient).n == 2
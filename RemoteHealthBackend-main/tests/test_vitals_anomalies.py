@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+from app import crud
+from app.models.domain_models import Alert, AlertSeverity, Anomaly, DataSource, VitalSign
+from app.schemas.anomaly_rule import AnomalyRuleCreate, RuleCondition
+from app.schemas.patient import VitalsCreate
+from app.schemas.threshold import DiseaseThresholdCreate
+
+START = datetime(2026, 1, 1, 8, 0)
+
+
+def low_spo2(**fields) -> dict:
+    values = {"heartRate": 80, "temperature": 36.8, "oxygenSaturation": 85, "source": DataSource.MANUAL.value}
+    values.update(fields)
+    return values
+
+
+def tag(db, patient, diseases: str) -> None:
+    crud.diseases.set_patient_diseases(db, patient_id=patient.id, chronic_diseases=diseases)
+    db.commit()
+
+
+def seed_rules(db) -> None:
+    crud.thresholds.create(db, obj_in=DiseaseThresholdCreate(
+        disease="COPD", vital=VitalSign.SPO2, min_value=88, max_value=100, severity=AlertSeverity.RED,
+    ))
+    crud.anomaly_rules.create(db, obj_in=AnomalyRuleCreate(
+        name="critical spo2",
+        disease="",
+        severity=AlertSeverity.YELLOW,
+        conditions=[RuleCondition(kind="threshold", vital=VitalSign.SPO2, op="<", value=80)],
+    ))
+
+
+def anomalies_of(db, patient) -> list:
+    return [disease for (disease,) in db.query(Anomaly.disease).filter(Anomaly.patient_id == patient.id)]
+
+
+def test_disease_threshold_only_applies_to_tagged_patients(db, make_user):
+    seed_rules(db)
+    with_copd = make_user()
+    without_copd = make_user()
+    tag(db, with_copd, "COPD, diabetes")
+    tag(db, without_copd, "diabetes")
+
+    crud.vitals.create_and_check(db, obj_in=VitalsCreate(**low_spo2()), patient_id=with_copd.id)
+    crud.vitals.create_and_check(db, obj_in=VitalsCreate(**low_spo2()), patient_id=without_copd.id)
+
+    assert anomalies_of(db, with_copd) == ["COPD"]
+    assert anomalies_of(db, without_copd) == []
+    assert db.query(Alert).filter(Alert.patient_id == without_copd.id).count() == 0
+
+
+def test_rule_without_disease_applies_to_every_patient(db, make_user):
+    seed_rules(db)
+    with_copd = make_user()
+    untagged = make_user()
+    tag(db, with_copd, "COPD")
+
+    crud.vitals.create_and_check(db, obj_in=VitalsCreate(**low_spo2(oxygenSaturation=75)), patient_id=with_copd.id)
+    crud.vitals.create_and_check(db, obj_in=VitalsCreate(**low_spo2(oxygenSaturation=75)), patient_id=untagged.id)
+
+    assert sorted(anomalies_of(db, with_copd)) == ["", "COPD"]
+    assert anomalies_of(db, untagged) == [""]
+
+
+def test_import_pass_scopes_rules_to_tagged_patients(db, make_user):
+    seed_rules(db)
+    with_copd = make_user()
+    without_copd = make_user()
+    tag(db, with_copd, "COPD")
+
+    rows = [
+        {
+            "patient_id": patient.id, "heart_rate": 80, "temperature": 36.8, "spo2": spo2, "source": DataSource.DEVICE,
+            "timestamp": START + timedelta(hours=n), "import_id": "import-1",
+        }
+        for n, spo2 in enumerate((85, 75))
+        for patient in (with_copd, without_copd)
+    ]
+    crud.vitals.bulk_create(db, rows=rows)
+    crud.vitals.check_anomalies_for_import(db, import_id="import-1")
+    db.commit()
+
+    assert sorted(anomalies_of(db, with_copd)) == ["", "COPD", "COPD"]
+    assert anomalies_of(db, without_copd) == [""]